@@ -3,10 +3,13 @@ Smart Vision App - 모듈식 통합 웹 인터페이스
 주차별 학습 모듈을 통합한 메인 애플리케이션
 """
 
+import importlib
 import os
+import time
 import streamlit as st
 from PIL import Image
 import sys
+from typing import Optional
 from dotenv import load_dotenv
 
 # .env 파일 로드
@@ -23,7 +26,37 @@ except Exception:
 # 프로젝트 경로 설정
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# 모듈 임포트 (무거운 의존성은 지연 로드)
+from core.startup_profile import find_module_spec, missing_requirements, profile_module_imports
+
+# 모듈 경로, 클래스 이름, 모듈 파일이 최상위에서 임포트하는 주요 패키지
+# 실제 임포트는 사이드바에서 처음 선택될 때 한 번만 수행합니다.
+MODULE_SPECS = {
+    'Week 2: CNN': ('modules.week02_cnn.cnn_module', 'CNNModule', ('torch', 'cv2')),
+    'Week 3: Transfer Learning': ('modules.week03.transfer_learning_module', 'TransferLearningModule', ('torch', 'torchvision', 'cv2')),
+    'Week 4: Vision Transformer': ('modules.week04.vision_transformer_module', 'VisionTransformerModule', ('torch', 'transformers', 'sklearn')),
+    'Week 5: Object Detection': ('modules.week05.object_detection_module', 'ObjectDetectionModule', ('cv2',)),
+    'Week 6: Segmentation & SAM': ('modules.week06.segmentation_module', 'SegmentationModule', ()),
+    'Week 7: Action Recognition': ('modules.week07.action_recognition_module', 'ActionRecognitionModule', ()),
+    'Week 8: Emotion Recognition': ('modules.week08.emotion_recognition_module', 'EmotionRecognitionModule', ()),
+    'Week 9: Generation': ('modules.week09.generation_module', 'GenerationModule', ('torch',)),
+    'Week 10: Autonomous Driving': ('modules.week10.autonomous_driving_module', 'AutonomousDrivingModule', ('cv2',)),
+    'Week 11: Smart CCTV': ('modules.week11_smart_cctv.smart_cctv_module', 'SmartCCTVModule', ('cv2',)),
+}
+
+# 시작 프로파일링 모드: SMART_VISION_PROFILE_IMPORTS=1 또는 `streamlit run app.py -- --profile-imports`
+PROFILE_IMPORTS = os.getenv('SMART_VISION_PROFILE_IMPORTS') == '1' or '--profile-imports' in sys.argv
+
+
+def _check_module_available(module_path: str, requires=()) -> Optional[str]:
+    """모듈을 임포트하지 않고 사용 가능 여부 확인 (불가하면 사유 반환)"""
+    if find_module_spec(module_path) is None:
+        return f"모듈 파일을 찾을 수 없습니다: {module_path}"
+    missing = missing_requirements(requires)
+    if missing:
+        return f"필요한 패키지가 설치되어 있지 않습니다: {', '.join(missing)}"
+    return None
+
+
 def _try_import_class(module_path: str, class_name: str):
     """Try to import a class and return it, otherwise return None and print the error.
 
@@ -31,7 +64,7 @@ def _try_import_class(module_path: str, class_name: str):
     are not installed. Modules will be enabled only if import succeeds.
     """
     try:
-        module = __import__(module_path, fromlist=[class_name])
+        module = importlib.import_module(module_path)
         return getattr(module, class_name)
     except Exception as e:
         # Print to console for debugging; Streamlit will show warnings in the UI when appropriate
@@ -40,17 +73,13 @@ def _try_import_class(module_path: str, class_name: str):
         return None
 
 
-# lazy imports for classroom modules
-CNNModule = _try_import_class('modules.week02_cnn.cnn_module', 'CNNModule')
-TransferLearningModule = _try_import_class('modules.week03.transfer_learning_module', 'TransferLearningModule')
-VisionTransformerModule = _try_import_class('modules.week04.vision_transformer_module', 'VisionTransformerModule')
-ObjectDetectionModule = _try_import_class('modules.week05.object_detection_module', 'ObjectDetectionModule')
-SegmentationModule = _try_import_class('modules.week06.segmentation_module', 'SegmentationModule')
-ActionRecognitionModule = _try_import_class('modules.week07.action_recognition_module', 'ActionRecognitionModule')
-EmotionRecognitionModule = _try_import_class('modules.week08.emotion_recognition_module', 'EmotionRecognitionModule')
-GenerationModule = _try_import_class('modules.week09.generation_module', 'GenerationModule')
-AutonomousDrivingModule = _try_import_class('modules.week10.autonomous_driving_module', 'AutonomousDrivingModule')
-SmartCCTVModule = _try_import_class('modules.week11_smart_cctv.smart_cctv_module', 'SmartCCTVModule')
+@st.cache_resource(show_spinner="모듈 불러오는 중...")
+def load_module_class(module_path: str, class_name: str):
+    """선택된 모듈 클래스를 처음 선택 시 임포트 (프로세스당 1회, import 시간 기록)"""
+    start = time.perf_counter()
+    module_cls = _try_import_class(module_path, class_name)
+    return module_cls, time.perf_counter() - start
+
 
 # 페이지 설정
 st.set_page_config(
@@ -64,20 +93,9 @@ class SmartVisionApp:
     """메인 애플리케이션 클래스"""
 
     def __init__(self):
-        # 저장: 모듈의 클래스 레퍼런스 또는 None
-        # 인스턴스화는 렌더링 시점에 수행하여 불필요한 초기화를 피합니다.
-        self.modules = {
-            'Week 2: CNN': CNNModule,
-            'Week 3: Transfer Learning': TransferLearningModule,
-            'Week 4: Vision Transformer': VisionTransformerModule,
-            'Week 5: Object Detection': ObjectDetectionModule,
-            'Week 6: Segmentation & SAM': SegmentationModule,
-            'Week 7: Action Recognition': ActionRecognitionModule,
-            'Week 8: Emotion Recognition': EmotionRecognitionModule,
-            'Week 9: Generation': GenerationModule,
-            'Week 10: Autonomous Driving': AutonomousDrivingModule,
-            'Week 11: Smart CCTV': SmartCCTVModule,
-        }
+        # 저장: 모듈 경로 / 클래스 이름 / 주요 의존 패키지
+        # 임포트와 인스턴스화는 선택·렌더링 시점에 수행하여 불필요한 초기화를 피합니다.
+        self.modules = MODULE_SPECS
 
     def run(self):
         """애플리케이션 실행"""
@@ -144,12 +162,21 @@ class SmartVisionApp:
 
         # 메인 컨텐츠
         if selected_module in self.modules:
-            module_cls = self.modules[selected_module]
+            module_path, class_name, requires = self.modules[selected_module]
+            reason = _check_module_available(module_path, requires)
+            module_cls = None
+            if reason is None:
+                module_cls, import_seconds = load_module_class(module_path, class_name)
+                if PROFILE_IMPORTS:
+                    self.render_import_profile(module_path, import_seconds)
+
             if module_cls is None:
                 st.warning(
                     "선택한 모듈은 현재 사용 불가합니다. 필요한 패키지가 설치되어 있지 않거나 import 중 오류가 발생했습니다.\n"
                     "`pip install -r requirements.txt`로 의존성을 설치한 뒤 재시작하세요."
                 )
+                if reason:
+                    st.caption(reason)
             else:
                 try:
                     module = module_cls()
@@ -162,6 +189,19 @@ class SmartVisionApp:
             # 홈 페이지
             self.render_home()
 
+    def render_import_profile(self, module_path: str, import_seconds: float):
+        """시작 프로파일링 모드: 선택 모듈의 import 시간 표시"""
+        with st.sidebar.expander("⏱️ Import 프로파일", expanded=True):
+            st.metric("첫 선택 시 import 시간", f"{import_seconds * 1000:.0f} ms")
+            st.caption("같은 프로세스에서 이미 로드된 패키지는 제외된 시간입니다.")
+            if st.button("패키지별 상세 측정 (-X importtime)", key="profile_imports"):
+                with st.spinner("새 인터프리터에서 import 측정 중..."):
+                    profile = profile_module_imports(module_path, top=15)
+                st.write(f"**전체 (콜드)**: {profile['total_ms']:.0f} ms")
+                st.table([{'패키지': name, 'ms': round(ms, 1)} for name, ms in profile['packages'][:15]])
+                if not profile['ok']:
+                    st.error(profile['error'])
+
     def render_home(self):
         """홈 페이지 렌더링"""
         st.title("🎯 Smart Vision App")
@@ -1,10 +1,24 @@
 """
 Core 모듈
 공통 기능과 베이스 클래스들을 제공합니다.
+
+core.matplotlib_fonts 같은 가벼운 하위 모듈을 가져올 때 torch/transformers까지
+로드되지 않도록 클래스는 처음 접근할 때 임포트합니다.
 """
 
-from .base_processor import BaseImageProcessor
-from .ai_models import AIModelManager
-from .utils import ImageUtils
+import importlib
+
+_LAZY_ATTRS = {
+    'BaseImageProcessor': '.base_processor',
+    'AIModelManager': '.ai_models',
+    'ImageUtils': '.utils',
+}
+
+__all__ = ['BaseImageProcessor', 'AIModelManager', 'ImageUtils']
+
 
-__all__ = ['BaseImageProcessor', 'AIModelManager', 'ImageUtils']
\ No newline at end of file
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        module = importlib.import_module(_LAZY_ATTRS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,277 @@
+"""
+지연시간 기반 적응형 추론 스케줄러
+실시간 루프(웹캠, 비디오 재생)에서 추론 지연시간을 측정해
+목표 표시 FPS와 지연시간 SLO를 지키도록 추론 간격(stride)과 입력 해상도(scale)를 고릅니다.
+
+- stride: 최근 추론 지연시간(중앙값)이 프레임 예산(1000 / target_fps)의 몇 배인지로 결정
+          → 추론을 건너뛴 프레임은 직전 결과를 재사용해 표시
+- scale: 지연시간 p90이 SLO를 넘으면 한 단계 낮추고,
+         한 단계 올려도(비용 ∝ scale²) SLO 여유가 있으면 다시 올림
+- 오래된 프레임은 큐에 쌓지 않고 버림: 추론이 진행 중이거나(비동기) 프레임 시각이
+  예산보다 오래 지났으면 그 프레임의 추론은 건너뜀
+- 모든 결정과 지연시간은 InferenceMetrics에 기록 (표/그래프용 열 데이터 제공)
+
+사용 예:
+    scheduler = AdaptiveInferenceScheduler(target_fps=30, latency_slo_ms=80, scales=(1.0, 0.75, 0.5))
+    while True:
+        ok, frame = cap.read()
+        if scheduler.should_infer(time.perf_counter()):
+            with scheduler.measure():
+                results = model(frame, imgsz=int(640 * scheduler.scale))
+        scheduler.frame_done()
+    st.line_chart(pd.DataFrame(scheduler.metrics.as_columns()).set_index('t')[['latency_ms', 'stride']])
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# 프레임별 결정
+INFER = 'infer'    # 추론 실행
+SKIP = 'skip'      # stride 간격이라 건너뜀 (직전 결과 재사용)
+BUSY = 'busy'      # 이전 추론이 진행 중 (큐에 쌓지 않고 버림)
+STALE = 'stale'    # 프레임이 이미 오래됨 (버림)
+
+
+class InferenceMetrics:
+    """
+    스케줄러 결정/지연시간 기록
+
+    프레임마다 {'t', 'frame', 'action', 'stride', 'scale', 'latency_ms', 'display_fps'} 한 행을 남기고
+    최근 history개만 유지합니다. latency_ms는 추론한 프레임에만 채워집니다.
+    """
+
+    def __init__(self, history: int = 2000):
+        self.records: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.counts = {INFER: 0, SKIP: 0, BUSY: 0, STALE: 0}
+        self.scale_changes = 0
+        self._latencies: Deque[float] = deque(maxlen=history)
+
+    def add(self, record: Dict[str, Any]):
+        self.records.append(record)
+        self.counts[record['action']] += 1
+
+    def add_latency(self, record: Optional[Dict[str, Any]], latency_ms: float):
+        if record is not None:
+            record['latency_ms'] = latency_ms
+        self._latencies.append(latency_ms)
+
+    def as_columns(self) -> Dict[str, List]:
+        """열 단위 데이터 (pd.DataFrame(metrics.as_columns()) 로 바로 그래프화)"""
+        keys = ('t', 'frame', 'action', 'stride', 'scale', 'latency_ms', 'display_fps')
+        return {key: [record.get(key) for record in self.records] for key in keys}
+
+    def summary(self) -> Dict[str, Any]:
+        frames = sum(self.counts.values())
+        latencies = np.asarray(self._latencies, dtype=np.float64)
+        last = self.records[-1] if self.records else {}
+        return {
+            'frames': frames,
+            'inferences': self.counts[INFER],
+            'skipped': self.counts[SKIP],
+            'dropped': self.counts[BUSY] + self.counts[STALE],
+            'infer_ratio': self.counts[INFER] / frames if frames else 0.0,
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if latencies.size else 0.0,
+            'latency_p90_ms': float(np.percentile(latencies, 90)) if latencies.size else 0.0,
+            'stride': last.get('stride', 1),
+            'scale': last.get('scale', 1.0),
+            'display_fps': last.get('display_fps') or 0.0,
+            'scale_changes': self.scale_changes,
+        }
+
+
+class AdaptiveInferenceScheduler:
+    """
+    추론 간격/해상도 적응 스케줄러
+
+    Args:
+        target_fps: 목표 표시 FPS (프레임 예산 = 1000 / target_fps ms)
+        latency_slo_ms: 추론 1회 지연시간 목표 (p90 기준)
+        scales: 입력 해상도 배율 후보 (큰 것부터). 해상도가 고정인 모델은 (1.0,)
+        min_stride, max_stride: 추론 간격 범위 (프레임)
+        initial_stride: 지연시간 측정 전 사용할 간격
+        asynchronous: 추론이 별도 스레드에서 돌면 True
+                      (간격은 추론 완료 시점이 결정하므로 stride=min_stride, 진행 중이면 버림)
+        headroom: 프레임 예산 중 추론에 쓸 비율 (나머지는 캡처/그리기)
+        window: 지연시간 통계에 쓸 최근 추론 수
+        stale_after_ms: 프레임 시각이 이만큼 지났으면 버림 (기본: 프레임 예산)
+    """
+
+    def __init__(
+        self,
+        target_fps: float = 30.0,
+        latency_slo_ms: float = 100.0,
+        scales: Sequence[float] = (1.0,),
+        min_stride: int = 1,
+        max_stride: int = 8,
+        initial_stride: Optional[int] = None,
+        asynchronous: bool = False,
+        headroom: float = 0.8,
+        window: int = 15,
+        stale_after_ms: Optional[float] = None,
+        history: int = 2000,
+    ):
+        if target_fps <= 0:
+            raise ValueError("target_fps는 0보다 커야 합니다.")
+        self.target_fps = float(target_fps)
+        self.frame_budget_ms = 1000.0 / self.target_fps
+        self.latency_slo_ms = float(latency_slo_ms)
+        self.scales = tuple(sorted(scales, reverse=True))
+        self.min_stride = max(1, int(min_stride))
+        self.max_stride = max(self.min_stride, int(max_stride))
+        self.asynchronous = asynchronous
+        self.headroom = headroom
+        self.stale_after_ms = self.frame_budget_ms if stale_after_ms is None else stale_after_ms
+
+        self.stride = self.min_stride if asynchronous else min(
+            max(int(initial_stride or self.min_stride), self.min_stride), self.max_stride)
+        self.scale_index = 0
+        self.metrics = InferenceMetrics(history)
+
+        self._window: Deque[float] = deque(maxlen=window)
+        self._frame = 0
+        self._last_infer_frame: Optional[int] = None
+        self._in_flight: Optional[Dict[str, Any]] = None
+        self._last_frame_done: Optional[float] = None
+        self._display_fps: Optional[float] = None
+        self._current: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def scale(self) -> float:
+        """현재 입력 해상도 배율"""
+        return self.scales[self.scale_index]
+
+    @property
+    def in_flight(self) -> bool:
+        return self._in_flight is not None
+
+    def should_infer(self, frame_time: Optional[float] = None, now: Optional[float] = None) -> bool:
+        """
+        이번 프레임에서 추론할지 결정
+
+        Args:
+            frame_time: 프레임 캡처(또는 재생 예정) 시각, time.perf_counter() 기준
+            now: 현재 시각 (기본: time.perf_counter())
+
+        True를 반환하면 추론이 끝난 뒤 record_inference() (또는 measure())를 호출해야 합니다.
+        """
+        now = time.perf_counter() if now is None else now
+        with self._lock:
+            frame = self._frame
+            self._frame += 1
+
+            if self._in_flight is not None:
+                action = BUSY
+            elif frame_time is not None and (now - frame_time) * 1000 > self.stale_after_ms:
+                action = STALE
+            elif self._last_infer_frame is not None and frame - self._last_infer_frame < self.stride:
+                action = SKIP
+            else:
+                action = INFER
+
+            record = {
+                't': now, 'frame': frame, 'action': action, 'stride': self.stride,
+                'scale': self.scale, 'latency_ms': None, 'display_fps': self._display_fps,
+            }
+            self.metrics.add(record)
+            self._current = record
+            if action == INFER:
+                self._last_infer_frame = frame
+                self._in_flight = record
+            return action == INFER
+
+    def record_inference(self, latency_s: float):
+        """추론 지연시간 기록 후 stride/scale 재조정 (추론 스레드에서 호출해도 됨)"""
+        latency_ms = latency_s * 1000
+        with self._lock:
+            self.metrics.add_latency(self._in_flight, latency_ms)
+            self._in_flight = None
+            self._window.append(latency_ms)
+            self._adapt()
+
+    @contextmanager
+    def measure(self):
+        """with 블록의 실행 시간을 추론 지연시간으로 기록"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_inference(time.perf_counter() - start)
+
+    def frame_done(self, now: Optional[float] = None):
+        """표시 루프 1회 종료 (표시 FPS 측정)"""
+        now = time.perf_counter() if now is None else now
+        with self._lock:
+            if self._last_frame_done is not None and now > self._last_frame_done:
+                fps = 1.0 / (now - self._last_frame_done)
+                self._display_fps = fps if self._display_fps is None else 0.9 * self._display_fps + 0.1 * fps
+            self._last_frame_done = now
+            if self._current is not None:
+                self._current['display_fps'] = self._display_fps
+
+    def _adapt(self):
+        if len(self._window) < 3:
+            return
+        latencies = np.asarray(self._window)
+        p50 = float(np.percentile(latencies, 50))
+        p90 = float(np.percentile(latencies, 90))
+
+        # 해상도: SLO 초과 시 낮추고, 한 단계 올려도(비용 ∝ scale²) 여유가 있으면 올림
+        if p90 > self.latency_slo_ms and self.scale_index < len(self.scales) - 1:
+            self._set_scale(self.scale_index + 1)
+            p50 *= (self.scale / self.scales[self.scale_index - 1]) ** 2
+        elif self.scale_index > 0:
+            upscale_cost = (self.scales[self.scale_index - 1] / self.scale) ** 2
+            if p90 * upscale_cost < 0.8 * self.latency_slo_ms:
+                self._set_scale(self.scale_index - 1)
+                p50 *= upscale_cost
+
+        # 간격: 추론 1회 비용을 stride 프레임에 나눠 프레임 예산 안에 들어오도록
+        if not self.asynchronous:
+            stride = math.ceil(p50 / (self.frame_budget_ms * self.headroom))
+            self.stride = min(max(stride, self.min_stride), self.max_stride)
+
+    def _set_scale(self, index: int):
+        self.scale_index = index
+        self.metrics.scale_changes += 1
+        # 해상도가 바뀌면 지연시간 분포도 바뀌므로 새로 측정
+        self._window.clear()
+
+
+class LatestFrameSlot:
+    """
+    크기 1의 우편함: 새 값이 들어오면 기존 값을 덮어씀 (오래된 항목을 큐에 쌓지 않음)
+
+    비동기 추론 스레드에 최신 입력만 넘기거나, 최신 결과만 가져올 때 사용
+    """
+
+    def __init__(self):
+        self._value = None
+        self._has_value = False
+        self._condition = threading.Condition()
+        self.dropped = 0
+
+    def put(self, value):
+        with self._condition:
+            if self._has_value:
+                self.dropped += 1
+            self._value, self._has_value = value, True
+            self._condition.notify()
+
+    def get(self, timeout: Optional[float] = None):
+        """값이 들어올 때까지 대기 후 꺼냄 (timeout이 지나면 None)"""
+        with self._condition:
+            if not self._has_value and not self._condition.wait_for(lambda: self._has_value, timeout):
+                return None
+            value, self._value, self._has_value = self._value, None, False
+            return value
+
+    def get_nowait(self):
+        """값이 있으면 꺼내고 없으면 None"""
+        return self.get(timeout=0)
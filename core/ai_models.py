@@ -3,20 +3,36 @@ AI 모델 관리 클래스
 HuggingFace와 다른 AI 모델들을 관리합니다.
 """
 
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Sequence, Tuple
+
 import torch
 from transformers import pipeline
-from typing import Dict, List, Any, Optional
-import streamlit as st
 from PIL import Image
 import numpy as np
 
+from .model_registry import get_model_registry
+
+# zero-shot 라벨 텍스트 임베딩 캐시 크기 (라벨 세트 단위)
+LABEL_EMBEDDING_CACHE_SIZE = 32
+
+
+def _embedding_tensor(output) -> torch.Tensor:
+    """get_text_features / get_image_features 결과 (transformers 버전에 따라 텐서 또는 ModelOutput)"""
+    return output if isinstance(output, torch.Tensor) else output.pooler_output
+
+
 class AIModelManager:
     """AI 모델 매니저"""
 
     def __init__(self):
         self.device = 0 if torch.cuda.is_available() else -1
-        self.models = {}
+        self.registry = get_model_registry()
         self.model_configs = self._get_model_configs()
+        self._label_embeddings: "OrderedDict[Tuple, torch.Tensor]" = OrderedDict()
+        self._renderers: Dict[int, Any] = {}  # 박스 두께별 AnnotationRenderer
 
     def _get_model_configs(self) -> Dict[str, Dict[str, Any]]:
         """모델 설정 정보"""
@@ -49,34 +65,77 @@ class AIModelManager:
             }
         }
 
-    @st.cache_resource
-    def load_model(_self, task: str, model_name: Optional[str] = None) -> pipeline:
-        """모델 로드 (캐싱 적용)"""
+    def _model_key(self, task: str, model_name: str) -> str:
+        return f"{task}:{model_name}:{self.device}"
+
+    def load_model(self, task: str, model_name: Optional[str] = None, pin: bool = False) -> pipeline:
+        """
+        모델 로드 (프로세스 전역 레지스트리 캐싱)
+
+        메모리 예산(MODEL_CACHE_BUDGET_MB)을 넘으면 오래 사용하지 않은 모델부터 제거
+        로드 실패 시 기본 모델로 한 번만 대체
+        """
+        default_name = self.model_configs[task]['default']
         if model_name is None:
-            model_name = _self.model_configs[task]['default']
+            model_name = default_name
 
-        key = f"{task}:{model_name}"
-        if key not in _self.models:
+        candidates = [model_name] if model_name == default_name else [model_name, default_name]
+        for name in candidates:
             try:
-                _self.models[key] = pipeline(
-                    task,
-                    model=model_name,
-                    device=_self.device
+                return self.registry.get_or_load(
+                    self._model_key(task, name),
+                    lambda: self._create_pipeline(task, name),
+                    pin=pin
                 )
-                print(f"✅ 모델 로드 완료: {model_name}")
             except Exception as e:
-                print(f"❌ 모델 로드 실패: {model_name} - {e}")
-                # 대체 모델 시도
-                if model_name != _self.model_configs[task]['default']:
-                    return _self.load_model(task, _self.model_configs[task]['default'])
-                raise e
+                print(f"❌ 모델 로드 실패: {name} - {e}")
+                if name == default_name:
+                    raise e
+
+    def _create_pipeline(self, task: str, model_name: str) -> pipeline:
+        model = pipeline(task, model=model_name, device=self.device)
+        print(f"✅ 모델 로드 완료: {model_name}")
+        return model
 
-        return _self.models[key]
+    def pin_model(self, task: str, model_name: Optional[str] = None):
+        """자주 쓰는 모델을 로드하고 캐시 제거 대상에서 제외"""
+        self.load_model(task, model_name, pin=True)
 
-    def classify_image(self, image: Image.Image, model_name: Optional[str] = None) -> List[Dict[str, Any]]:
-        """이미지 분류"""
+    def unpin_model(self, task: str, model_name: Optional[str] = None):
+        model_name = model_name or self.model_configs[task]['default']
+        key = self._model_key(task, model_name)
+        if key in self.registry:
+            self.registry.unpin(key)
+
+    def classify_image(self, image: Image.Image, model_name: Optional[str] = None,
+                       backend: str = 'eager', top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        이미지 분류
+
+        Args:
+            backend: 'eager'(pipeline 그대로), 'onnx', 'onnx-int8', 'torchscript'
+                     (core.export_backend로 최초 1회 변환 후 디스크 캐시 사용)
+        """
         classifier = self.load_model('image-classification', model_name)
-        return classifier(image)
+        if backend == 'eager':
+            return classifier(image, top_k=top_k)
+
+        from .export_backend import get_exported_model, hf_preprocess
+
+        processor = classifier.image_processor
+        pixel_values = processor(images=image.convert('RGB'), return_tensors='np')['pixel_values']
+        runner = get_exported_model(
+            classifier.model,
+            model_name or self.model_configs['image-classification']['default'],
+            backend,
+            input_shape=(1,) + pixel_values.shape[1:],
+            preprocess=hf_preprocess(processor)
+        )
+
+        probs = runner(pixel_values=pixel_values).logits.softmax(-1)[0]
+        scores, indices = probs.topk(min(top_k, probs.shape[-1]))
+        id2label = classifier.model.config.id2label
+        return [{'label': id2label[i.item()], 'score': s.item()} for s, i in zip(scores, indices)]
 
     def detect_objects(self, image: Image.Image, model_name: Optional[str] = None) -> List[Dict[str, Any]]:
         """객체 검출"""
@@ -94,39 +153,143 @@ class AIModelManager:
         classifier = self.load_model('zero-shot-image-classification', model_name)
         return classifier(image, candidate_labels=labels)
 
+    # ------------------------------------------------------------------
+    # 배치 API: 이미지 리스트/이터레이터를 받아 결과를 순서대로 yield
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _rgb_stream(images: Iterable[Image.Image]) -> Iterator[Image.Image]:
+        for image in images:
+            yield image.convert('RGB')
+
+    def _run_pipeline_batch(self, task: str, images: Iterable[Image.Image],
+                            model_name: Optional[str], batch_size: int,
+                            **kwargs) -> Iterator[List[Dict[str, Any]]]:
+        """제너레이터를 pipeline에 넘기면 batch_size 단위로 묶어 추론하고 결과를 하나씩 반환"""
+        runner = self.load_model(task, model_name)
+        yield from runner(self._rgb_stream(images), batch_size=batch_size, **kwargs)
+
+    def classify_image_batch(self, images: Iterable[Image.Image], model_name: Optional[str] = None,
+                             batch_size: int = 8, top_k: int = 5) -> Iterator[List[Dict[str, Any]]]:
+        """이미지 분류 (배치)"""
+        return self._run_pipeline_batch('image-classification', images, model_name, batch_size, top_k=top_k)
+
+    def detect_objects_batch(self, images: Iterable[Image.Image], model_name: Optional[str] = None,
+                             batch_size: int = 8) -> Iterator[List[Dict[str, Any]]]:
+        """객체 검출 (배치)"""
+        return self._run_pipeline_batch('object-detection', images, model_name, batch_size)
+
+    def segment_image_batch(self, images: Iterable[Image.Image], model_name: Optional[str] = None,
+                            batch_size: int = 8) -> Iterator[List[Dict[str, Any]]]:
+        """이미지 세그멘테이션 (배치)"""
+        return self._run_pipeline_batch('image-segmentation', images, model_name, batch_size)
+
+    def _encode_labels(self, classifier, labels: Sequence[str],
+                       hypothesis_template: str) -> torch.Tensor:
+        """
+        후보 라벨 텍스트 임베딩 (L2 정규화, 라벨 세트별 캐시)
+        캐시 키는 요청한 이름이 아니라 실제로 로드된 모델 (폴백 모델과 섞이지 않도록)
+        """
+        model = classifier.model
+        loaded = getattr(model.config, 'name_or_path', None) or model.__class__.__name__
+        key = (loaded, tuple(labels), hypothesis_template)
+        if key in self._label_embeddings:
+            self._label_embeddings.move_to_end(key)
+            return self._label_embeddings[key]
+
+        # SigLIP은 학습 시와 같이 max_length 패딩 필요
+        padding = 'max_length' if model.config.model_type == 'siglip' else True
+        tokens = classifier.tokenizer(
+            [hypothesis_template.format(label) for label in labels],
+            padding=padding, return_tensors='pt'
+        ).to(model.device)
+
+        with torch.no_grad():
+            embeddings = _embedding_tensor(model.get_text_features(**tokens))
+        embeddings = embeddings / embeddings.norm(dim=-1, keepdim=True)
+
+        self._label_embeddings[key] = embeddings
+        while len(self._label_embeddings) > LABEL_EMBEDDING_CACHE_SIZE:
+            self._label_embeddings.popitem(last=False)
+        return embeddings
+
+    def zero_shot_classify_batch(self, images: Iterable[Image.Image], labels: List[str],
+                                 model_name: Optional[str] = None, batch_size: int = 8,
+                                 hypothesis_template: str = "This is a photo of {}."
+                                 ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        제로샷 이미지 분류 (배치)
+        라벨 텍스트는 한 번만 인코딩하고, 이미지는 batch_size 단위로 이미지 임베딩만 계산
+        결과 형식은 zero_shot_classify와 동일 ([{'score', 'label'}], 점수 내림차순)
+        """
+        task = 'zero-shot-image-classification'
+        classifier = self.load_model(task, model_name)
+        model = classifier.model
+        text_embeddings = self._encode_labels(classifier, labels, hypothesis_template)
+        is_siglip = model.config.model_type == 'siglip'
+
+        stream = self._rgb_stream(images)
+        while True:
+            batch = list(islice(stream, batch_size))
+            if not batch:
+                break
+
+            pixel_values = classifier.image_processor(images=batch, return_tensors='pt')['pixel_values']
+            with torch.no_grad():
+                image_embeddings = _embedding_tensor(model.get_image_features(pixel_values=pixel_values.to(model.device)))
+                image_embeddings = image_embeddings / image_embeddings.norm(dim=-1, keepdim=True)
+                logits = image_embeddings @ text_embeddings.T * model.logit_scale.exp()
+                if is_siglip:
+                    probs = torch.sigmoid(logits + model.logit_bias)
+                else:
+                    probs = logits.softmax(dim=-1)
+
+            for row in probs.cpu().tolist():
+                ranked = sorted(zip(row, labels), key=lambda x: -x[0])
+                yield [{'score': score, 'label': label} for score, label in ranked]
+
+    def benchmark_batch_throughput(self, images: Sequence[Image.Image], task: str = 'image-classification',
+                                   batch_sizes: Sequence[int] = (1, 8, 32), model_name: Optional[str] = None,
+                                   labels: Optional[List[str]] = None) -> Dict[int, float]:
+        """
+        배치 크기별 처리량 (images/sec) 측정
+        첫 배치(모델 로드, 워밍업)는 측정 전에 한 번 실행
+        """
+        runners = {
+            'image-classification': lambda imgs, bs: self.classify_image_batch(imgs, model_name, bs),
+            'object-detection': lambda imgs, bs: self.detect_objects_batch(imgs, model_name, bs),
+            'image-segmentation': lambda imgs, bs: self.segment_image_batch(imgs, model_name, bs),
+            'zero-shot-image-classification':
+                lambda imgs, bs: self.zero_shot_classify_batch(imgs, labels or ['cat', 'dog'], model_name, bs),
+        }
+        run = runners[task]
+        results = {}
+
+        for batch_size in batch_sizes:
+            for _ in run(images[:batch_size], batch_size):  # 워밍업
+                pass
+            start = time.perf_counter()
+            count = sum(1 for _ in run(images, batch_size))
+            results[batch_size] = count / (time.perf_counter() - start)
+            print(f"📊 {task} batch={batch_size}: {results[batch_size]:.1f} images/sec")
+
+        return results
+
     def draw_detection_boxes(self, image: Image.Image, detections: List[Dict[str, Any]],
                            color: tuple = (255, 0, 0), thickness: int = 2) -> np.ndarray:
-        """검출 박스 그리기"""
-        import cv2
-        img_array = np.array(image)
-
-        for detection in detections:
-            box = detection['box']
-            xmin = int(box['xmin'])
-            ymin = int(box['ymin'])
-            xmax = int(box['xmax'])
-            ymax = int(box['ymax'])
-
-            # 박스 그리기
-            cv2.rectangle(img_array, (xmin, ymin), (xmax, ymax), color, thickness)
-
-            # 레이블 표시
-            label = f"{detection['label']}: {detection['score']:.2f}"
-            label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-            label_ymin = max(ymin, label_size[1] + 10)
-
-            # 레이블 배경
-            cv2.rectangle(img_array,
-                        (xmin, label_ymin - label_size[1] - 10),
-                        (xmin + label_size[0], label_ymin),
-                        color, -1)
-
-            # 레이블 텍스트
-            cv2.putText(img_array, label,
-                      (xmin, label_ymin - 5),
-                      cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-
-        return img_array
+        """검출 박스 그리기 (라벨 이미지는 AnnotationRenderer 스프라이트 캐시에서 재사용)"""
+        from .annotation_renderer import AnnotationRenderer
+
+        # PIL 이미지는 읽기 전용이므로 배열 변환(복사)은 한 번 필요, 그 뒤로는 직접 그림
+        # (RGBA/L 이미지도 3채널로 맞춤: 렌더러는 3채널 라벨 패치를 붙임)
+        img_array = np.array(image.convert('RGB') if isinstance(image, Image.Image) else image)
+        boxes = [[d['box']['xmin'], d['box']['ymin'], d['box']['xmax'], d['box']['ymax']] for d in detections]
+        labels = [f"{d['label']}: {d['score']:.2f}" for d in detections]
+
+        renderer = self._renderers.get(thickness)
+        if renderer is None:
+            renderer = AnnotationRenderer(font_scale=0.5, font_thickness=1, box_thickness=thickness)
+            self._renderers[thickness] = renderer
+        return renderer.render(img_array, boxes, labels, color, inplace=True)
 
     def get_available_models(self, task: str) -> List[str]:
         """사용 가능한 모델 목록 반환"""
@@ -142,5 +305,5 @@ class AIModelManager:
             'task': task,
             'model': model_name,
             'device': 'GPU' if self.device == 0 else 'CPU',
-            'loaded': f"{task}:{model_name}" in self.models
+            'loaded': self._model_key(task, model_name) in self.registry
         }
\ No newline at end of file
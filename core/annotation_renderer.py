@@ -0,0 +1,426 @@
+"""
+탐지 결과 어노테이션 렌더러
+바운딩 박스와 라벨을 프레임 위에 그리는 공용 렌더러입니다.
+
+- 라벨은 (텍스트, 폰트, 크기, 두께) 별로 한 번만 래스터화한 마스크 스프라이트를 캐시해
+  매 프레임 getTextSize/putText 없이 슬라이스 복사로 붙임 (색상은 그릴 때 지정)
+- 박스 좌표/클리핑/라벨 위치는 전체 박스에 대해 numpy로 한 번에 계산
+- 출력 버퍼는 프레임 크기별로 한 번만 할당해 재사용 (frame.copy() 없음),
+  호출자가 원본을 더 쓰지 않으면 inplace=True로 원본에 바로 그림
+- base_unchanged=True: 같은 배경 이미지에 다시 그릴 때 직전 어노테이션 영역만 복원 후 그림
+  (탐지 결과까지 같으면 아무것도 하지 않음). 변경 영역은 dirty_rects로 제공
+- PolygonOverlay: ROI 다각형 반투명 채우기를 다각형 영역에만 적용 (전체 프레임 복사/합성 없음)
+
+사용 예:
+    renderer = AnnotationRenderer(font_scale=0.6, font_thickness=2)
+    annotated = renderer.render(frame, boxes, labels=['person: 0.91', ...], colors=[(0, 255, 0), ...])
+
+    python -m core.annotation_renderer   # 1080p 프레임, 박스 200개 벤치마크
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+Color = Tuple[int, int, int]
+Rect = Tuple[int, int, int, int]  # (x0, y0, x1, y1), 끝 좌표 미포함
+
+
+@dataclass(frozen=True)
+class LabelSprite:
+    """래스터화된 라벨 (글자 픽셀 마스크)"""
+    mask: np.ndarray  # (H, W) uint8, 글자 픽셀 255
+    width: int
+    height: int
+
+
+class LabelSpriteCache:
+    """
+    라벨 스프라이트 LRU 캐시
+
+    'person: 0.87' 같은 라벨은 신뢰도 두 자리까지 포함해도 종류가 많지 않아
+    영상 몇 초 뒤부터는 대부분 캐시에서 꺼내 씁니다.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._sprites: "OrderedDict[tuple, LabelSprite]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str, font: int = cv2.FONT_HERSHEY_SIMPLEX, scale: float = 0.6,
+            thickness: int = 2, padding: int = 10) -> LabelSprite:
+        key = (text, font, scale, thickness, padding)
+        with self._lock:
+            sprite = self._sprites.get(key)
+            if sprite is not None:
+                self._sprites.move_to_end(key)
+                self.hits += 1
+                return sprite
+
+        sprite = self._rasterize(text, font, scale, thickness, padding)
+        with self._lock:
+            self.misses += 1
+            self._sprites[key] = sprite
+            if len(self._sprites) > self.max_entries:
+                self._sprites.popitem(last=False)
+        return sprite
+
+    @staticmethod
+    def _rasterize(text: str, font: int, scale: float, thickness: int, padding: int) -> LabelSprite:
+        (width, height), _ = cv2.getTextSize(text, font, scale, thickness)
+        # 기존 코드와 같은 배치: 배경은 박스 윗변(y1)까지 글자 높이 + padding, 기준선은 y1 - padding/2
+        sprite_height = height + padding + 1
+        canvas = np.zeros((sprite_height, max(width, 1)), dtype=np.uint8)
+        cv2.putText(canvas, text, (0, height + padding // 2), font, scale, 255, thickness)
+        canvas.flags.writeable = False
+        return LabelSprite(canvas, canvas.shape[1], sprite_height)
+
+    def __len__(self) -> int:
+        return len(self._sprites)
+
+    def clear(self):
+        with self._lock:
+            self._sprites.clear()
+
+
+_sprite_cache: Optional[LabelSpriteCache] = None
+
+
+def get_label_sprite_cache() -> LabelSpriteCache:
+    """프로세스 공용 라벨 스프라이트 캐시"""
+    global _sprite_cache
+    if _sprite_cache is None:
+        _sprite_cache = LabelSpriteCache()
+    return _sprite_cache
+
+
+class AnnotationRenderer:
+    """
+    박스 + 라벨 렌더러
+
+    Args:
+        font, font_scale, font_thickness: 라벨 폰트 (cv2.putText 인자와 동일)
+        box_thickness: 박스 선 두께
+        text_color: 라벨 글자색 (label_background=True일 때)
+        label_background: True면 박스 색 배경 위에 text_color 글자,
+                          False면 배경 없이 박스 색 글자 (CCTV 경고 문구 등)
+        label_padding: 라벨 배경의 세로 여백
+        sprite_cache: 라벨 스프라이트 캐시 (기본: 프로세스 공용)
+
+    색상 순서는 프레임과 같아야 합니다 (cv2 프레임은 BGR, PIL에서 온 배열은 RGB).
+    """
+
+    def __init__(
+        self,
+        font: int = cv2.FONT_HERSHEY_SIMPLEX,
+        font_scale: float = 0.6,
+        font_thickness: int = 2,
+        box_thickness: int = 2,
+        text_color: Color = (255, 255, 255),
+        label_background: bool = True,
+        label_padding: int = 10,
+        sprite_cache: Optional[LabelSpriteCache] = None,
+    ):
+        self.font = font
+        self.font_scale = font_scale
+        self.font_thickness = font_thickness
+        self.box_thickness = box_thickness
+        self.text_color = np.asarray(text_color, dtype=np.uint8)
+        self.label_background = label_background
+        self.label_padding = label_padding
+        self.sprites = sprite_cache or get_label_sprite_cache()
+        # (라벨, 색) → 색을 입힌 (H, W, 3) 패치. 붙일 때는 슬라이스 복사 한 번
+        self._patches: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self.max_patches = self.sprites.max_entries
+
+        self._buffer: Optional[np.ndarray] = None
+        self._last_base: Optional[int] = None
+        # 버퍼에 그려진 항목: (정수 좌표, 라벨, 색) → 항목이 차지하는 영역 (박스 + 라벨)
+        self._entries: Dict[tuple, Rect] = {}
+        self.dirty_rects: List[Rect] = []  # 직전 render에서 바뀐 영역 (화면 부분 갱신용)
+        self.stats = {'frames': 0, 'boxes': 0, 'drawn': 0, 'unchanged': 0, 'restored_px': 0}
+
+    def sprite(self, text: str) -> LabelSprite:
+        return self.sprites.get(text, self.font, self.font_scale, self.font_thickness, self.label_padding)
+
+    def patch(self, text: str, color: Color) -> Tuple[LabelSprite, np.ndarray]:
+        """색을 입힌 라벨 패치 (배경 없음 모드에서는 글자색 단색, 마스크로 붙임)"""
+        key = (text, color)
+        patch = self._patches.get(key)
+        sprite = self.sprite(text)
+        if patch is None:
+            patch = np.empty((sprite.height, sprite.width, 3), dtype=np.uint8)
+            patch[...] = color
+            if self.label_background:
+                patch[sprite.mask > 0] = self.text_color
+            self._patches[key] = patch
+            if len(self._patches) > self.max_patches:
+                self._patches.popitem(last=False)
+        else:
+            self._patches.move_to_end(key)
+        return sprite, patch
+
+    def output_buffer(self, frame: np.ndarray) -> np.ndarray:
+        """프레임을 미리 할당된 출력 버퍼로 복사 (크기가 바뀔 때만 새로 할당)"""
+        if self._buffer is None or self._buffer.shape != frame.shape or self._buffer.dtype != frame.dtype:
+            self._buffer = np.empty_like(frame)
+            self._last_base = None
+        np.copyto(self._buffer, frame)
+        return self._buffer
+
+    def render(
+        self,
+        frame: np.ndarray,
+        boxes: Union[np.ndarray, Sequence[Sequence[float]]],
+        labels: Optional[Sequence[Optional[str]]] = None,
+        colors: Union[Color, Sequence[Color], np.ndarray] = (0, 255, 0),
+        inplace: bool = False,
+        base_unchanged: bool = False,
+    ) -> np.ndarray:
+        """
+        박스와 라벨 그리기
+
+        Args:
+            frame: (H, W, 3) uint8 프레임
+            boxes: (N, 4) xyxy 좌표
+            labels: 박스별 라벨 (None이거나 항목이 None/''이면 라벨 없음)
+            colors: 공통 색 하나 또는 박스별 색 (N, 3)
+            inplace: True면 frame에 직접 그림. False면 재사용 출력 버퍼에 그림
+                     (반환된 버퍼는 다음 render 호출 때 덮어써짐)
+            base_unchanged: 직전 호출과 같은 frame(같은 배경)이면 True.
+                            사라진 항목 영역만 원본에서 복원하고, 새 항목과 복원 영역에 겹친 항목만 다시 그림
+                            (겹친 박스의 위아래 순서는 전체 렌더링과 다를 수 있음)
+
+        Returns:
+            어노테이션된 프레임 (inplace면 frame 자체, 아니면 출력 버퍼)
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        count = len(boxes)
+        labels = [label or None for label in labels] if labels is not None else [None] * count
+        colors = np.asarray(colors, dtype=np.uint8)
+        colors = np.broadcast_to(colors, (count, 3)) if colors.ndim == 1 else colors.reshape(-1, 3)
+
+        self.stats['frames'] += 1
+        self.stats['boxes'] += count
+
+        if inplace:
+            out = frame
+            self._last_base = None
+        elif (base_unchanged and self._buffer is not None and self._buffer.shape == frame.shape
+              and self._last_base == id(frame)):
+            return self._render_changes(frame, boxes, labels, colors)
+        else:
+            out = self.output_buffer(frame)
+            self._last_base = id(frame)
+
+        corners, rects, keys = self._layout(out.shape, boxes, labels, colors)
+        self._draw(out, corners, labels, colors, range(count))
+        self._entries = dict(zip(keys, map(tuple, rects.tolist())))
+        self.dirty_rects = list(self._entries.values())
+        return out
+
+    def _render_changes(self, frame: np.ndarray, boxes: np.ndarray, labels: List[Optional[str]],
+                        colors: np.ndarray) -> np.ndarray:
+        """같은 배경 위에서 바뀐 항목만 다시 그림"""
+        out = self._buffer
+        corners, rects, keys = self._layout(out.shape, boxes, labels, colors)
+        current = set(keys)
+        removed = [rect for key, rect in self._entries.items() if key not in current]
+        added = np.array([key not in self._entries for key in keys], dtype=bool)
+        if not removed and not added.any():
+            self.stats['unchanged'] += 1
+            self.dirty_rects = []
+            return out
+
+        for x0, y0, x1, y1 in removed:
+            out[y0:y1, x0:x1] = frame[y0:y1, x0:x1]
+            self.stats['restored_px'] += (x1 - x0) * (y1 - y0)
+
+        # 복원한 영역과 겹치는 기존 항목도 지워졌을 수 있으므로 함께 다시 그림
+        redraw = added
+        if removed and len(rects):
+            erased = np.asarray(removed)
+            overlap = ((rects[:, None, 0] < erased[None, :, 2]) & (erased[None, :, 0] < rects[:, None, 2]) &
+                       (rects[:, None, 1] < erased[None, :, 3]) & (erased[None, :, 1] < rects[:, None, 3]))
+            redraw = added | overlap.any(axis=1)
+        indices = np.flatnonzero(redraw)
+        self._draw(out, corners, labels, colors, indices)
+
+        self._entries = dict(zip(keys, map(tuple, rects.tolist())))
+        self.dirty_rects = removed + [tuple(rects[i]) for i in indices.tolist()]
+        return out
+
+    def _layout(self, shape: Tuple[int, ...], boxes: np.ndarray, labels: List[Optional[str]],
+                colors: np.ndarray) -> Tuple[np.ndarray, np.ndarray, List[tuple]]:
+        """
+        전체 박스의 정수 좌표 (N, 4), 항목 영역 (N, 4: 박스 선 + 라벨), 항목 키를 한 번에 계산
+        """
+        height, width = shape[:2]
+        corners = boxes.astype(np.int32)
+        corners[:, [0, 2]] = np.clip(corners[:, [0, 2]], 0, width - 1)
+        corners[:, [1, 3]] = np.clip(corners[:, [1, 3]], 0, height - 1)
+
+        margin = self.box_thickness // 2 + 1
+        rects = np.stack([
+            np.maximum(corners[:, 0] - margin, 0), np.maximum(corners[:, 1] - margin, 0),
+            np.minimum(corners[:, 2] + margin + 1, width), np.minimum(corners[:, 3] + margin + 1, height),
+        ], axis=1)
+
+        # 라벨은 박스 위에 붙이고, 화면 위로 벗어나면 박스 안쪽으로 내림
+        has_label = np.array([label is not None for label in labels], dtype=bool)
+        if has_label.any():
+            sizes = np.array([(s.width, s.height) for s in (self.sprite(label) for label in labels if label)])
+            label_x1 = np.minimum(corners[has_label, 0] + sizes[:, 0], width)
+            label_y0 = np.maximum(corners[has_label, 1] - sizes[:, 1] + 1, 0)
+            label_y1 = np.minimum(label_y0 + sizes[:, 1], height)
+            rects[has_label, 1] = np.minimum(rects[has_label, 1], label_y0)
+            rects[has_label, 2] = np.maximum(rects[has_label, 2], label_x1)
+            rects[has_label, 3] = np.maximum(rects[has_label, 3], label_y1)
+
+        keys = list(zip(map(tuple, corners.tolist()), labels, map(tuple, colors.tolist())))
+        return corners, rects, keys
+
+    def _draw(self, out: np.ndarray, corners: np.ndarray, labels: List[Optional[str]],
+              colors: np.ndarray, indices) -> None:
+        height, width = out.shape[:2]
+        corner_list = corners.tolist()
+        color_list = colors.tolist()
+        indices = list(indices)
+        self.stats['drawn'] += len(indices)
+
+        for i in indices:
+            x1, y1, x2, y2 = corner_list[i]
+            cv2.rectangle(out, (x1, y1), (x2, y2), color_list[i], self.box_thickness)
+
+        for i in indices:
+            label = labels[i]
+            if label is None:
+                continue
+            x1, y1 = corner_list[i][:2]
+            sprite, patch = self.patch(label, tuple(color_list[i]))
+            top = max(y1 - sprite.height + 1, 0)
+            bottom = min(top + sprite.height, height)
+            right = min(x1 + sprite.width, width)
+            if right <= x1 or bottom <= top:
+                continue
+            h, w = bottom - top, right - x1
+            if self.label_background:
+                out[top:bottom, x1:right] = patch[:h, :w]
+            else:
+                cv2.copyTo(patch[:h, :w], sprite.mask[:h, :w], out[top:bottom, x1:right])
+
+
+class PolygonOverlay:
+    """
+    반투명 다각형 채우기 (ROI 표시 등)
+
+    frame.copy() + fillPoly + addWeighted(전체 프레임) 대신
+    다각형의 외접 사각형 안에서, 다각형 픽셀에만 합성합니다. 마스크는 한 번만 계산.
+    """
+
+    def __init__(self, polygon: np.ndarray, color: Color, alpha: float = 0.3):
+        self.polygon = np.asarray(polygon, dtype=np.int32).reshape(-1, 2)
+        self.color = color
+        self.alpha = alpha
+        x, y, w, h = cv2.boundingRect(self.polygon)
+        self.rect = (x, y, x + w, y + h)
+        self._mask = np.zeros((h, w), dtype=np.uint8)
+        cv2.fillPoly(self._mask, [self.polygon - [x, y]], 255)
+        self._fill = np.empty((h, w, 3), dtype=np.uint8)
+        self._fill[...] = color
+
+    def apply(self, frame: np.ndarray) -> np.ndarray:
+        """frame에 직접 합성 (다각형이 화면 밖으로 나가면 잘라서 적용)"""
+        x0, y0, x1, y1 = self.rect
+        fx0, fy0 = max(x0, 0), max(y0, 0)
+        fx1, fy1 = min(x1, frame.shape[1]), min(y1, frame.shape[0])
+        if fx1 <= fx0 or fy1 <= fy0:
+            return frame
+        roi = frame[fy0:fy1, fx0:fx1]
+        local = (slice(fy0 - y0, fy1 - y0), slice(fx0 - x0, fx1 - x0))
+        blended = cv2.addWeighted(roi, 1 - self.alpha, self._fill[local], self.alpha, 0)
+        cv2.copyTo(blended, self._mask[local], roi)
+        return frame
+
+
+def _draw_naive(frame: np.ndarray, boxes: np.ndarray, labels: Sequence[str], colors: np.ndarray) -> np.ndarray:
+    """비교용: 박스마다 getTextSize/putText를 호출하던 기존 방식"""
+    annotated = frame.copy()
+    for (x1, y1, x2, y2), label, color in zip(boxes.astype(int).tolist(), labels, colors.tolist()):
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 2)
+        size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
+        cv2.rectangle(annotated, (x1, y1 - size[1] - 10), (x1 + size[0], y1), color, -1)
+        cv2.putText(annotated, label, (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    return annotated
+
+
+def benchmark_renderer(num_boxes: int = 200, size: Tuple[int, int] = (1920, 1080),
+                       frames: int = 30, changed: int = 10, seed: int = 0) -> Dict[str, Any]:
+    """
+    렌더러 벤치마크 (프레임당 ms)
+
+    - naive: frame.copy() + 박스마다 getTextSize/rectangle/putText
+    - buffer: 재사용 출력 버퍼 + 스프라이트 캐시
+    - inplace: 원본에 직접 그림 (복사 없음)
+    - changed_only: 같은 배경에서 박스 changed개만 바뀔 때 (base_unchanged=True)
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    frame = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    names = ['person', 'car', 'bicycle', 'dog', 'chair', 'laptop', 'book', 'cell phone']
+    palette = rng.integers(0, 255, (len(names), 3), dtype=np.uint8)
+
+    def detections():
+        xy = rng.uniform([0, 40], [width - 200, height - 200], (num_boxes, 2))
+        wh = rng.uniform(30, 200, (num_boxes, 2))
+        classes = rng.integers(0, len(names), num_boxes)
+        confidences = rng.uniform(0.25, 1.0, num_boxes)
+        labels = [f"{names[c]}: {p:.2f}" for c, p in zip(classes, confidences)]
+        return np.hstack([xy, xy + wh]).astype(np.float32), labels, palette[classes]
+
+    sequence = [detections() for _ in range(frames)]
+    renderer = AnnotationRenderer(sprite_cache=LabelSpriteCache())
+
+    def timed(fn) -> float:
+        start = time.perf_counter()
+        for item in sequence:
+            fn(*item)
+        return (time.perf_counter() - start) / frames * 1000
+
+    results = {'boxes': num_boxes, 'size': f"{width}x{height}"}
+    results['naive_ms'] = timed(lambda b, l, c: _draw_naive(frame, b, l, c))
+    results['buffer_cold_ms'] = timed(lambda b, l, c: renderer.render(frame, b, l, c))
+    results['buffer_ms'] = timed(lambda b, l, c: renderer.render(frame, b, l, c))
+    scratch = frame.copy()
+    results['inplace_ms'] = timed(lambda b, l, c: renderer.render(scratch, b, l, c, inplace=True))
+
+    # 같은 배경에서 일부 박스만 바뀌는 경우 (정지 화면, 임계값 슬라이더 등)
+    boxes, labels, colors = sequence[0]
+    renderer.render(frame, boxes, labels, colors)
+    variants = []
+    for _ in range(frames):
+        moved = boxes.copy()
+        moved[:changed] += rng.uniform(-5, 5, (changed, 1)).astype(np.float32)
+        variants.append((moved, labels, colors))
+    start = time.perf_counter()
+    for moved, moved_labels, moved_colors in variants:
+        renderer.render(frame, moved, moved_labels, moved_colors, base_unchanged=True)
+    results['changed_only_ms'] = (time.perf_counter() - start) / frames * 1000
+
+    reference = _draw_naive(frame, *sequence[-1])
+    rendered = renderer.render(frame, *sequence[-1])
+    results['mismatch_ratio'] = float(np.mean(np.any(reference != rendered, axis=2)))
+    results['sprites'] = len(renderer.sprites)
+    return results
+
+
+if __name__ == "__main__":
+    for key, value in benchmark_renderer().items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
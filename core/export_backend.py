@@ -0,0 +1,356 @@
+"""
+분류 모델 Export / 실행 백엔드
+PyTorch 분류 모델(torchvision, HuggingFace)을 한 번 변환해 디스크에 캐시하고
+CPU 배포용 런타임으로 실행합니다.
+
+- onnx: ONNX Runtime (그래프 최적화 적용된 모델을 캐시)
+- onnx-int8: ONNX Runtime + 정적 int8 양자화 (data/ 이미지로 calibration)
+- torchscript: torch.jit.trace + freeze
+
+캐시 경로: .cache/exported_models/{모델}_{해상도}_opset{N}_{가중치 해시}/
+    model.onnx, model.opt.onnx, model.int8.onnx, model.ts
+
+사용 예:
+    runner = get_exported_model(model, 'google/vit-base-patch16-224', backend='onnx')
+    outputs = runner(pixel_values=inputs['pixel_values'])   # eager 모델과 같은 호출 방식
+    outputs.logits
+"""
+
+import copy
+import hashlib
+import json
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import torch
+import torch.nn as nn
+from PIL import Image
+
+BACKENDS = ('eager', 'onnx', 'onnx-int8', 'torchscript')
+DEFAULT_OPSET = 17
+DEFAULT_CACHE_DIR = Path('.cache/exported_models')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class _LogitsWrapper(nn.Module):
+    """HuggingFace 모델 출력(ModelOutput)에서 logits 텐서만 반환 (export용)"""
+
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        return _logits(self.model(pixel_values=pixel_values))
+
+
+def _logits(outputs) -> torch.Tensor:
+    """모델 출력에서 비교/변환 대상 텐서 추출 (logits가 없으면 첫 번째 출력)"""
+    if isinstance(outputs, torch.Tensor):
+        return outputs
+    return outputs.logits if hasattr(outputs, 'logits') else outputs[0]
+
+
+def _is_hf_model(model: nn.Module) -> bool:
+    return hasattr(model, 'config') and hasattr(model.config, 'id2label')
+
+
+def _cpu_module(model: nn.Module) -> nn.Module:
+    """변환은 CPU에서 수행 (GPU에 있는 원본 모델은 옮기지 않고 복사본 사용)"""
+    if all(p.device.type == 'cpu' for p in model.parameters()):
+        return model.eval()
+    return copy.deepcopy(model).cpu().eval()
+
+
+_WEIGHTS_HASH_ATTR = '_export_weights_hash'
+
+
+def weights_hash(model: nn.Module) -> str:
+    """
+    state_dict 내용 해시 (같은 model_id라도 가중치가 바뀌면 다른 캐시 사용)
+    텐서 버전 카운터가 그대로면 이전 해시를 재사용 (요청마다 전체 가중치를 해시하지 않음)
+    """
+    state = model.state_dict()
+    versions = tuple(t._version for t in state.values())
+    cached = getattr(model, _WEIGHTS_HASH_ATTR, None)
+    if cached is not None and cached[0] == versions:
+        return cached[1]
+
+    digest = hashlib.sha1()
+    for name, tensor in state.items():
+        digest.update(f"{name}|{tensor.dtype}|{tuple(tensor.shape)}".encode())
+        digest.update(tensor.detach().cpu().reshape(-1).view(torch.uint8).numpy().tobytes())
+    value = digest.hexdigest()[:12]
+    setattr(model, _WEIGHTS_HASH_ATTR, (versions, value))
+    return value
+
+
+def _cache_dir(model_id: str, input_shape: Sequence[int], opset: int,
+               cache_root: Optional[Path] = None, weights: str = '') -> Path:
+    safe_id = model_id.replace('/', '_')
+    name = f"{safe_id}_{input_shape[-2]}x{input_shape[-1]}_opset{opset}"
+    if weights:
+        name += f"_{weights}"
+    path = Path(cache_root or DEFAULT_CACHE_DIR) / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+# ----------------------------------------------------------------------
+# 변환
+# ----------------------------------------------------------------------
+def export_onnx(model: nn.Module, path: Path, example_input: torch.Tensor,
+                opset: int = DEFAULT_OPSET) -> Path:
+    """ONNX 변환 (배치 축은 동적)"""
+    model = _cpu_module(model)
+    module = (_LogitsWrapper(model) if _is_hf_model(model) else model).eval()
+    kwargs = dict(
+        input_names=['pixel_values'],
+        output_names=['logits'],
+        dynamic_axes={'pixel_values': {0: 'batch'}, 'logits': {0: 'batch'}},
+        opset_version=opset,
+    )
+    with torch.inference_mode():
+        try:
+            torch.onnx.export(module, (example_input.cpu(),), str(path), dynamo=False, **kwargs)
+        except TypeError:  # dynamo 인자가 없는 이전 버전
+            torch.onnx.export(module, (example_input.cpu(),), str(path), **kwargs)
+    return path
+
+
+def optimize_onnx(src: Path, dst: Path) -> Path:
+    """ONNX Runtime 그래프 최적화(상수 폴딩, 연산 융합) 결과를 파일로 저장"""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    options.optimized_model_filepath = str(dst)
+    ort.InferenceSession(str(src), options, providers=['CPUExecutionProvider'])
+    return dst
+
+
+def calibration_images(data_dir: str = 'data', limit: int = 32) -> List[Image.Image]:
+    """data/ 폴더의 이미지로 calibration 세트 구성"""
+    files = sorted(p for p in Path(data_dir).rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS)
+    return [Image.open(p).convert('RGB') for p in files[:limit]]
+
+
+def quantize_onnx_int8(src: Path, dst: Path, calibration_inputs: Iterable[np.ndarray]) -> Path:
+    """
+    정적 int8 양자화 (QDQ 형식, 채널별 가중치 양자화)
+
+    Args:
+        calibration_inputs: (1, C, H, W) float32 배열들 — 활성화 범위 추정용
+    """
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self, inputs):
+            self._inputs = iter({'pixel_values': x} for x in inputs)
+
+        def get_next(self):
+            return next(self._inputs, None)
+
+    prepared = dst.with_suffix('.prep.onnx')
+    quant_pre_process(str(src), str(prepared), skip_symbolic_shape=True)
+    quantize_static(
+        str(prepared), str(dst), _Reader(list(calibration_inputs)),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+    prepared.unlink(missing_ok=True)
+    return dst
+
+
+def export_torchscript(model: nn.Module, path: Path, example_input: torch.Tensor) -> Path:
+    model = _cpu_module(model)
+    module = (_LogitsWrapper(model) if _is_hf_model(model) else model).eval()
+    with torch.inference_mode():
+        traced = torch.jit.trace(module, example_input.cpu(), strict=False)
+        traced = torch.jit.freeze(traced)
+    traced.save(str(path))
+    return path
+
+
+# ----------------------------------------------------------------------
+# 실행
+# ----------------------------------------------------------------------
+class ExportedModel:
+    """
+    변환된 모델 실행기
+    eager 모델과 같은 방식으로 호출:
+        HuggingFace: runner(pixel_values=x).logits
+        torchvision: runner(x) → logits 텐서
+    """
+
+    def __init__(self, backend: str, path: Path, hf_outputs: bool, threads: Optional[int] = None):
+        self.backend = backend
+        self.path = path
+        self.hf_outputs = hf_outputs
+
+        if backend == 'torchscript':
+            self._module = torch.jit.load(str(path))
+            self._session = None
+        else:
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            # 캐시된 모델은 이미 최적화되어 있으므로 기본 최적화만 적용
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+            if threads:
+                options.intra_op_num_threads = threads
+            self._session = ort.InferenceSession(str(path), options, providers=['CPUExecutionProvider'])
+            self._module = None
+
+    def run(self, pixel_values) -> torch.Tensor:
+        if self._module is not None:
+            with torch.inference_mode():
+                return self._module(torch.as_tensor(pixel_values))
+
+        if isinstance(pixel_values, torch.Tensor):
+            pixel_values = pixel_values.detach().cpu().numpy()
+        logits = self._session.run(None, {'pixel_values': np.ascontiguousarray(pixel_values, dtype=np.float32)})[0]
+        return torch.from_numpy(logits)
+
+    def __call__(self, *args, pixel_values=None, **kwargs):
+        logits = self.run(pixel_values if pixel_values is not None else args[0])
+        return SimpleNamespace(logits=logits) if self.hf_outputs else logits
+
+    def eval(self):
+        return self
+
+
+_runners: Dict[tuple, ExportedModel] = {}
+
+
+def get_exported_model(model: nn.Module, model_id: str, backend: str = 'onnx',
+                       input_shape: Sequence[int] = (1, 3, 224, 224), opset: int = DEFAULT_OPSET,
+                       optimize: bool = True, calibration_data: str = 'data',
+                       preprocess: Optional[Callable[[Image.Image], np.ndarray]] = None,
+                       cache_root: Optional[str] = None, threads: Optional[int] = None):
+    """
+    변환된 모델 실행기 반환 (최초 1회 변환, 이후 디스크 캐시 사용)
+
+    Args:
+        model: eager PyTorch 모델 (HuggingFace 또는 torchvision)
+        model_id: 캐시 키에 사용할 모델 이름 (가중치 해시와 함께 사용)
+        backend: 'eager' | 'onnx' | 'onnx-int8' | 'torchscript'
+        optimize: ONNX 그래프 최적화 결과를 캐시해 사용
+        preprocess: int8 calibration용 이미지 전처리 (PIL → (1, C, H, W) float32)
+
+    Returns:
+        backend='eager'면 model 그대로, 나머지는 ExportedModel
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend} (choose from {BACKENDS})")
+    if backend == 'eager':
+        return model
+
+    weights = weights_hash(model)
+    key = (model_id, weights, backend, tuple(input_shape), opset, optimize, threads)
+    if key in _runners:
+        return _runners[key]
+
+    directory = _cache_dir(model_id, input_shape, opset, cache_root, weights)
+    example = torch.randn(*input_shape)
+    hf_outputs = _is_hf_model(model)
+
+    if backend == 'torchscript':
+        path = directory / 'model.ts'
+        if not path.exists():
+            export_torchscript(model, path, example)
+    else:
+        path = directory / 'model.onnx'
+        if not path.exists():
+            export_onnx(model, path, example, opset)
+
+        if optimize and backend == 'onnx':
+            optimized = directory / 'model.opt.onnx'
+            if not optimized.exists():
+                optimize_onnx(path, optimized)
+            path = optimized
+
+        if backend == 'onnx-int8':
+            quantized = directory / 'model.int8.onnx'
+            if not quantized.exists():
+                if preprocess is None:
+                    raise ValueError("onnx-int8 변환에는 calibration용 preprocess 함수가 필요합니다")
+                images = calibration_images(calibration_data)
+                if not images:
+                    raise ValueError(f"calibration 이미지가 없습니다: {calibration_data}")
+                quantize_onnx_int8(path, quantized, (preprocess(img) for img in images))
+            path = quantized
+
+    (directory / 'export_info.json').write_text(json.dumps({
+        'model_id': model_id,
+        'weights_hash': weights,
+        'input_shape': list(input_shape),
+        'opset': opset,
+        'torch': torch.__version__,
+    }, indent=2))
+
+    runner = ExportedModel(backend, path, hf_outputs, threads)
+    _runners[key] = runner
+    return runner
+
+
+def hf_preprocess(processor) -> Callable[[Image.Image], np.ndarray]:
+    """HuggingFace image processor → calibration 전처리 함수"""
+    def preprocess(image: Image.Image) -> np.ndarray:
+        return processor(images=image, return_tensors='np')['pixel_values'].astype(np.float32)
+    return preprocess
+
+
+def benchmark_backends(model: nn.Module, model_id: str, example_input: torch.Tensor,
+                       backends: Sequence[str] = BACKENDS, warmup: int = 5, iters: int = 20,
+                       **export_kwargs) -> List[Dict]:
+    """
+    백엔드별 지연시간과 eager 대비 출력 차이 비교
+
+    Returns:
+        [{'backend', 'p50_ms', 'mean_ms', 'speedup', 'max_abs_diff', 'top1_agree'}]
+    """
+    model = _cpu_module(model)
+    example_input = example_input.cpu()
+    hf = _is_hf_model(model)
+
+    def logits_of(runner, x):
+        with torch.inference_mode():
+            return _logits(runner(pixel_values=x) if hf else runner(x))
+
+    export_kwargs.setdefault('input_shape', tuple(example_input.shape))
+    reference = logits_of(model, example_input)
+    results = []
+
+    for backend in backends:
+        try:
+            runner = get_exported_model(model, model_id, backend, **export_kwargs)
+            for _ in range(warmup):
+                logits_of(runner, example_input)
+            timings = []
+            for _ in range(iters):
+                start = time.perf_counter_ns()
+                logits = logits_of(runner, example_input)
+                timings.append((time.perf_counter_ns() - start) / 1e6)
+
+            results.append({
+                'backend': backend,
+                'p50_ms': float(np.percentile(timings, 50)),
+                'mean_ms': float(np.mean(timings)),
+                'max_abs_diff': float((logits - reference).abs().max()),
+                'top1_agree': float((logits.argmax(-1) == reference.argmax(-1)).float().mean()),
+            })
+        except Exception as e:
+            results.append({'backend': backend, 'error': str(e)})
+
+    eager = next((r for r in results if r['backend'] == 'eager' and 'p50_ms' in r), None)
+    for r in results:
+        if eager and 'p50_ms' in r:
+            r['speedup'] = eager['p50_ms'] / r['p50_ms']
+
+    return results
@@ -0,0 +1,235 @@
+"""
+모델 레지스트리
+프로세스 전역에서 로드된 모델을 메모리 예산 안에서 관리합니다 (Streamlit 없이도 동작).
+
+- 크기 추정: 파라미터 + 버퍼 바이트 수 (HF pipeline은 pipeline.model, diffusers 파이프라인은 components 기준)
+- LRU 제거: 예산을 넘으면 가장 오래 사용하지 않은 모델부터 레지스트리 참조를 지우고 gc 실행
+  (텐서를 직접 비우지 않음: 밖에서 아직 쓰는 모델은 마지막 참조가 사라질 때 해제됨)
+- pin/unpin: 자주 쓰는 모델은 제거 대상에서 제외
+- hold: 사용 중인 동안만 제거 대상에서 제외 (참조 카운트, 여러 세션이 동시에 잡아도 안전)
+- 로드는 키별 잠금에서 수행: 큰 모델을 로드(다운로드)하는 동안에도 다른 키의 적중/hold/info는 막히지 않음
+- 통계: 로드 / 제거 / 적중 / 미스 횟수
+
+메모리 예산은 MODEL_CACHE_BUDGET_MB 환경 변수로 지정 (기본 4096MB)
+
+사용 예:
+    registry = get_model_registry()
+    model = registry.get_or_load('image-classification:google/vit-base-patch16-224',
+                                 lambda: pipeline('image-classification', model=...))
+"""
+
+import gc
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+import torch
+import torch.nn as nn
+
+DEFAULT_BUDGET_MB = 4096
+
+
+def _modules_of(obj: Any) -> List[nn.Module]:
+    """
+    캐시 대상 객체에 포함된 nn.Module 목록
+    nn.Module 그대로, HF pipeline은 .model, diffusers 파이프라인은 components의 모듈들
+    """
+    if isinstance(obj, nn.Module):
+        return [obj]
+    components = getattr(obj, 'components', None)
+    if isinstance(components, dict):
+        return [m for m in components.values() if isinstance(m, nn.Module)]
+    module = getattr(obj, 'model', None)
+    return [module] if isinstance(module, nn.Module) else []
+
+
+def estimate_model_bytes(obj: Any) -> int:
+    """모델이 차지하는 텐서 메모리 추정 (파라미터 + 버퍼)"""
+    seen = set()
+    total = 0
+    for module in _modules_of(obj):
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            # weight tying 등으로 공유되는 텐서는 한 번만 계산
+            if tensor.data_ptr() in seen:
+                continue
+            seen.add(tensor.data_ptr())
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class _Entry:
+    __slots__ = ('value', 'nbytes', 'pinned', 'holds')
+
+    def __init__(self, value: Any, nbytes: int, pinned: bool):
+        self.value = value
+        self.nbytes = nbytes
+        self.pinned = pinned
+        self.holds = 0
+
+
+class ModelRegistry:
+    """
+    메모리 예산 기반 LRU 모델 캐시
+
+    Args:
+        budget_bytes: 캐시가 유지할 최대 모델 메모리 (pin된 모델 포함 합계)
+
+    제거된 모델을 다른 세션이나 파이프라인(from_pipe 등)이 아직 참조하고 있으면
+    그 참조가 사라질 때까지 메모리는 남아 있습니다. 사용 중인 모델을 망가뜨리지 않기 위함.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        # 키별 로드 잠금 (모델 키 수만큼만 생기므로 제거하지 않음)
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.stats = {'loads': 0, 'evictions': 0, 'hits': 0, 'misses': 0}
+
+    def get_or_load(self, key: str, loader: Callable[[], Any], pin: bool = False) -> Any:
+        """
+        캐시된 모델 반환, 없으면 loader()로 로드 후 등록
+
+        같은 키에 대한 동시 요청은 한 번만 로드 (키별 잠금 안에서 로드)
+        loader()는 레지스트리 전역 잠금 밖에서 실행되므로 다른 키 요청을 막지 않음
+        """
+        with self._lock:
+            value = self._hit(key, pin)
+            if value is not None:
+                return value
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                # 기다리는 동안 다른 스레드가 로드를 끝냈을 수 있음
+                value = self._hit(key, pin)
+                if value is not None:
+                    return value
+                self.stats['misses'] += 1
+
+            value = loader()
+            nbytes = estimate_model_bytes(value)
+
+            with self._lock:
+                self.stats['loads'] += 1
+                self._entries[key] = _Entry(value, nbytes, pin)
+                self._evict(keep=key)
+            return value
+
+    def _hit(self, key: str, pin: bool) -> Any:
+        """캐시 적중이면 값 반환 (LRU 갱신), 없으면 None. self._lock 안에서 호출"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self.stats['hits'] += 1
+        self._entries.move_to_end(key)
+        entry.pinned = entry.pinned or pin
+        return entry.value
+
+    def _evict(self, keep: Optional[str] = None):
+        """예산을 넘는 동안 LRU 순서로 pin되지 않은 모델 제거"""
+        evicted = False
+        for key in list(self._entries):
+            if self.total_bytes <= self.budget_bytes:
+                break
+            entry = self._entries[key]
+            if entry.pinned or entry.holds or key == keep:
+                continue
+            self._remove(key)
+            evicted = True
+
+        if evicted:
+            self._collect()
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self.stats['evictions'] += 1
+        print(f"♻️ 모델 캐시에서 제거: {key} ({entry.nbytes / 2**20:.0f}MB)")
+
+    @staticmethod
+    def _collect():
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def evict(self, key: str) -> bool:
+        """지정한 모델 제거 (pin 여부와 무관)"""
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            self._collect()
+            return True
+
+    @contextmanager
+    def hold(self, *keys: str):
+        """with 블록 동안 지정한 모델을 제거 대상에서 제외 (레지스트리에 없는 키는 무시)"""
+        with self._lock:
+            held = [self._entries[key] for key in keys if key in self._entries]
+            for entry in held:
+                entry.holds += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                for entry in held:
+                    entry.holds -= 1
+                self._evict()
+
+    def pin(self, key: str):
+        with self._lock:
+            self._entries[key].pinned = True
+
+    def unpin(self, key: str):
+        with self._lock:
+            self._entries[key].pinned = False
+            self._evict()
+
+    def set_budget(self, budget_bytes: int):
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+            self._collect()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def keys(self) -> List[str]:
+        return list(self._entries)
+
+    def info(self) -> Dict[str, Any]:
+        """통계 + 현재 캐시 상태"""
+        with self._lock:
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'total_mb': self.total_bytes / 2**20,
+                'budget_mb': self.budget_bytes / 2**20,
+                'models': [
+                    {'key': key, 'mb': entry.nbytes / 2**20, 'pinned': entry.pinned, 'holds': entry.holds}
+                    for key, entry in self._entries.items()
+                ],
+            }
+
+
+_registry: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    """프로세스 전역 모델 레지스트리 반환"""
+    global _registry
+    if _registry is None:
+        budget_mb = float(os.environ.get('MODEL_CACHE_BUDGET_MB', DEFAULT_BUDGET_MB))
+        _registry = ModelRegistry(int(budget_mb * 2**20))
+    return _registry
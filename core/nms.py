@@ -0,0 +1,291 @@
+"""
+NMS (Non-Maximum Suppression) 라이브러리
+(N, 4) 박스 배열과 (N,) 점수 배열을 받아 유지할 인덱스를 반환합니다.
+
+- nms: 기본 NMS
+- batched_nms: 클래스별 NMS (좌표 오프셋 트릭으로 한 번에 처리)
+- soft_nms: Gaussian / Linear Soft-NMS
+- diou_nms: DIoU-NMS (중심점 거리 페널티)
+
+박스 형식은 [x1, y1, x2, y2]입니다.
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def box_area(boxes: np.ndarray) -> np.ndarray:
+    """박스 면적 (N,)"""
+    return np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+
+
+def box_iou(box: np.ndarray, boxes: np.ndarray, area: Optional[float] = None,
+            areas: Optional[np.ndarray] = None) -> np.ndarray:
+    """박스 하나와 (N, 4) 박스들 사이의 IoU (N,)"""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    if area is None:
+        area = box_area(box[None])[0]
+    if areas is None:
+        areas = box_area(boxes)
+
+    union = area + areas - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection, dtype=np.float64),
+                     where=union > 0)
+
+
+def box_iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """(N, 4)와 (M, 4) 박스 사이의 IoU 행렬 (N, M)"""
+    lt = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    rb = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    wh = np.clip(rb - lt, 0, None)
+    intersection = wh[..., 0] * wh[..., 1]
+    union = box_area(boxes_a)[:, None] + box_area(boxes_b)[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection, dtype=np.float64),
+                     where=union > 0)
+
+
+def _diou_penalty(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """DIoU 페널티: 중심점 거리² / 두 박스를 감싸는 최소 박스 대각선²"""
+    center = (box[:2] + box[2:]) / 2
+    centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+    center_dist = np.sum((centers - center) ** 2, axis=1)
+
+    enclose_lt = np.minimum(box[:2], boxes[:, :2])
+    enclose_rb = np.maximum(box[2:], boxes[:, 2:])
+    diagonal = np.sum((enclose_rb - enclose_lt) ** 2, axis=1)
+
+    return np.divide(center_dist, diagonal, out=np.zeros_like(center_dist, dtype=np.float64),
+                     where=diagonal > 0)
+
+
+def _greedy_nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float,
+                diou_beta: Optional[float] = None) -> np.ndarray:
+    """
+    점수 순 greedy NMS
+    매 반복마다 최고 박스와 나머지 전체의 IoU를 한 번에 계산
+    """
+    boxes = np.asarray(boxes, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float64)
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    order = np.argsort(-scores, kind='stable')
+    areas = box_area(boxes)
+    keep = []
+
+    while order.size > 0:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        if rest.size == 0:
+            break
+
+        overlap = box_iou(boxes[best], boxes[rest], areas[best], areas[rest])
+        if diou_beta is not None:
+            overlap = overlap - _diou_penalty(boxes[best], boxes[rest]) ** diou_beta
+
+        order = rest[overlap <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.int64)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = 0.5,
+        score_threshold: Optional[float] = None) -> np.ndarray:
+    """
+    기본 NMS
+
+    Returns:
+        유지할 박스 인덱스 (점수 내림차순)
+    """
+    scores = np.asarray(scores)
+    if score_threshold is not None:
+        candidates = np.flatnonzero(scores >= score_threshold)
+        return candidates[_greedy_nms(np.asarray(boxes)[candidates], scores[candidates], iou_threshold)]
+    return _greedy_nms(boxes, scores, iou_threshold)
+
+
+def diou_nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = 0.5,
+             beta: float = 1.0) -> np.ndarray:
+    """
+    DIoU-NMS: IoU 대신 DIoU = IoU - (d²/c²)^beta로 억제 판단
+    중심이 멀리 떨어진 겹친 박스(다른 객체)는 살아남음
+    """
+    return _greedy_nms(boxes, scores, iou_threshold, diou_beta=beta)
+
+
+def batched_nms(boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray,
+                iou_threshold: float = 0.5, method: str = 'nms') -> np.ndarray:
+    """
+    클래스별 NMS
+    클래스마다 좌표를 충분히 멀리 평행이동시켜 다른 클래스끼리는 겹치지 않게 한 뒤 한 번에 처리
+
+    Args:
+        method: 'nms' 또는 'diou'
+    """
+    boxes = np.asarray(boxes, dtype=np.float64)
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    offsets = np.asarray(class_ids, dtype=np.float64) * (boxes.max() - boxes.min() + 1)
+    shifted = boxes + offsets[:, None]
+
+    if method == 'diou':
+        return diou_nms(shifted, scores, iou_threshold)
+    return nms(shifted, scores, iou_threshold)
+
+
+def soft_nms(boxes: np.ndarray, scores: np.ndarray, method: str = 'gaussian',
+             sigma: float = 0.5, iou_threshold: float = 0.3,
+             score_threshold: float = 0.001) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Soft-NMS: 겹친 박스를 삭제하지 않고 점수를 감쇠
+
+    Args:
+        method: 'gaussian' (score *= exp(-iou² / sigma)) 또는
+                'linear' (iou > iou_threshold이면 score *= 1 - iou)
+        score_threshold: 감쇠 후 이 값보다 낮아진 박스는 제거
+
+    Returns:
+        (유지할 인덱스, 감쇠된 점수) — 선택된 순서대로
+    """
+    boxes = np.asarray(boxes, dtype=np.float64)
+    remaining_scores = np.asarray(scores, dtype=np.float64).copy()
+    if method not in ('gaussian', 'linear'):
+        raise ValueError(f"Unknown soft-NMS method: {method}")
+
+    areas = box_area(boxes)
+    remaining = np.arange(len(boxes))
+    keep, kept_scores = [], []
+
+    while remaining.size > 0:
+        pos = np.argmax(remaining_scores[remaining])
+        best = remaining[pos]
+        keep.append(best)
+        kept_scores.append(remaining_scores[best])
+
+        remaining = np.delete(remaining, pos)
+        if remaining.size == 0:
+            break
+
+        iou = box_iou(boxes[best], boxes[remaining], areas[best], areas[remaining])
+        if method == 'gaussian':
+            weight = np.exp(-(iou ** 2) / sigma)
+        else:
+            weight = np.where(iou > iou_threshold, 1 - iou, 1.0)
+
+        remaining_scores[remaining] *= weight
+        remaining = remaining[remaining_scores[remaining] >= score_threshold]
+
+    return np.asarray(keep, dtype=np.int64), np.asarray(kept_scores)
+
+
+# ----------------------------------------------------------------------
+# dict 기반 검출 결과와의 변환 / 검증 / 벤치마크
+# ----------------------------------------------------------------------
+def detections_to_arrays(detections: Sequence[Dict[str, Any]], box_key: str = 'bbox',
+                         score_key: str = 'confidence') -> Tuple[np.ndarray, np.ndarray]:
+    """[{'bbox': [...], 'confidence': ...}, ...] → (boxes, scores)"""
+    if not detections:
+        return np.zeros((0, 4)), np.zeros(0)
+    boxes = np.array([d[box_key] for d in detections], dtype=np.float64)
+    scores = np.array([d[score_key] for d in detections], dtype=np.float64)
+    return boxes, scores
+
+
+def reference_nms(detections: List[Dict[str, Any]], iou_threshold: float) -> List[Dict[str, Any]]:
+    """비교 기준: 정렬 후 pop(0) 하는 dict 기반 구현 (ObjectDetectionModule의 기존 방식)"""
+    def iou(box1, box2):
+        x1, y1 = max(box1[0], box2[0]), max(box1[1], box2[1])
+        x2, y2 = min(box1[2], box2[2]), min(box1[3], box2[3])
+        intersection = max(0, x2 - x1) * max(0, y2 - y1)
+        union = ((box1[2] - box1[0]) * (box1[3] - box1[1])
+                 + (box2[2] - box2[0]) * (box2[3] - box2[1]) - intersection)
+        return intersection / union if union > 0 else 0
+
+    detections = sorted(detections, key=lambda x: x['confidence'], reverse=True)
+    keep = []
+    while detections:
+        best = detections.pop(0)
+        keep.append(best)
+        detections = [d for d in detections if iou(best['bbox'], d['bbox']) <= iou_threshold]
+    return keep
+
+
+def random_boxes(n: int, seed: int = 0, image_size: int = 1000,
+                 num_classes: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """벤치마크/검증용 무작위 후보 박스 (객체 주변에 몰린 형태)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(0, image_size, size=(max(1, n // 20), 2))
+    picked = centers[rng.integers(0, len(centers), n)] + rng.normal(0, 8, size=(n, 2))
+    sizes = rng.uniform(20, 120, size=(n, 2))
+    boxes = np.concatenate([picked - sizes / 2, picked + sizes / 2], axis=1)
+    scores = rng.uniform(0.05, 1.0, n)
+    class_ids = rng.integers(0, num_classes, n)
+    return boxes, scores, class_ids
+
+
+def verify_against_reference(sizes: Sequence[int] = (10, 100, 500),
+                             thresholds: Sequence[float] = (0.3, 0.5, 0.7)) -> List[Dict[str, Any]]:
+    """벡터화 nms와 dict 기반 reference_nms의 결과 일치 여부 확인"""
+    results = []
+    for n in sizes:
+        boxes, scores, _ = random_boxes(n, seed=n)
+        detections = [{'bbox': b.tolist(), 'confidence': s, 'index': i}
+                      for i, (b, s) in enumerate(zip(boxes, scores))]
+        for threshold in thresholds:
+            expected = [d['index'] for d in reference_nms(detections, threshold)]
+            actual = nms(boxes, scores, threshold).tolist()
+            results.append({'n': n, 'iou_threshold': threshold, 'kept': len(actual),
+                            'match': expected == actual})
+    return results
+
+
+def benchmark_nms(sizes: Sequence[int] = (100, 500, 1000, 5000, 20000),
+                  iou_threshold: float = 0.5, reference_max: int = 5000) -> List[Dict[str, Any]]:
+    """
+    후보 박스 수별 실행 시간 (ms)
+    dict 기반 구현은 느리므로 reference_max 이하에서만 측정
+    """
+    results = []
+    for n in sizes:
+        boxes, scores, class_ids = random_boxes(n, seed=1, num_classes=10)
+        row = {'boxes': n}
+
+        for name, fn in (
+            ('nms_ms', lambda: nms(boxes, scores, iou_threshold)),
+            ('batched_nms_ms', lambda: batched_nms(boxes, scores, class_ids, iou_threshold)),
+            ('diou_nms_ms', lambda: diou_nms(boxes, scores, iou_threshold)),
+            ('soft_nms_ms', lambda: soft_nms(boxes, scores)),
+        ):
+            start = time.perf_counter()
+            fn()
+            row[name] = (time.perf_counter() - start) * 1000
+
+        row['reference_ms'] = None
+        if n <= reference_max:
+            detections = [{'bbox': b.tolist(), 'confidence': s} for b, s in zip(boxes, scores)]
+            start = time.perf_counter()
+            reference_nms(detections, iou_threshold)
+            row['reference_ms'] = (time.perf_counter() - start) * 1000
+
+        results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    print("=== dict 기반 구현과 결과 비교 ===")
+    for r in verify_against_reference():
+        print(f"{'✅' if r['match'] else '❌'} n={r['n']}, IoU={r['iou_threshold']}: kept {r['kept']}")
+
+    print("\n=== 후보 박스 수별 벤치마크 (ms) ===")
+    for r in benchmark_nms():
+        reference = f"{r['reference_ms']:.1f}" if r['reference_ms'] is not None else "skipped"
+        print(f"{r['boxes']:>6}: nms {r['nms_ms']:.1f}, batched {r['batched_nms_ms']:.1f}, "
+              f"diou {r['diou_nms_ms']:.1f}, soft {r['soft_nms_ms']:.1f}, dict {reference}")
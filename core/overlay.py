@@ -0,0 +1,202 @@
+"""
+히트맵 오버레이 렌더러
+Attention map, 히트맵, Optical Flow를 원본 이미지 위에 색상으로 합성합니다.
+
+- 컬러맵은 256-엔트리 uint8 LUT로 한 번만 계산해 재사용
+- 여러 맵(레이어 12개, 헤드 144개 등)을 격자 해상도에서 한 번에 색상화한 뒤
+  uint8 색상 이미지를 출력 버퍼의 각 슬롯으로 바로 업샘플링
+  (채널을 쌓아 한 번에 resize하면 전치 복사 비용이 더 큼)
+- 합성은 uint8 버퍼에 직접 기록 (cv2.addWeighted, dst 지정)
+- 결과는 (N, H, W, 3) 배열 또는 접근 시점에 PIL로 변환하는 OverlayStack
+
+사용 예:
+    renderer = OverlayRenderer(cmap='jet', alpha=0.6)
+    stack = renderer.render_batch(image, attention_maps)  # (N, H, W, 3)
+"""
+
+from functools import lru_cache
+from typing import Optional, Sequence, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+Colormap = Union[str, int]
+
+
+@lru_cache(maxsize=None)
+def colormap_lut(cmap: Colormap = 'jet', color_order: str = 'rgb') -> np.ndarray:
+    """
+    컬러맵 LUT (256, 3) uint8
+
+    Args:
+        cmap: matplotlib 컬러맵 이름('jet', 'viridis' 등) 또는 OpenCV 상수(cv2.COLORMAP_JET 등)
+        color_order: 'rgb' 또는 'bgr'
+    """
+    if isinstance(cmap, str):
+        import matplotlib
+        colors = matplotlib.colormaps[cmap](np.linspace(0, 1, 256))[:, :3]
+        lut = np.round(colors * 255).astype(np.uint8)  # RGB
+    else:
+        lut = cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(256, 1), cmap)
+        lut = lut.reshape(256, 3)[:, ::-1]  # BGR → RGB
+
+    if color_order == 'bgr':
+        lut = lut[:, ::-1]
+    lut = np.ascontiguousarray(lut)
+    lut.flags.writeable = False
+    return lut
+
+
+def normalize_maps(maps: np.ndarray) -> np.ndarray:
+    """맵마다 min-max 정규화 (..., H, W) → 0..1 float32"""
+    maps = np.asarray(maps, dtype=np.float32)
+    lo = maps.min(axis=(-2, -1), keepdims=True)
+    hi = maps.max(axis=(-2, -1), keepdims=True)
+    return (maps - lo) / (hi - lo + 1e-12)
+
+
+class OverlayStack(Sequence):
+    """
+    (N, H, W, 3) 오버레이 배열을 감싸는 시퀀스
+    인덱싱할 때만 PIL 이미지로 변환 (st.image 등에 그대로 전달 가능)
+    """
+
+    def __init__(self, array: np.ndarray):
+        self.array = array
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return OverlayStack(self.array[index])
+        return Image.fromarray(self.array[index])
+
+    def grid(self, cols: int = 4, pad: int = 2) -> np.ndarray:
+        """모든 오버레이를 하나의 격자 이미지로 결합"""
+        n, h, w, c = self.array.shape
+        rows = (n + cols - 1) // cols
+        canvas = np.full((rows * (h + pad) - pad, cols * (w + pad) - pad, c), 255, dtype=np.uint8)
+        for idx in range(n):
+            r, col = divmod(idx, cols)
+            canvas[r * (h + pad):r * (h + pad) + h, col * (w + pad):col * (w + pad) + w] = self.array[idx]
+        return canvas
+
+
+class OverlayRenderer:
+    """
+    컬러맵 LUT 기반 오버레이 렌더러
+
+    Args:
+        cmap: matplotlib 컬러맵 이름 또는 OpenCV 컬러맵 상수
+        alpha: 히트맵 비중 (0~1)
+        color_order: 입력/출력 이미지의 채널 순서 ('rgb' 또는 'bgr')
+    """
+
+    def __init__(self, cmap: Colormap = 'jet', alpha: float = 0.5, color_order: str = 'rgb'):
+        self.alpha = alpha
+        self.lut = colormap_lut(cmap, color_order)
+
+    def colorize(self, maps: np.ndarray, normalize: bool = True,
+                 out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        (..., H, W) 맵 → (..., H, W, 3) uint8 컬러 이미지
+
+        normalize=False면 맵이 이미 0..1 범위라고 가정
+        """
+        maps = normalize_maps(maps) if normalize else np.asarray(maps, dtype=np.float32)
+        indices = np.clip(maps * 255 + 0.5, 0, 255).astype(np.uint8)
+        if out is None:
+            out = np.empty(indices.shape + (3,), dtype=np.uint8)
+        np.take(self.lut, indices, axis=0, out=out)
+        return out
+
+    def render_batch(self, base: Union[np.ndarray, Image.Image], maps: np.ndarray,
+                     normalize: bool = True, alpha: Optional[float] = None,
+                     out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        맵 N개를 같은 원본 이미지 위에 합성
+
+        Args:
+            base: (H, W, 3) uint8 이미지 또는 PIL 이미지
+            maps: (N, h, w) 맵 (색상화 후 원본 크기로 bilinear 업샘플링)
+            out: (N, H, W, 3) uint8 출력 버퍼 (없으면 새로 할당)
+
+        Returns:
+            (N, H, W, 3) uint8
+        """
+        base = np.asarray(base.convert('RGB') if isinstance(base, Image.Image) else base)
+        alpha = self.alpha if alpha is None else alpha
+        height, width = base.shape[:2]
+
+        # 격자 해상도에서 모든 맵을 한 번에 색상화 (N, h, w, 3)
+        colored = self.colorize(maps, normalize=normalize)
+
+        if out is None:
+            out = np.empty((len(colored), height, width, 3), dtype=np.uint8)
+
+        for small, overlay in zip(colored, out):
+            if small.shape[:2] == (height, width):
+                np.copyto(overlay, small)
+            else:
+                cv2.resize(small, (width, height), dst=overlay, interpolation=cv2.INTER_LINEAR)
+            cv2.addWeighted(base, 1 - alpha, overlay, alpha, 0, dst=overlay)
+        return out
+
+    def render(self, base: Union[np.ndarray, Image.Image], heatmap: np.ndarray,
+               normalize: bool = True, alpha: Optional[float] = None,
+               out: Optional[np.ndarray] = None) -> np.ndarray:
+        """맵 하나를 합성 (H, W, 3) uint8"""
+        result = self.render_batch(base, heatmap[None], normalize, alpha,
+                                   out[None] if out is not None else None)
+        return result[0]
+
+    def render_stack(self, base: Union[np.ndarray, Image.Image], maps: np.ndarray,
+                     normalize: bool = True, alpha: Optional[float] = None) -> OverlayStack:
+        """render_batch 결과를 PIL 지연 변환 시퀀스로 반환"""
+        return OverlayStack(self.render_batch(base, maps, normalize, alpha))
+
+
+@lru_cache(maxsize=None)
+def _hue_lut(color_order: str = 'rgb') -> np.ndarray:
+    """OpenCV 8비트 Hue(0~179) → 채도/명도 최대 색상 (180, 3)"""
+    hsv = np.stack([np.arange(180), np.full(180, 255), np.full(180, 255)], axis=1)
+    code = cv2.COLOR_HSV2RGB if color_order == 'rgb' else cv2.COLOR_HSV2BGR
+    lut = cv2.cvtColor(hsv.astype(np.uint8).reshape(180, 1, 3), code).reshape(180, 3)
+    lut.flags.writeable = False
+    return lut
+
+
+def render_flow(flow: np.ndarray, color_order: str = 'rgb',
+                out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Optical Flow (H, W, 2) → 색상 이미지 (방향 = Hue, 크기 = 밝기)
+
+    채도가 최대인 HSV→RGB 변환은 명도에 비례하므로
+    Hue LUT 색상에 정규화된 크기를 곱해 cvtColor 없이 계산
+    """
+    magnitude, angle = cv2.cartToPolar(flow[..., 0], flow[..., 1])
+    hue = (angle * (90 / np.pi)).astype(np.uint8) % 180
+    value = cv2.normalize(magnitude, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint16)
+
+    colors = _hue_lut(color_order)[hue].astype(np.uint16)
+    colors *= value[..., None]
+    colors += 127
+    colors //= 255
+
+    if out is None:
+        out = np.empty(flow.shape[:2] + (3,), dtype=np.uint8)
+    np.copyto(out, colors, casting='unsafe')
+    return out
+
+
+_renderers = {}
+
+
+def get_renderer(cmap: Colormap = 'jet', alpha: float = 0.5, color_order: str = 'rgb') -> OverlayRenderer:
+    """설정별 공유 렌더러 반환"""
+    key = (cmap, alpha, color_order)
+    if key not in _renderers:
+        _renderers[key] = OverlayRenderer(cmap, alpha, color_order)
+    return _renderers[key]
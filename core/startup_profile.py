@@ -0,0 +1,189 @@
+"""
+앱 시작 성능 프로파일링
+무거운 의존성(torch, transformers, ultralytics 등)을 실제로 임포트하지 않고
+모듈 존재 여부를 확인하고, 모듈별 import 시간과 콜드 스타트 시간을 측정합니다.
+
+- find_module_spec: 상위 패키지 __init__을 실행하지 않고 모듈 위치만 탐색
+- profile_module_imports: 새 인터프리터에서 `python -X importtime`으로 모듈별 import 시간 수집
+- measure_time_to_first_render: 새 인터프리터에서 Streamlit AppTest로 첫 렌더링까지 걸린 시간 측정
+
+사용 예:
+    python -m core.startup_profile --modules modules.week05.object_detection_module --top 15
+    python -m core.startup_profile --cold-start 3
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+from importlib.machinery import ModuleSpec, PathFinder
+from typing import Dict, List, Optional, Sequence
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def find_module_spec(module_path: str) -> Optional[ModuleSpec]:
+    """
+    모듈 스펙 탐색 (임포트하지 않음)
+
+    importlib.util.find_spec('a.b.c')는 상위 패키지 a.b를 실제로 임포트하므로
+    패키지 __init__에서 무거운 모듈을 가져오는 경우에도 비용이 들지 않도록
+    최상위 패키지만 find_spec으로 찾고 나머지는 경로 기반으로 탐색
+    """
+    parts = module_path.split('.')
+    try:
+        spec = importlib.util.find_spec(parts[0])
+    except (ImportError, ValueError):
+        return None
+
+    for depth in range(1, len(parts)):
+        if spec is None or spec.submodule_search_locations is None:
+            return None
+        name = '.'.join(parts[:depth + 1])
+        if name in sys.modules:
+            spec = sys.modules[name].__spec__
+        else:
+            spec = PathFinder.find_spec(name, list(spec.submodule_search_locations))
+    return spec
+
+
+def missing_requirements(packages: Sequence[str]) -> List[str]:
+    """설치되지 않은 최상위 패키지 목록 (find_spec만 사용)"""
+    return [name for name in packages if find_module_spec(name) is None]
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    `-X importtime` 출력 파싱
+
+    형식: "import time: self [us] | cumulative | imported package"
+    """
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        records.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+        })
+    return records
+
+
+def _run_python(args: Sequence[str], timeout: float) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PROJECT_ROOT, os.environ.get('PYTHONPATH')])))
+    return subprocess.run([sys.executable, *args], cwd=PROJECT_ROOT, env=env,
+                          capture_output=True, text=True, timeout=timeout)
+
+
+def profile_module_imports(module_path: str, top: Optional[int] = 20, timeout: float = 300) -> Dict:
+    """
+    새 인터프리터에서 모듈을 임포트하며 모듈별 import 시간 측정
+
+    Returns:
+        {'module', 'total_ms', 'ok', 'error', 'packages': 최상위 패키지별 self 시간 합 (내림차순),
+         'records': 개별 모듈 기록 (누적 시간 내림차순, top개)}
+    """
+    proc = _run_python(['-X', 'importtime', '-c', f'import {module_path}'], timeout)
+    records = parse_importtime(proc.stderr)
+
+    # 최상위 패키지별 self 시간 합 (torch, cv2, matplotlib 등 어디서 시간이 드는지)
+    packages: Dict[str, float] = {}
+    for record in records:
+        package = record['module'].split('.')[0]
+        packages[package] = packages.get(package, 0.0) + record['self_ms']
+
+    error = None
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f'exit {proc.returncode}'
+
+    records.sort(key=lambda r: r['cumulative_ms'], reverse=True)
+    return {
+        'module': module_path,
+        'ok': proc.returncode == 0,
+        'error': error,
+        'total_ms': sum(r['cumulative_ms'] for r in records if r['depth'] == 0),
+        'packages': sorted(packages.items(), key=lambda item: item[1], reverse=True),
+        'records': records[:top] if top else records,
+    }
+
+
+_TTFR_SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout={timeout})
+t1 = time.perf_counter()
+at.run()
+t2 = time.perf_counter()
+print(json.dumps({{
+    'streamlit_import_s': t1 - t0,
+    'script_s': t2 - t1,
+    'exceptions': [str(e.value) for e in at.exception],
+}}))
+"""
+
+
+def measure_time_to_first_render(app_path: str = 'app.py', runs: int = 3, timeout: float = 300) -> Dict:
+    """
+    콜드 스타트 첫 렌더링 시간 측정
+
+    매 실행마다 새 인터프리터를 띄워 프로세스 시작부터 앱 스크립트의 첫 실행
+    (사이드바 + 기본 선택 모듈 렌더링)이 끝날 때까지의 시간을 잽니다.
+    """
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = _run_python(['-c', _TTFR_SCRIPT.format(app=app_path, timeout=timeout)], timeout + 30)
+        total = time.perf_counter() - start
+        if proc.returncode != 0:
+            raise RuntimeError(f"콜드 스타트 측정 실패: {proc.stderr.strip()[-500:]}")
+        sample = json.loads(proc.stdout.strip().splitlines()[-1])
+        sample['total_s'] = total
+        samples.append(sample)
+
+    totals = sorted(s['total_s'] for s in samples)
+    return {
+        'app': app_path,
+        'runs': runs,
+        'ttfr_p50_s': totals[len(totals) // 2],
+        'ttfr_min_s': totals[0],
+        'ttfr_max_s': totals[-1],
+        'script_p50_s': sorted(s['script_s'] for s in samples)[len(samples) // 2],
+        'exceptions': samples[-1]['exceptions'],
+        'samples': samples,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="앱 시작 import 시간 / 콜드 스타트 프로파일링")
+    parser.add_argument('--modules', nargs='*', default=[], help="import 시간을 측정할 모듈 경로")
+    parser.add_argument('--top', type=int, default=15, help="출력할 모듈 수")
+    parser.add_argument('--cold-start', type=int, default=0, metavar='RUNS',
+                        help="app.py 첫 렌더링 시간 측정 반복 횟수")
+    parser.add_argument('--app', type=str, default='app.py')
+    args = parser.parse_args()
+
+    for module_path in args.modules:
+        profile = profile_module_imports(module_path, top=args.top)
+        status = '✅' if profile['ok'] else f"❌ {profile['error']}"
+        print(f"\n📦 {module_path}: {profile['total_ms']:.0f}ms {status}")
+        for package, ms in profile['packages'][:args.top]:
+            print(f"   {package:<30} {ms:>9.1f}ms")
+
+    if args.cold_start:
+        result = measure_time_to_first_render(args.app, args.cold_start)
+        print(f"\n🚀 첫 렌더링 (p50 / min / max): {result['ttfr_p50_s']:.2f}s / "
+              f"{result['ttfr_min_s']:.2f}s / {result['ttfr_max_s']:.2f}s "
+              f"(스크립트 실행 {result['script_p50_s']:.2f}s)")
+        for message in result['exceptions']:
+            print(f"   ⚠️ {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+스레드 기반 비디오 캡처
+cv2.VideoCapture의 read(디코딩)를 백그라운드 스레드에서 수행해
+디코딩과 추론/그리기가 같은 스레드에서 순서대로 더해지지 않고 겹치도록 합니다.
+
+- 제한 크기 큐 + 정책 선택
+  'drop_oldest': 큐가 차면 가장 오래된 프레임을 버림 (웹캠/스트림 - 항상 최신 프레임)
+  'block': 큐가 비워질 때까지 리더가 대기 (비디오 파일 - 프레임 손실 없음)
+- 디코딩 직후 리더 스레드에서 축소 (size 또는 scale, cv2.resize INTER_AREA)
+- 프레임마다 캡처 시각(time.perf_counter)과 스트림 위치(ms) 기록
+- 반복자 인터페이스(for frame in capture)와 cv2.VideoCapture 호환 read() 모두 지원
+
+사용 예:
+    with ThreadedCapture('input.mp4', policy='block') as capture:
+        for frame in capture:
+            results = model(frame.image)
+
+    capture = ThreadedCapture(0, queue_size=2)   # 웹캠: drop_oldest
+    ret, image = capture.read()
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+VideoSource = Union[int, str]
+
+POLICIES = ('drop_oldest', 'block')
+
+
+@dataclass
+class CapturedFrame:
+    """디코딩된 프레임과 메타데이터"""
+    index: int          # 소스에서 읽은 순서 (버려진 프레임 포함)
+    timestamp: float    # 디코딩 완료 시각 (time.perf_counter 기준)
+    position_ms: float  # 스트림 위치 (CAP_PROP_POS_MSEC, 웹캠은 0일 수 있음)
+    image: np.ndarray   # BGR 프레임 (축소 옵션 적용 후)
+
+
+def is_live_source(source: VideoSource) -> bool:
+    """웹캠 번호나 네트워크 스트림이면 True"""
+    if isinstance(source, int):
+        return True
+    return str(source).isdigit() or str(source).lower().startswith(('rtsp://', 'rtmp://', 'http://', 'https://'))
+
+
+class ThreadedCapture:
+    """
+    백그라운드 리더 스레드를 가진 비디오 캡처
+
+    Args:
+        source: 웹캠 번호 또는 비디오 경로/URL
+        queue_size: 디코딩된 프레임을 보관할 최대 개수
+        policy: 'drop_oldest' | 'block' | 'auto' (auto: 웹캠/스트림은 drop_oldest, 파일은 block)
+        size: 디코딩 직후 축소할 크기 (width, height)
+        scale: 디코딩 직후 축소 배율 (size가 없을 때)
+        properties: 리더 시작 전에 설정할 캡처 속성 {cv2.CAP_PROP_FRAME_WIDTH: 1280, ...}
+        start: 생성 즉시 리더 스레드 시작
+    """
+
+    def __init__(
+        self,
+        source: VideoSource,
+        queue_size: int = 4,
+        policy: str = 'auto',
+        size: Optional[Tuple[int, int]] = None,
+        scale: Optional[float] = None,
+        properties: Optional[Dict[int, float]] = None,
+        start: bool = True,
+    ):
+        if policy == 'auto':
+            policy = 'drop_oldest' if is_live_source(source) else 'block'
+        if policy not in POLICIES:
+            raise ValueError(f"지원하지 않는 정책: {policy} (사용 가능: {POLICIES})")
+
+        self.source = source
+        self.policy = policy
+        self.queue_size = max(1, int(queue_size))
+        self.size = size
+        self.scale = scale if scale and scale != 1.0 else None
+
+        self.cap = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+        for prop, value in (properties or {}).items():
+            self.cap.set(prop, value)
+
+        # 리더가 도는 동안 cap.get을 호출하지 않도록 정적 속성은 미리 읽어 둠
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.source_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.source_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.width, self.height = self._output_size(self.source_width, self.source_height)
+
+        self._frames: Deque[CapturedFrame] = deque()
+        self._condition = threading.Condition()
+        self._eof = False
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {'read': 0, 'delivered': 0, 'dropped': 0, 'decode_s': 0.0, 'wait_s': 0.0}
+
+        if not self.cap.isOpened():
+            self._eof = True  # 열기 실패: 읽기는 바로 (False, None)
+        elif start:
+            self.start()
+
+    # ------------------------------------------------------------------
+    # 리더 스레드
+    # ------------------------------------------------------------------
+    def _output_size(self, width: int, height: int) -> Tuple[int, int]:
+        if self.size is not None:
+            return tuple(self.size)
+        if self.scale is not None:
+            return max(1, int(round(width * self.scale))), max(1, int(round(height * self.scale)))
+        return width, height
+
+    def start(self) -> 'ThreadedCapture':
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._reader, name='ThreadedCapture', daemon=True)
+            self._thread.start()
+        return self
+
+    def _reader(self):
+        index = 0
+        while not self._stopped:
+            start = time.perf_counter()
+            ok, image = self.cap.read()
+            if not ok:
+                break
+            timestamp = time.perf_counter()
+            position_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+            if self.size is not None or self.scale is not None:
+                width, height = self._output_size(image.shape[1], image.shape[0])
+                if (width, height) != (image.shape[1], image.shape[0]):
+                    image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+            frame = CapturedFrame(index, timestamp, position_ms, image)
+            index += 1
+
+            with self._condition:
+                self.stats['read'] += 1
+                self.stats['decode_s'] += time.perf_counter() - start
+                if self.policy == 'block':
+                    self._condition.wait_for(lambda: len(self._frames) < self.queue_size or self._stopped)
+                elif len(self._frames) >= self.queue_size:
+                    self._frames.popleft()
+                    self.stats['dropped'] += 1
+                self._frames.append(frame)
+                self._condition.notify_all()
+
+        with self._condition:
+            self._eof = True
+            self._condition.notify_all()
+
+    # ------------------------------------------------------------------
+    # 소비자 인터페이스
+    # ------------------------------------------------------------------
+    def next_frame(self, timeout: Optional[float] = None, latest: bool = False) -> Optional[CapturedFrame]:
+        """
+        다음 프레임 (큐가 비어 있으면 대기)
+
+        Args:
+            timeout: 최대 대기 시간 (초), None이면 무한 대기
+            latest: True면 큐에 쌓인 프레임 중 가장 최근 것만 반환하고 나머지는 버림
+
+        Returns:
+            CapturedFrame, 스트림 끝/타임아웃/중지 시 None
+        """
+        start = time.perf_counter()
+        with self._condition:
+            self._condition.wait_for(lambda: self._frames or self._eof or self._stopped, timeout)
+            self.stats['wait_s'] += time.perf_counter() - start
+            if not self._frames:
+                return None
+            if latest:
+                self.stats['dropped'] += len(self._frames) - 1
+                frame = self._frames.pop()
+                self._frames.clear()
+            else:
+                frame = self._frames.popleft()
+            self.stats['delivered'] += 1
+            self._condition.notify_all()
+            return frame
+
+    def read(self, timeout: Optional[float] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """cv2.VideoCapture.read()와 같은 형식 (ret, frame)"""
+        frame = self.next_frame(timeout)
+        return (True, frame.image) if frame is not None else (False, None)
+
+    def __iter__(self) -> Iterator[CapturedFrame]:
+        while True:
+            frame = self.next_frame()
+            if frame is None:
+                return
+            yield frame
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def get(self, prop: int) -> float:
+        """캡처 속성 (리더 동작 중에는 미리 읽어 둔 값만 반환)"""
+        cached = {
+            cv2.CAP_PROP_FPS: self.fps,
+            cv2.CAP_PROP_FRAME_COUNT: self.frame_count,
+            cv2.CAP_PROP_FRAME_WIDTH: self.width,
+            cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+        }
+        if prop in cached:
+            return cached[prop]
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError("리더 스레드 동작 중에는 캐시된 속성(FPS/프레임 수/크기)만 읽을 수 있습니다.")
+        return self.cap.get(prop)
+
+    def summary(self) -> Dict[str, Any]:
+        """디코딩/대기 시간 요약"""
+        read = max(self.stats['read'], 1)
+        delivered = max(self.stats['delivered'], 1)
+        return {
+            **self.stats,
+            'decode_ms_per_frame': self.stats['decode_s'] / read * 1000,
+            'wait_ms_per_frame': self.stats['wait_s'] / delivered * 1000,
+        }
+
+    def release(self):
+        """리더 중지 및 캡처 해제"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.cap.release()
+
+    def __enter__(self) -> 'ThreadedCapture':
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -3,13 +3,18 @@
 Functions:
 - load_vit_model: download/load model + image processor and move to device
 - get_attention_overlays: compute cls-token attention maps per layer and return overlay images
+- AttentionAnalysis: run one forward pass per (image, model) and serve layer/head/rollout maps from it
 """
-from typing import Tuple, List, Optional
+from collections import OrderedDict
+from typing import Dict, Tuple, Optional
+import hashlib
 import os
 import numpy as np
 from PIL import Image
 import torch
 
+from .overlay import OverlayStack, get_renderer, normalize_maps
+
 try:
     # modern transformers
     from transformers import ViTModel, AutoImageProcessor
@@ -59,194 +64,187 @@ def _create_overlay(original_pil: Image.Image, attn_map: np.ndarray, cmap='jet',
 
     attn_map is expected to be a 2D numpy array normalized between 0 and 1.
     """
-    import matplotlib.cm as cm
-
-    # Normalize
-    m = attn_map
-    m = (m - m.min()) / (m.max() - m.min() + 1e-12)
+    return Image.fromarray(get_renderer(cmap, alpha).render(original_pil, attn_map))
 
-    # Apply colormap -> RGBA floats
-    cmap_fn = cm.get_cmap(cmap)
-    colored = cmap_fn(m)[:, :, :3]  # drop alpha channel
 
-    # Resize heatmap to original image size
-    heatmap = Image.fromarray((colored * 255).astype(np.uint8)).resize(original_pil.size, resample=Image.BILINEAR)
+def _image_hash(pil_image: Image.Image) -> str:
+    rgb = pil_image.convert('RGB')
+    digest = hashlib.sha1(f"{rgb.size}".encode())
+    digest.update(rgb.tobytes())
+    return digest.hexdigest()
 
-    heatmap = heatmap.convert('RGBA')
-    base = original_pil.convert('RGBA')
 
-    # Blend
-    blended = Image.blend(base, heatmap, alpha=alpha)
-    return blended.convert('RGB')
+def _normalize_grid(values: np.ndarray) -> np.ndarray:
+    """Reshape (..., num_patches) to (..., g, g) and min-max normalize each map to 0..1."""
+    grid = int(np.sqrt(values.shape[-1]))
+    return normalize_maps(values.reshape(values.shape[:-1] + (grid, grid)))
 
 
-def get_attention_overlays(pil_image: Image.Image, model: ViTModel, processor, device: Optional[torch.device] = None, max_layers: Optional[int] = None, alpha: float = 0.6) -> List[Image.Image]:
-    """Compute attention overlays for each transformer encoder layer.
+class AttentionRecord:
+    """Attention tensors of one image kept by AttentionAnalysis.
 
-    Returns a list of PIL.Image overlays (one per layer). The attention maps are CLS->patch attentions
-    averaged over heads and upsampled to the original image size.
+    cls_attn: (layers, heads, seq_len) attention from the CLS token
+    full_attn: (layers, heads, seq_len, seq_len) or None when only CLS rows are kept
+    rollout: (seq_len,) CLS row of the attention rollout (always float32)
     """
-    if device is None:
-        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-
-    # Prepare image for model
-    # The processor handles resizing/cropping to model expected size
-    inputs = processor(images=pil_image, return_tensors='pt')
-    pixel_values = inputs.get('pixel_values')
-    if pixel_values is None:
-        raise RuntimeError('Processor did not return pixel_values')
-
-    pixel_values = pixel_values.to(device)
-
-    # Forward with attentions
-    with torch.no_grad():
-        outputs = model(pixel_values, output_attentions=True)
-
-    attentions = outputs.attentions  # tuple: (layer_count,) each tensor shape (batch, heads, seq_len, seq_len)
-
-    # Determine patch grid size: seq_len = 1 + num_patches
-    # num_patches = (image_size // patch_size) ** 2
-    try:
-        patch_size = getattr(model.config, 'patch_size', None)
-        model_img_size = getattr(model.config, 'image_size', None)
-    except Exception:
-        patch_size = None
-        model_img_size = None
-
-    # If processor resizes, use its size config
-    try:
-        proc_size = processor.size if hasattr(processor, 'size') else None
-        if isinstance(proc_size, dict):
-            proc_size = proc_size.get('shortest_edge') or proc_size.get('height') or proc_size.get('width')
-    except Exception:
-        proc_size = None
 
-    # pick an image size used by the processor/model
-    target_image_size = None
-    for s in (proc_size, model_img_size, 224):
-        if s:
-            target_image_size = int(s)
-            break
+    def __init__(self, cls_attn: np.ndarray, rollout: np.ndarray, full_attn: Optional[np.ndarray] = None):
+        self.cls_attn = cls_attn
+        self.rollout = rollout
+        self.full_attn = full_attn
 
-    # infer grid
-    inferred_patch = int(patch_size) if patch_size else 16
-    grid_size = target_image_size // inferred_patch
+    @property
+    def nbytes(self) -> int:
+        full = self.full_attn.nbytes if self.full_attn is not None else 0
+        return self.cls_attn.nbytes + self.rollout.nbytes + full
 
-    overlays: List[Image.Image] = []
 
-    layer_count = len(attentions)
-    if max_layers is None:
-        max_layers = layer_count
-    max_layers = min(max_layers, layer_count)
+class AttentionAnalysis:
+    """Single-pass attention analysis for a ViT model.
 
-    # We take batch 0
-    for layer_idx in range(max_layers):
-        attn = attentions[layer_idx]  # (batch, heads, seq_len, seq_len)
-        attn = attn[0]  # remove batch -> (heads, seq_len, seq_len)
+    One forward pass with output_attentions=True is run per (image hash, model) and the attention
+    tensors are cached (LRU). Layer-wise, head-wise and rollout views are all served from the cache.
 
-        # CLS token is index 0; take attention from CLS to all patches (exclude CLS)
-        # attn[:, 0, 1:] -> (heads, num_patches)
-        cls_attn = attn[:, 0, 1:]
-
-        # Average over heads
-        avg_attn = cls_attn.mean(axis=0).cpu().numpy()  # (num_patches,)
-
-        # reshape to grid
-        try:
-            grid_h = grid_w = int(np.sqrt(avg_attn.shape[0]))
-        except Exception:
-            grid_h = grid_w = grid_size
+    Args:
+        half: store attention tensors as float16
+        cls_only: keep only the CLS rows (enough for every view; the rollout is computed before
+            the full matrices are dropped)
+        max_entries: number of images kept in the cache
+    """
 
-        attn_grid = avg_attn.reshape(grid_h, grid_w)
+    def __init__(self, model: ViTModel, processor, device: Optional[torch.device] = None,
+                 half: bool = True, cls_only: bool = True, max_entries: int = 8):
+        self.model = model
+        self.processor = processor
+        self.device = device or next(model.parameters()).device
+        self.dtype = np.float16 if half else np.float32
+        self.cls_only = cls_only
+        self.max_entries = max_entries
+        self.model_key = getattr(model.config, 'name_or_path', None) or model.__class__.__name__
+        self._cache: "OrderedDict[Tuple[str, str], AttentionRecord]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def rollout_cls(attentions) -> np.ndarray:
+        """Attention rollout (Abnar & Zuidema 2020) for the CLS token only.
+
+        The full rollout is A_L @ ... @ A_1 with A_l = normalize(mean_heads(attn_l) + I). Only its CLS
+        row is needed, so a row vector is propagated from the last layer down to the first:
+        v <- v @ A_l, which costs O(seq_len^2) per layer instead of O(seq_len^3).
+        """
+        v = None
+        for attn in reversed(attentions):
+            a = attn.mean(dim=0)  # (seq_len, seq_len)
+            a = a + torch.eye(a.shape[0], device=a.device, dtype=a.dtype)
+            a = a / a.sum(dim=-1, keepdim=True)
+            v = a[0] if v is None else v @ a
+        return v
+
+    def analyze(self, pil_image: Image.Image) -> AttentionRecord:
+        """Return the cached attention record for an image, running the model on a cache miss."""
+        key = (_image_hash(pil_image), self.model_key)
+        if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        self.misses += 1
+        inputs = self.processor(images=pil_image, return_tensors='pt')
+        pixel_values = inputs.get('pixel_values')
+        if pixel_values is None:
+            raise RuntimeError('Processor did not return pixel_values')
+
+        with torch.no_grad():
+            outputs = self.model(pixel_values.to(self.device), output_attentions=True)
+            if outputs.attentions is None:
+                raise RuntimeError('Model did not return attentions (use attn_implementation="eager")')
+            attentions = [attn[0].float() for attn in outputs.attentions]  # batch 0: (heads, seq, seq)
+            rollout = self.rollout_cls(attentions)
+            cls_attn = torch.stack([attn[:, 0, :] for attn in attentions])
+            full_attn = None if self.cls_only else torch.stack(attentions)
+
+        record = AttentionRecord(
+            cls_attn=cls_attn.cpu().numpy().astype(self.dtype),
+            rollout=rollout.cpu().numpy().astype(np.float32),  # percentile threshold is sensitive to fp16
+            full_attn=full_attn.cpu().numpy().astype(self.dtype) if full_attn is not None else None,
+        )
+
+        self._cache[key] = record
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return record
+
+    def layer_maps(self, pil_image: Image.Image, max_layers: Optional[int] = None) -> np.ndarray:
+        """CLS->patch attention averaged over heads, per layer: (layers, g, g) in 0..1."""
+        cls_attn = self.analyze(pil_image).cls_attn[:max_layers]
+        return _normalize_grid(cls_attn[:, :, 1:].astype(np.float32).mean(axis=1))
+
+    def head_maps(self, pil_image: Image.Image, layer_idx: int = 0) -> np.ndarray:
+        """CLS->patch attention of every head in one layer: (heads, g, g) in 0..1."""
+        cls_attn = self.analyze(pil_image).cls_attn
+        layer_idx = min(layer_idx, len(cls_attn) - 1)
+        return _normalize_grid(cls_attn[layer_idx, :, 1:])
+
+    def rollout_map(self, pil_image: Image.Image, discard_ratio: float = 0.9) -> np.ndarray:
+        """Attention rollout of the CLS token with the lowest `discard_ratio` values zeroed: (g, g)."""
+        cls_attn = self.analyze(pil_image).rollout[1:].astype(np.float32)
+        threshold = np.percentile(cls_attn, discard_ratio * 100)
+        return _normalize_grid(np.where(cls_attn < threshold, 0, cls_attn))
+
+    def full_attention(self, pil_image: Image.Image, layer_idx: int) -> np.ndarray:
+        """Full (heads, seq_len, seq_len) attention of one layer (requires cls_only=False)."""
+        record = self.analyze(pil_image)
+        if record.full_attn is None:
+            raise ValueError("full attention matrices are not stored (cls_only=True)")
+        return record.full_attn[layer_idx]
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def cache_info(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._cache),
+            'bytes': sum(r.nbytes for r in self._cache.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+_ANALYSIS_ATTR = "_attention_analysis"
+
+
+def get_attention_analysis(model: ViTModel, processor, device: Optional[torch.device] = None) -> AttentionAnalysis:
+    """Return the shared AttentionAnalysis for a model (one per loaded model object).
+
+    The analysis is stored on the model itself so it is freed together with the model;
+    a module-level dict would keep every model ever passed in alive.
+    """
+    analysis = getattr(model, _ANALYSIS_ATTR, None)
+    if analysis is None:
+        analysis = AttentionAnalysis(model, processor, device=device)
+        setattr(model, _ANALYSIS_ATTR, analysis)
+    return analysis
 
-        # Upsample to original image size and create overlay
-        # Normalize between 0 and 1
-        attn_grid = (attn_grid - attn_grid.min()) / (attn_grid.max() - attn_grid.min() + 1e-12)
 
-        # Create overlay image
-        overlay = _create_overlay(pil_image, attn_grid, alpha=alpha)
-        overlays.append(overlay)
+def get_attention_overlays(pil_image: Image.Image, model: ViTModel, processor, device: Optional[torch.device] = None, max_layers: Optional[int] = None, alpha: float = 0.6) -> OverlayStack:
+    """Compute attention overlays for each transformer encoder layer.
 
-    return overlays
+    Returns a sequence of PIL.Image overlays (one per layer, converted on access; `.array` holds
+    the (layers, H, W, 3) stack). The attention maps are CLS->patch attentions
+    averaged over heads and upsampled to the original image size.
+    """
+    maps = get_attention_analysis(model, processor, device).layer_maps(pil_image, max_layers)
+    return get_renderer('jet', alpha).render_stack(pil_image, maps)
 
 
-def get_attention_overlays_per_head(pil_image: Image.Image, model: ViTModel, processor, layer_idx: int = 0, device: Optional[torch.device] = None, alpha: float = 0.6) -> List[Image.Image]:
+def get_attention_overlays_per_head(pil_image: Image.Image, model: ViTModel, processor, layer_idx: int = 0, device: Optional[torch.device] = None, alpha: float = 0.6) -> OverlayStack:
     """Compute attention overlays for each head in a specific layer.
 
-    Returns a list of PIL.Image overlays (one per head). Shows CLS->patch attention for each head separately.
+    Returns a sequence of PIL.Image overlays (one per head, converted on access). Shows CLS->patch attention for each head separately.
     """
-    if device is None:
-        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-
-    # Prepare image for model
-    inputs = processor(images=pil_image, return_tensors='pt')
-    pixel_values = inputs.get('pixel_values')
-    if pixel_values is None:
-        raise RuntimeError('Processor did not return pixel_values')
-
-    pixel_values = pixel_values.to(device)
-
-    # Forward with attentions
-    with torch.no_grad():
-        outputs = model(pixel_values, output_attentions=True)
-
-    attentions = outputs.attentions  # tuple: (layer_count,) each tensor shape (batch, heads, seq_len, seq_len)
-
-    # Determine patch grid size
-    try:
-        patch_size = getattr(model.config, 'patch_size', None)
-        model_img_size = getattr(model.config, 'image_size', None)
-    except Exception:
-        patch_size = None
-        model_img_size = None
-
-    try:
-        proc_size = processor.size if hasattr(processor, 'size') else None
-        if isinstance(proc_size, dict):
-            proc_size = proc_size.get('shortest_edge') or proc_size.get('height') or proc_size.get('width')
-    except Exception:
-        proc_size = None
-
-    target_image_size = None
-    for s in (proc_size, model_img_size, 224):
-        if s:
-            target_image_size = int(s)
-            break
-
-    inferred_patch = int(patch_size) if patch_size else 16
-    grid_size = target_image_size // inferred_patch
-
-    overlays: List[Image.Image] = []
-
-    if layer_idx >= len(attentions):
-        layer_idx = len(attentions) - 1
-
-    attn = attentions[layer_idx]  # (batch, heads, seq_len, seq_len)
-    attn = attn[0]  # remove batch -> (heads, seq_len, seq_len)
-
-    num_heads = attn.shape[0]
-
-    # Process each head separately
-    for head_idx in range(num_heads):
-        # CLS token is index 0; take attention from CLS to all patches (exclude CLS)
-        cls_attn = attn[head_idx, 0, 1:]  # (num_patches,)
-
-        # reshape to grid
-        try:
-            grid_h = grid_w = int(np.sqrt(cls_attn.shape[0]))
-        except Exception:
-            grid_h = grid_w = grid_size
-
-        attn_grid = cls_attn.cpu().numpy().reshape(grid_h, grid_w)
-
-        # Normalize between 0 and 1
-        attn_grid = (attn_grid - attn_grid.min()) / (attn_grid.max() - attn_grid.min() + 1e-12)
-
-        # Create overlay image
-        overlay = _create_overlay(pil_image, attn_grid, alpha=alpha)
-        overlays.append(overlay)
-
-    return overlays
+    maps = get_attention_analysis(model, processor, device).head_maps(pil_image, layer_idx)
+    return get_renderer('jet', alpha).render_stack(pil_image, maps)
 
 
 def get_attention_rollout(pil_image: Image.Image, model: ViTModel, processor, device: Optional[torch.device] = None, alpha: float = 0.6, discard_ratio: float = 0.9) -> Image.Image:
@@ -255,87 +253,5 @@ def get_attention_rollout(pil_image: Image.Image, model: ViTModel, processor, de
     Attention rollout follows the attention flow from the classification token through all layers.
     Returns a single PIL.Image overlay showing the accumulated attention.
     """
-    if device is None:
-        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-
-    # Prepare image for model
-    inputs = processor(images=pil_image, return_tensors='pt')
-    pixel_values = inputs.get('pixel_values')
-    if pixel_values is None:
-        raise RuntimeError('Processor did not return pixel_values')
-
-    pixel_values = pixel_values.to(device)
-
-    # Forward with attentions
-    with torch.no_grad():
-        outputs = model(pixel_values, output_attentions=True)
-
-    attentions = outputs.attentions  # tuple: (layer_count,) each tensor shape (batch, heads, seq_len, seq_len)
-
-    # Determine patch grid size
-    try:
-        patch_size = getattr(model.config, 'patch_size', None)
-        model_img_size = getattr(model.config, 'image_size', None)
-    except Exception:
-        patch_size = None
-        model_img_size = None
-
-    try:
-        proc_size = processor.size if hasattr(processor, 'size') else None
-        if isinstance(proc_size, dict):
-            proc_size = proc_size.get('shortest_edge') or proc_size.get('height') or proc_size.get('width')
-    except Exception:
-        proc_size = None
-
-    target_image_size = None
-    for s in (proc_size, model_img_size, 224):
-        if s:
-            target_image_size = int(s)
-            break
-
-    inferred_patch = int(patch_size) if patch_size else 16
-    grid_size = target_image_size // inferred_patch
-
-    # Convert to numpy and average over heads
-    result = None
-    for layer_idx, attn in enumerate(attentions):
-        attn = attn[0]  # remove batch -> (heads, seq_len, seq_len)
-        
-        # Average over heads
-        attn = attn.mean(axis=0).cpu().numpy()  # (seq_len, seq_len)
-        
-        # Add residual connection (identity matrix)
-        seq_len = attn.shape[0]
-        attn = attn + np.eye(seq_len)
-        
-        # Re-normalize
-        attn = attn / attn.sum(axis=-1, keepdims=True)
-        
-        if result is None:
-            result = attn
-        else:
-            # Matrix multiplication for rollout
-            result = np.matmul(attn, result)
-    
-    # Take CLS token attention to patches
-    cls_attn = result[0, 1:]  # (num_patches,)
-    
-    # Apply discard ratio (keep top attention values)
-    flat_attn = cls_attn.flatten()
-    threshold = np.percentile(flat_attn, discard_ratio * 100)
-    cls_attn = np.where(cls_attn < threshold, 0, cls_attn)
-    
-    # reshape to grid
-    try:
-        grid_h = grid_w = int(np.sqrt(cls_attn.shape[0]))
-    except Exception:
-        grid_h = grid_w = grid_size
-
-    attn_grid = cls_attn.reshape(grid_h, grid_w)
-
-    # Normalize between 0 and 1
-    attn_grid = (attn_grid - attn_grid.min()) / (attn_grid.max() - attn_grid.min() + 1e-12)
-
-    # Create overlay image
-    overlay = _create_overlay(pil_image, attn_grid, alpha=alpha)
-    return overlay
+    attn_grid = get_attention_analysis(model, processor, device).rollout_map(pil_image, discard_ratio)
+    return _create_overlay(pil_image, attn_grid, alpha=alpha)
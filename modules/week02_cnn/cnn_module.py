@@ -16,6 +16,7 @@ import matplotlib.pyplot as plt
 from core.base_processor import BaseImageProcessor
 from core.ai_models import AIModelManager
 from .filters import ImageFilters
+from .filter_pipeline import PipelineCache
 
 
 class InstagramFilterMaker:
@@ -24,6 +25,7 @@ class InstagramFilterMaker:
     def __init__(self):
         self.current_image = None
         self.original_image = None
+        self.pipelines = PipelineCache()
     
     def load_image_from_upload(self, uploaded_file):
         """📸 업로드된 사진 불러오기"""
@@ -164,6 +166,13 @@ class InstagramFilterMaker:
         plt.tight_layout()
         return fig, results
     
+    def apply_filter_chain(self, ops):
+        """🧪 여러 필터를 순서대로 한 번에 적용 (병합 실행)"""
+        if self.current_image is None:
+            return None
+
+        return self.pipelines.apply(self.current_image, ops)
+    
     def edge_detection_comparison(self):
         """🕵️ 탐정게임: 사진 속 경계선 찾기 대결!"""
         if self.current_image is None:
@@ -914,6 +923,43 @@ ISO: 400
                 else:
                     st.info("사진을 먼저 업로드하세요")
 
+            st.markdown("---")
+
+            # 연습문제 3: 필터 체인
+            st.subheader("🧪 연습문제 3: 나만의 필터 체인")
+            st.caption("밝기·대비·감마는 LUT 하나로, 연속된 블러 컨볼루션은 커널 하나로 합쳐서 한 번에 적용해요!")
+
+            if filter_maker.current_image is not None:
+                chain_col1, chain_col2 = st.columns(2)
+
+                with chain_col1:
+                    chain_brightness = st.slider("밝기", 0.5, 2.0, 1.1, 0.1, key="instagram_chain_brightness")
+                    chain_contrast = st.slider("대비", 0.5, 2.0, 1.2, 0.1, key="instagram_chain_contrast")
+                    chain_gamma = st.slider("감마", 0.5, 2.0, 1.0, 0.1, key="instagram_chain_gamma")
+                    chain_kernels = st.multiselect(
+                        "컨볼루션 필터 (순서대로)",
+                        ['blur', 'sharpen', 'emboss', 'edge'],
+                        default=['blur', 'sharpen'],
+                        key="instagram_chain_kernels"
+                    )
+
+                ops = [
+                    ('brightness', {'factor': chain_brightness}),
+                    ('contrast', {'factor': chain_contrast}),
+                    ('gamma', {'gamma': chain_gamma}),
+                ] + [(name, {'ksize': 3} if name == 'blur' else {}) for name in chain_kernels]
+
+                with chain_col2:
+                    if st.button("필터 체인 적용", key="instagram_apply_chain"):
+                        chained = filter_maker.apply_filter_chain(ops)
+                        st.image(cv2.cvtColor(chained, cv2.COLOR_BGR2RGB), caption="필터 체인 결과")
+                        stages = filter_maker.pipelines.get(ops).describe()
+                        st.write(f"**{len(ops)}단계 → {len(stages)}번의 전체 이미지 처리**")
+                        for stage in stages:
+                            st.write(f"- {stage}")
+            else:
+                st.info("사진을 먼저 업로드하세요")
+
     def _create_checkerboard(self, size=100, square_size=10):
         """🏁 체스판 만들기"""
         checkerboard = np.zeros((size, size), dtype=np.uint8)
@@ -0,0 +1,300 @@
+"""
+im2col 기반 Convolution / Pooling 엔진
+ManualCNN의 4중 루프 구현을 대체하는 벡터화 버전입니다.
+
+- Convolution: stride-tricks로 윈도우 뷰 생성 → im2col 행렬 → GEMM (행렬곱)
+- Max Pooling: 윈도우 뷰에서 한 번에 max
+- stride, padding, dilation, groups 지원
+"""
+
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+IntPair = Union[int, Tuple[int, int]]
+
+
+def _pair(value: IntPair) -> Tuple[int, int]:
+    return (value, value) if isinstance(value, int) else tuple(value)
+
+
+def _windows(x: np.ndarray, kernel_size: IntPair, stride: IntPair,
+             dilation: IntPair) -> np.ndarray:
+    """
+    (N, C, H, W) 입력의 슬라이딩 윈도우 뷰 (복사 없음)
+
+    Returns:
+        (N, C, OH, OW, KH, KW) 뷰
+    """
+    kh, kw = _pair(kernel_size)
+    sh, sw = _pair(stride)
+    dh, dw = _pair(dilation)
+
+    # dilation이 적용된 실제 receptive field 크기
+    span_h = dh * (kh - 1) + 1
+    span_w = dw * (kw - 1) + 1
+
+    view = sliding_window_view(x, (span_h, span_w), axis=(2, 3))
+    return view[:, :, ::sh, ::sw, ::dh, ::dw]
+
+
+def im2col(x: np.ndarray, kernel_size: IntPair, stride: IntPair = 1,
+           padding: IntPair = 0, dilation: IntPair = 1) -> Tuple[np.ndarray, int, int]:
+    """
+    im2col 변환
+
+    Args:
+        x: 입력 (N, C, H, W)
+
+    Returns:
+        cols: (N * OH * OW, C * KH * KW) 행렬
+        out_height, out_width
+    """
+    ph, pw = _pair(padding)
+    if ph or pw:
+        x = np.pad(x, ((0, 0), (0, 0), (ph, ph), (pw, pw)))
+
+    windows = _windows(x, kernel_size, stride, dilation)
+    n, c, oh, ow, kh, kw = windows.shape
+    cols = windows.transpose(0, 2, 3, 1, 4, 5).reshape(n * oh * ow, c * kh * kw)
+    return cols, oh, ow
+
+
+def conv2d(x: np.ndarray, weight: np.ndarray, bias: Optional[np.ndarray] = None,
+           stride: IntPair = 1, padding: IntPair = 0, dilation: IntPair = 1,
+           groups: int = 1) -> np.ndarray:
+    """
+    2D Convolution (torch.nn.functional.conv2d와 동일한 의미)
+
+    Args:
+        x: 입력 (N, C_in, H, W)
+        weight: 커널 (C_out, C_in / groups, KH, KW)
+        bias: 편향 (C_out,)
+
+    Returns:
+        출력 (N, C_out, OH, OW)
+    """
+    n, c_in = x.shape[:2]
+    c_out, c_per_group, kh, kw = weight.shape
+
+    if c_in != c_per_group * groups or c_out % groups:
+        raise ValueError(
+            f"channel mismatch: input {c_in}, weight {tuple(weight.shape)}, groups {groups}"
+        )
+
+    out_per_group = c_out // groups
+    outputs = []
+
+    for g in range(groups):
+        x_g = x[:, g * c_per_group:(g + 1) * c_per_group]
+        w_g = weight[g * out_per_group:(g + 1) * out_per_group].reshape(out_per_group, -1)
+
+        cols, oh, ow = im2col(x_g, (kh, kw), stride, padding, dilation)
+        # GEMM: (N*OH*OW, C*KH*KW) @ (C*KH*KW, C_out)
+        outputs.append((cols @ w_g.T).reshape(n, oh, ow, out_per_group))
+
+    out = np.concatenate(outputs, axis=3) if groups > 1 else outputs[0]
+    if bias is not None:
+        out = out + bias
+
+    return np.ascontiguousarray(out.transpose(0, 3, 1, 2))
+
+
+def _lowest(dtype: np.dtype):
+    """max pooling 패딩값: 실수는 -inf, 정수(uint8 이미지 등)는 해당 dtype의 최솟값"""
+    if np.issubdtype(dtype, np.integer):
+        return np.iinfo(dtype).min
+    if np.issubdtype(dtype, np.bool_):
+        return False
+    return -np.inf
+
+
+def max_pool2d(x: np.ndarray, kernel_size: IntPair = 2, stride: Optional[IntPair] = None,
+               padding: IntPair = 0, dilation: IntPair = 1) -> np.ndarray:
+    """
+    2D Max Pooling (torch.nn.functional.max_pool2d와 동일한 의미)
+
+    Args:
+        x: 입력 (N, C, H, W)
+        stride: None이면 kernel_size와 동일
+    """
+    stride = kernel_size if stride is None else stride
+    ph, pw = _pair(padding)
+    if ph or pw:
+        x = np.pad(x, ((0, 0), (0, 0), (ph, ph), (pw, pw)), constant_values=_lowest(x.dtype))
+
+    return _windows(x, kernel_size, stride, dilation).max(axis=(4, 5))
+
+
+def conv2d_single(image: np.ndarray, kernel: np.ndarray, padding: int = 0,
+                  stride: int = 1) -> np.ndarray:
+    """
+    단일 채널 2D 이미지용 Convolution (02_image_filtering_convolution의 시그니처)
+    """
+    out = conv2d(image[None, None].astype(np.float64), kernel[None, None].astype(np.float64),
+                 stride=stride, padding=padding)
+    return out[0, 0]
+
+
+class Im2ColEngine:
+    """
+    ManualCNN과 같은 시그니처의 벡터화 엔진
+    torch.Tensor 입력이면 torch.Tensor를, NumPy 입력이면 NumPy 배열을 반환
+    """
+
+    @staticmethod
+    def _to_numpy(value):
+        if hasattr(value, 'detach'):
+            return value.detach().cpu().numpy(), True
+        return np.asarray(value), False
+
+    @staticmethod
+    def _wrap(array: np.ndarray, as_torch: bool):
+        if as_torch:
+            import torch
+            return torch.from_numpy(np.ascontiguousarray(array))
+        return array
+
+    def manual_convolution_2d(self, input_tensor, kernel, stride=1, padding=0,
+                              dilation=1, groups=1, bias=None):
+        """
+        2D Convolution (im2col + GEMM)
+
+        Args:
+            input_tensor: (batch, channels, height, width)
+            kernel: (out_channels, in_channels / groups, kernel_height, kernel_width)
+        """
+        x, as_torch = self._to_numpy(input_tensor)
+        w, _ = self._to_numpy(kernel)
+        b = self._to_numpy(bias)[0] if bias is not None else None
+        return self._wrap(conv2d(x, w, b, stride, padding, dilation, groups), as_torch)
+
+    def manual_max_pooling_2d(self, input_tensor, kernel_size=2, stride=2,
+                              padding=0, dilation=1):
+        """2D Max Pooling (윈도우 뷰)"""
+        x, as_torch = self._to_numpy(input_tensor)
+        return self._wrap(max_pool2d(x, kernel_size, stride, padding, dilation), as_torch)
+
+
+def _loop_conv2d(x: np.ndarray, weight: np.ndarray, stride: int = 1,
+                 padding: int = 0) -> np.ndarray:
+    """비교 기준: ManualCNN과 같은 4중 루프 구현"""
+    if padding:
+        x = np.pad(x, ((0, 0), (0, 0), (padding, padding), (padding, padding)))
+    n, _, h, w = x.shape
+    c_out, _, kh, kw = weight.shape
+    oh = (h - kh) // stride + 1
+    ow = (w - kw) // stride + 1
+    out = np.zeros((n, c_out, oh, ow), dtype=x.dtype)
+
+    for b in range(n):
+        for oc in range(c_out):
+            for i in range(oh):
+                for j in range(ow):
+                    window = x[b, :, i * stride:i * stride + kh, j * stride:j * stride + kw]
+                    out[b, oc, i, j] = np.sum(window * weight[oc])
+
+    return out
+
+
+def verify_against_torch(seed: int = 0, atol: float = 1e-4) -> List[Dict]:
+    """
+    torch.nn.functional.conv2d / max_pool2d와 수치 동등성 검증
+
+    Returns:
+        설정별 최대 오차 리스트 (모두 atol 이하면 통과)
+    """
+    import torch
+    import torch.nn.functional as F
+
+    rng = np.random.default_rng(seed)
+    conv_cases = [
+        dict(shape=(2, 3, 17, 19), out=4, k=3, stride=1, padding=0, dilation=1, groups=1),
+        dict(shape=(1, 4, 32, 32), out=8, k=5, stride=2, padding=2, dilation=1, groups=2),
+        dict(shape=(2, 6, 24, 20), out=6, k=3, stride=1, padding=2, dilation=2, groups=6),
+        dict(shape=(1, 3, 28, 28), out=6, k=(3, 5), stride=(2, 1), padding=(1, 2), dilation=1, groups=1),
+    ]
+    pool_cases = [
+        dict(shape=(2, 3, 16, 16), k=2, stride=2, padding=0, dilation=1),
+        dict(shape=(1, 4, 15, 17), k=3, stride=2, padding=1, dilation=1),
+        dict(shape=(1, 2, 20, 20), k=2, stride=1, padding=0, dilation=2),
+    ]
+
+    results = []
+    for case in conv_cases:
+        kh, kw = _pair(case['k'])
+        x = rng.standard_normal(case['shape']).astype(np.float32)
+        w = rng.standard_normal((case['out'], case['shape'][1] // case['groups'], kh, kw)).astype(np.float32)
+        b = rng.standard_normal(case['out']).astype(np.float32)
+        ours = conv2d(x, w, b, case['stride'], case['padding'], case['dilation'], case['groups'])
+        ref = F.conv2d(torch.from_numpy(x), torch.from_numpy(w), torch.from_numpy(b),
+                       case['stride'], case['padding'], case['dilation'], case['groups']).numpy()
+        results.append({'op': 'conv2d', **case, 'max_abs_diff': float(np.abs(ours - ref).max())})
+
+    for case in pool_cases:
+        x = rng.standard_normal(case['shape']).astype(np.float32)
+        ours = max_pool2d(x, case['k'], case['stride'], case['padding'], case['dilation'])
+        ref = F.max_pool2d(torch.from_numpy(x), case['k'], case['stride'],
+                           case['padding'], case['dilation']).numpy()
+        results.append({'op': 'max_pool2d', **case, 'max_abs_diff': float(np.abs(ours - ref).max())})
+
+    for result in results:
+        result['passed'] = result['max_abs_diff'] <= atol
+
+    return results
+
+
+def benchmark_conv_engine(sizes: Sequence[int] = (28, 56, 112, 224), in_channels: int = 3,
+                          out_channels: int = 16, kernel_size: int = 3, repeats: int = 3,
+                          loop_max_size: int = 56) -> List[Dict]:
+    """
+    입력 크기별 속도 비교: 4중 루프 vs im2col 엔진 vs PyTorch
+
+    4중 루프는 느리므로 loop_max_size 이하 크기에서만 측정합니다.
+    """
+    import torch
+    import torch.nn.functional as F
+
+    def best_of(fn) -> float:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000
+
+    rng = np.random.default_rng(0)
+    results = []
+
+    for size in sizes:
+        x = rng.standard_normal((1, in_channels, size, size)).astype(np.float32)
+        w = rng.standard_normal((out_channels, in_channels, kernel_size, kernel_size)).astype(np.float32)
+        xt, wt = torch.from_numpy(x), torch.from_numpy(w)
+
+        row = {
+            'size': size,
+            'im2col_ms': best_of(lambda: conv2d(x, w, padding=1)),
+            'maxpool_ms': best_of(lambda: max_pool2d(x, 2, 2)),
+            'torch_ms': best_of(lambda: F.conv2d(xt, wt, padding=1)),
+            'loop_ms': None,
+        }
+        if size <= loop_max_size:
+            row['loop_ms'] = best_of(lambda: _loop_conv2d(x, w, padding=1))
+
+        results.append(row)
+        loop = f"{row['loop_ms']:.1f}ms" if row['loop_ms'] is not None else "skipped"
+        print(f"{size}x{size}: loop {loop}, im2col {row['im2col_ms']:.2f}ms, "
+              f"maxpool {row['maxpool_ms']:.2f}ms, torch {row['torch_ms']:.2f}ms")
+
+    return results
+
+
+if __name__ == "__main__":
+    print("=== 수치 동등성 검증 (vs torch) ===")
+    for r in verify_against_torch():
+        print(f"{'✅' if r['passed'] else '❌'} {r['op']} {r['shape']}: {r['max_abs_diff']:.2e}")
+
+    print("\n=== 입력 크기별 벤치마크 ===")
+    benchmark_conv_engine()
@@ -6,8 +6,9 @@
 import numpy as np
 import cv2
 from PIL import Image
-from typing import Union, Optional
+from typing import Union, Optional, Sequence
 from core.utils import FilterUtils
+from .filter_pipeline import OpSpec, PipelineCache
 
 class ImageFilters:
     """이미지 필터 클래스"""
@@ -15,6 +16,7 @@ class ImageFilters:
     def __init__(self):
         self.filters = self._initialize_filters()
         self.filter_utils = FilterUtils()
+        self._pipelines = PipelineCache(color_order='rgb')
 
     def _initialize_filters(self) -> dict:
         """필터 초기화"""
@@ -91,6 +93,13 @@ class ImageFilters:
         else:
             return filtered
 
+    def apply_filter_chain(self, image: Union[Image.Image, np.ndarray],
+                           ops: Sequence[OpSpec]) -> Union[Image.Image, np.ndarray]:
+        """필터 체인 적용 (픽셀 연산은 LUT 하나로, 연속 커널은 하나로 병합)"""
+        if isinstance(image, Image.Image):
+            return Image.fromarray(self._pipelines.apply(np.array(image), ops))
+        return self._pipelines.apply(image, ops)
+
     def apply_custom_filter(self, image: Union[Image.Image, np.ndarray],
                           kernel: np.ndarray) -> Union[Image.Image, np.ndarray]:
         """커스텀 필터 적용"""
@@ -11,6 +11,11 @@ import matplotlib.pyplot as plt
 import cv2
 from scipy import signal
 import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+from modules.week02_cnn.conv_engine import conv2d_single
 
 class ImageFilteringConvolution:
     """이미지 필터링과 Convolution 실습 클래스"""
@@ -112,6 +117,13 @@ class ImageFilteringConvolution:
 
         return output
 
+    def fast_convolution_2d(self, image, kernel, padding=0, stride=1):
+        """
+        manual_convolution_2d와 같은 시그니처의 im2col + GEMM 버전
+        이중 루프 없이 윈도우 뷰와 행렬곱 한 번으로 계산
+        """
+        return conv2d_single(image, kernel, padding=padding, stride=stride)
+
     def demonstrate_convolution_process(self):
         """2.2 Convolution 연산 과정 시각화"""
         print("\n=== 2.2 Convolution 연산 과정 ===")
@@ -194,6 +206,10 @@ class ImageFilteringConvolution:
         plt.savefig('02_convolution_process.png', dpi=150, bbox_inches='tight')
         plt.show()
 
+        # 루프 구현 vs im2col 구현 결과 비교
+        fast_result = self.fast_convolution_2d(test_image, kernel, padding=1)
+        print(f"\n루프 vs im2col 최대 오차: {np.abs(padded_result - fast_result).max():.2e}")
+
         # 출력 크기 계산 공식
         print("\n📐 출력 크기 계산 공식:")
         print("Output = (Input - Kernel + 2×Padding) / Stride + 1")
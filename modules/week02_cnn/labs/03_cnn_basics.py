@@ -13,6 +13,12 @@ import torch.nn as nn
 import torch.nn.functional as F
 from PIL import Image
 import cv2
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+from modules.week02_cnn.conv_engine import Im2ColEngine, benchmark_conv_engine
 
 class ManualCNN:
     """CNN 구성 요소들을 수동으로 구현한 클래스"""
@@ -380,6 +386,20 @@ def main():
     # 결과 비교
     diff = torch.abs(output - pytorch_output).max()
     print(f"수동 구현과 PyTorch 구현 차이: {diff:.6f}")
+
+    # im2col 엔진 (같은 시그니처, 벡터화)
+    engine = Im2ColEngine()
+    start = time.perf_counter()
+    fast_output = engine.manual_convolution_2d(input_tensor, kernel, padding=2)
+    fast_ms = (time.perf_counter() - start) * 1000
+    print(f"im2col 엔진과 PyTorch 구현 차이: {torch.abs(fast_output - pytorch_output).max():.6f} ({fast_ms:.2f}ms)")
+
+    pooled = manual_cnn.manual_max_pooling_2d(output)
+    fast_pooled = engine.manual_max_pooling_2d(fast_output)
+    print(f"Max Pooling 차이 (루프 vs 윈도우 뷰): {torch.abs(pooled - fast_pooled).max():.6f}")
+
+    print("\n1-1. 입력 크기별 벤치마크 (루프 vs im2col vs PyTorch)")
+    benchmark_conv_engine(sizes=(28, 56, 112, 224))
     
     # 2. 아키텍처 비교
     print("\n2. CNN 아키텍처 비교")
@@ -15,6 +15,11 @@ import streamlit as st
 import matplotlib.pyplot as plt
 from PIL import Image
 import io
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+from modules.week02_cnn.filter_pipeline import PipelineCache
 
 # 한글 폰트 설정 (matplotlib)
 plt.rcParams['font.family'] = ['DejaVu Sans', 'Arial Unicode MS', 'Malgun Gothic']
@@ -26,6 +31,7 @@ class InstagramFilterMaker:
     def __init__(self):
         self.current_image = None
         self.original_image = None
+        self.pipelines = PipelineCache()
     
     def load_image_from_upload(self, uploaded_file):
         """📸 업로드된 사진 불러오기"""
@@ -166,6 +172,13 @@ class InstagramFilterMaker:
         plt.tight_layout()
         return fig, results
     
+    def apply_filter_chain(self, ops):
+        """🧪 여러 필터를 순서대로 한 번에 적용 (병합 실행)"""
+        if self.current_image is None:
+            return None
+
+        return self.pipelines.apply(self.current_image, ops)
+    
     def edge_detection_comparison(self):
         """🕵️ 탐정게임: 사진 속 경계선 찾기 대결!"""
         if self.current_image is None:
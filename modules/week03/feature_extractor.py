@@ -0,0 +1,319 @@
+"""
+Feature Extraction Service
+사전훈련 모델의 중간 레이어 활성화를 실제로 추출하는 서비스
+
+- 요청된 레이어에만 forward hook 등록
+- 가장 깊은 요청 레이어에 도달하면 순전파 조기 종료
+- 결과는 float16 배열로 반환, (이미지 해시, 모델, 레이어) 단위 캐싱
+- 디렉터리 단위 배치 추출 (오프라인 분석용)
+- 모델별 잠금으로 hook 등록~순전파 구간 직렬화, 캐시 접근은 별도 잠금
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torchvision.models as models
+import torchvision.transforms as transforms
+from PIL import Image
+
+
+# 모델별 레이어 별칭 → 실제 모듈 경로 (UI의 레이어 깊이 선택과 대응)
+MODEL_LAYERS = {
+    'ResNet50': {
+        'Early layers': 'layer1',
+        'Middle layers': 'layer2',
+        'Late layers': 'layer3',
+        'Final layer': 'layer4',
+    },
+    'VGG16': {
+        'Early layers': 'features.4',
+        'Middle layers': 'features.16',
+        'Late layers': 'features.23',
+        'Final layer': 'features.30',
+    },
+    'EfficientNet': {
+        'Early layers': 'features.2',
+        'Middle layers': 'features.4',
+        'Late layers': 'features.6',
+        'Final layer': 'features.8',
+    },
+    'CLIP': {
+        'Early layers': 'encoder.layers.2',
+        'Middle layers': 'encoder.layers.5',
+        'Late layers': 'encoder.layers.8',
+        'Final layer': 'encoder.layers.11',
+    },
+}
+
+CLIP_MODEL_NAME = 'openai/clip-vit-base-patch32'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+class _StopForward(Exception):
+    """요청된 레이어를 모두 수집했을 때 순전파를 중단하기 위한 내부 신호"""
+
+
+def image_hash(image: Image.Image) -> str:
+    """이미지 픽셀 기반 해시 (캐시 키)"""
+    rgb = image.convert('RGB')
+    digest = hashlib.sha1(f"{rgb.size}".encode())
+    digest.update(rgb.tobytes())
+    return digest.hexdigest()
+
+
+class FeatureExtractionService:
+    """
+    레이어 활성화 추출 서비스
+    ResNet50 / VGG16 / EfficientNet / CLIP 지원
+    """
+
+    def __init__(self, device: Optional[str] = None, max_cache_entries: int = 256):
+        """
+        Args:
+            device: 'cpu' 또는 'cuda' (None이면 자동 선택)
+            max_cache_entries: 캐시할 최대 (이미지, 모델, 레이어) 항목 수 (LRU)
+        """
+        self.device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
+        self.max_cache_entries = max_cache_entries
+        self._models: Dict[str, nn.Module] = {}
+        self._transforms = {}
+        self._cache: "OrderedDict[Tuple[str, str, str], np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # 같은 모델에 동시에 hook을 걸면 서로의 hook이 호출되므로 모델 단위로 직렬화
+        self._model_locks: Dict[str, threading.Lock] = {}
+        self._model_locks_guard = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 모델 / 전처리
+    # ------------------------------------------------------------------
+    def _model_lock(self, model_name: str) -> threading.Lock:
+        """모델별 잠금 (없으면 생성)"""
+        with self._model_locks_guard:
+            if model_name not in self._model_locks:
+                self._model_locks[model_name] = threading.Lock()
+            return self._model_locks[model_name]
+
+    def _load_model(self, model_name: str) -> nn.Module:
+        """모델 지연 로드 (한 번 로드 후 재사용)"""
+        with self._model_lock(model_name):
+            if model_name not in self._models:
+                self._models[model_name] = self._build_model(model_name)
+            return self._models[model_name]
+
+    def _build_model(self, model_name: str) -> nn.Module:
+        """모델과 전처리 생성"""
+        if model_name == 'ResNet50':
+            model = models.resnet50(pretrained=True)
+        elif model_name == 'VGG16':
+            model = models.vgg16(pretrained=True)
+        elif model_name == 'EfficientNet':
+            model = models.efficientnet_b0(pretrained=True)
+        elif model_name == 'CLIP':
+            from transformers import CLIPImageProcessor, CLIPVisionModel
+            model = CLIPVisionModel.from_pretrained(CLIP_MODEL_NAME)
+            self._transforms[model_name] = CLIPImageProcessor.from_pretrained(CLIP_MODEL_NAME)
+        else:
+            raise ValueError(f"Unsupported model: {model_name}")
+
+        if model_name not in self._transforms:
+            self._transforms[model_name] = transforms.Compose([
+                transforms.Resize(256),
+                transforms.CenterCrop(224),
+                transforms.ToTensor(),
+                transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+            ])
+
+        return model.to(self.device).eval()
+
+    def _preprocess(self, model_name: str, images: Sequence[Image.Image]) -> torch.Tensor:
+        """이미지 리스트 → 배치 텐서"""
+        images = [img.convert('RGB') for img in images]
+        transform = self._transforms[model_name]
+
+        if model_name == 'CLIP':
+            pixel_values = transform(images=images, return_tensors='pt')['pixel_values']
+        else:
+            pixel_values = torch.stack([transform(img) for img in images])
+
+        return pixel_values.to(self.device)
+
+    def resolve_layer(self, model_name: str, layer: str) -> str:
+        """레이어 별칭('Early layers' 등)을 모듈 경로로 변환"""
+        return MODEL_LAYERS.get(model_name, {}).get(layer, layer)
+
+    def available_layers(self, model_name: str) -> List[str]:
+        """레이어 별칭 목록"""
+        return list(MODEL_LAYERS.get(model_name, {}).keys())
+
+    # ------------------------------------------------------------------
+    # 추출
+    # ------------------------------------------------------------------
+    def _run_hooks(self, model_name: str, pixel_values: torch.Tensor,
+                   layer_paths: List[str]) -> Dict[str, np.ndarray]:
+        """요청 레이어에만 hook을 걸고, 모두 수집되면 순전파 중단"""
+        with self._model_lock(model_name):
+            return self._run_hooks_locked(model_name, pixel_values, layer_paths)
+
+    def _run_hooks_locked(self, model_name: str, pixel_values: torch.Tensor,
+                          layer_paths: List[str]) -> Dict[str, np.ndarray]:
+        """_run_hooks 본체 (모델 잠금을 잡은 상태에서 호출)"""
+        model = self._models[model_name]
+        modules = dict(model.named_modules())
+        captured: Dict[str, np.ndarray] = {}
+        handles = []
+
+        for path in layer_paths:
+            # transformers 버전에 따라 CLIP 레이어가 vision_model 하위에 있음
+            module = modules.get(path, modules.get(f"vision_model.{path}"))
+            if module is None:
+                raise ValueError(f"{model_name}에 '{path}' 레이어가 없습니다")
+
+            def hook(module, inputs, output, path=path):
+                if isinstance(output, tuple):  # transformer 레이어는 (hidden_states, ...)
+                    output = output[0]
+                captured[path] = output.detach().to(torch.float16).cpu().numpy()
+                if len(captured) == len(set(layer_paths)):
+                    raise _StopForward
+
+            handles.append(module.register_forward_hook(hook))
+
+        try:
+            with torch.inference_mode():
+                model(pixel_values)
+        except _StopForward:
+            pass
+        finally:
+            for handle in handles:
+                handle.remove()
+
+        return captured
+
+    def extract(self, image: Image.Image, model_name: str,
+                layers: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        단일 이미지의 레이어 활성화 추출
+
+        Args:
+            image: PIL 이미지
+            model_name: 'ResNet50', 'VGG16', 'EfficientNet', 'CLIP'
+            layers: 레이어 별칭 또는 모듈 경로 리스트
+
+        Returns:
+            {요청한 레이어 이름: float16 배열 (C, H, W) 또는 (tokens, dim)}
+        """
+        key_hash = image_hash(image)
+        results = {}
+        missing = []
+
+        with self._cache_lock:
+            for layer in layers:
+                key = (key_hash, model_name, self.resolve_layer(model_name, layer))
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[layer] = self._cache[key]
+                else:
+                    missing.append(layer)
+
+        if missing:
+            self._load_model(model_name)
+            paths = [self.resolve_layer(model_name, layer) for layer in missing]
+            captured = self._run_hooks(model_name, self._preprocess(model_name, [image]), paths)
+
+            for layer, path in zip(missing, paths):
+                results[layer] = captured[path][0]
+                self._put_cache((key_hash, model_name, path), results[layer])
+
+        return {layer: results[layer] for layer in layers}
+
+    def extract_batch(self, images: Sequence[Image.Image], model_name: str,
+                      layers: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        이미지 배치의 레이어 활성화 추출 (캐시 미사용)
+
+        Returns:
+            {레이어 이름: float16 배열 (N, ...)}
+        """
+        self._load_model(model_name)
+        paths = [self.resolve_layer(model_name, layer) for layer in layers]
+        captured = self._run_hooks(model_name, self._preprocess(model_name, images), paths)
+        return {layer: captured[path] for layer, path in zip(layers, paths)}
+
+    def extract_directory(self, image_dir: str, model_name: str, layers: Sequence[str],
+                          batch_size: int = 16,
+                          output_path: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        디렉터리의 모든 이미지에 대해 배치 추출
+
+        Args:
+            output_path: 지정 시 레이어별 배열과 파일 목록을 .npz로 저장
+
+        Returns:
+            {레이어 이름: float16 배열 (N, ...)}, 'files' 키에 파일 경로 목록
+        """
+        files = sorted(
+            p for p in Path(image_dir).rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS
+        )
+        chunks: Dict[str, List[np.ndarray]] = {layer: [] for layer in layers}
+
+        for batch_files in self._batched(files, batch_size):
+            images = []
+            for f in batch_files:
+                with Image.open(f) as im:
+                    images.append(im.convert('RGB'))
+            batch = self.extract_batch(images, model_name, layers)
+            for layer in layers:
+                chunks[layer].append(batch[layer])
+
+        results = {
+            layer: np.concatenate(parts) if parts else np.empty((0,), dtype=np.float16)
+            for layer, parts in chunks.items()
+        }
+        results['files'] = np.array([str(f) for f in files])
+
+        if output_path:
+            np.savez(output_path, **results)
+
+        return results
+
+    @staticmethod
+    def _batched(items: List, batch_size: int) -> Iterator[List]:
+        for start in range(0, len(items), batch_size):
+            yield items[start:start + batch_size]
+
+    # ------------------------------------------------------------------
+    # 캐시
+    # ------------------------------------------------------------------
+    def _put_cache(self, key: Tuple[str, str, str], value: np.ndarray):
+        with self._cache_lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cache_entries:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def cache_info(self) -> Dict[str, int]:
+        with self._cache_lock:
+            return {
+                'entries': len(self._cache),
+                'bytes': sum(v.nbytes for v in self._cache.values()),
+            }
+
+
+_service: Optional[FeatureExtractionService] = None
+
+
+def get_feature_service() -> FeatureExtractionService:
+    """프로세스 전역 특징 추출 서비스 인스턴스 반환"""
+    global _service
+    if _service is None:
+        _service = FeatureExtractionService()
+    return _service
@@ -11,16 +11,54 @@ import torch.nn as nn
 import torch.optim as optim
 from torch.optim import lr_scheduler
 from torchvision import datasets, models, transforms
+import torchvision.transforms.functional as TF
 from torch.utils.data import DataLoader
 import numpy as np
 import matplotlib.pyplot as plt
 import time
 import os
 import copy
-from typing import Dict, Tuple, Optional
+import hashlib
+import json
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Tuple, Optional
 from pathlib import Path
 
 
+def snapshot_state_dict(model: nn.Module) -> Dict[str, torch.Tensor]:
+    """
+    state_dict를 CPU 텐서로 복사 (deepcopy 없이 텐서 데이터만 복사)
+    """
+    return {k: v.detach().to('cpu', copy=True) for k, v in model.state_dict().items()}
+
+
+class AsyncCheckpointWriter:
+    """
+    체크포인트를 백그라운드 스레드에서 저장하는 writer
+    학습 루프는 CPU 스냅샷만 만들고 디스크 I/O를 기다리지 않음
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending: Optional[Future] = None
+
+    def save(self, checkpoint: Dict, path: str) -> Future:
+        """이전 저장이 끝날 때까지 기다린 뒤 새 저장 작업 제출"""
+        self.wait()
+        self._pending = self._executor.submit(torch.save, checkpoint, path)
+        return self._pending
+
+    def wait(self):
+        """진행 중인 저장 완료 대기 (예외는 여기서 전파)"""
+        if self._pending is not None:
+            self._pending.result()
+            self._pending = None
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown()
+
+
 class TransferLearningModel:
     """
     전이학습을 위한 종합 클래스
@@ -270,6 +308,403 @@ class TransferLearningModel:
         self.model.load_state_dict(best_model_wts)
         return self.model
     
+    def train_model_fast(
+        self,
+        dataloaders: Dict[str, DataLoader],
+        num_epochs: int = 25,
+        learning_rate: float = 0.001,
+        amp_dtype: Optional[str] = None,
+        channels_last: bool = False,
+        compile_model: bool = False,
+        accumulation_steps: int = 1,
+        checkpoint_path: Optional[str] = None
+    ) -> nn.Module:
+        """
+        성능 지향 학습 루프
+
+        Args:
+            amp_dtype: None(fp32), 'bfloat16'(CPU/GPU), 'float16'(GPU 전용) autocast
+            channels_last: 입력과 모델을 channels_last 메모리 포맷으로 변환
+            compile_model: torch.compile 적용
+            accumulation_steps: 그래디언트 누적 횟수 (유효 배치 = batch_size × steps)
+            checkpoint_path: 최고 성능 갱신 시 비동기로 저장할 경로
+
+        손실/정확도는 디바이스 텐서에 누적하고 에폭 끝에서 한 번만 동기화합니다.
+        에폭별 처리량(samples/sec)은 history['train_throughput']에 기록됩니다.
+        """
+        since = time.time()
+        device_type = self.device.type
+
+        dtype = getattr(torch, amp_dtype) if amp_dtype else None
+        if dtype == torch.float16 and device_type == 'cpu':
+            raise ValueError("float16 autocast는 GPU에서만 지원됩니다. CPU에서는 'bfloat16'을 사용하세요")
+
+        if channels_last:
+            self.model = self.model.to(memory_format=torch.channels_last)
+        memory_format = torch.channels_last if channels_last else torch.contiguous_format
+
+        # 컴파일된 모듈은 self.model과 파라미터를 공유
+        net = torch.compile(self.model) if compile_model else self.model
+
+        optimizer = self.get_optimizer(learning_rate)
+        scheduler = lr_scheduler.StepLR(optimizer, step_size=7, gamma=0.1)
+        criterion = nn.CrossEntropyLoss()
+        scaler = torch.amp.GradScaler(device_type, enabled=(dtype == torch.float16))
+
+        writer = AsyncCheckpointWriter() if checkpoint_path else None
+        best_model_wts = snapshot_state_dict(self.model)
+        best_acc = 0.0
+
+        self.history.setdefault('train_throughput', [])
+        dataset_sizes = {x: len(dataloaders[x].dataset) for x in ['train', 'val']}
+
+        for epoch in range(num_epochs):
+            print(f'Epoch {epoch+1}/{num_epochs}')
+            print('-' * 10)
+
+            for phase in ['train', 'val']:
+                is_train = phase == 'train'
+                net.train(is_train)
+
+                running_loss = torch.zeros((), device=self.device)
+                running_corrects = torch.zeros((), dtype=torch.long, device=self.device)
+                num_batches = len(dataloaders[phase])
+                phase_start = time.perf_counter()
+
+                if is_train:
+                    optimizer.zero_grad(set_to_none=True)
+
+                for step, (inputs, labels) in enumerate(dataloaders[phase]):
+                    inputs = inputs.to(self.device, non_blocking=True,
+                                       memory_format=memory_format)
+                    labels = labels.to(self.device, non_blocking=True)
+
+                    with torch.set_grad_enabled(is_train), \
+                            torch.autocast(device_type, dtype=dtype, enabled=dtype is not None):
+                        outputs = net(inputs)
+                        loss = criterion(outputs, labels)
+
+                    if is_train:
+                        # 마지막 그룹이 accumulation_steps보다 짧으면 실제 배치 수로 나눠 평균을 맞춤
+                        group_start = step - step % accumulation_steps
+                        group_size = min(accumulation_steps, num_batches - group_start)
+                        scaler.scale(loss / group_size).backward()
+                        if (step + 1) % accumulation_steps == 0 or step + 1 == num_batches:
+                            scaler.step(optimizer)
+                            scaler.update()
+                            optimizer.zero_grad(set_to_none=True)
+
+                    # 디바이스에서 누적 (배치마다 .item() 동기화 없음)
+                    running_loss += loss.detach().float() * inputs.size(0)
+                    running_corrects += (outputs.detach().argmax(1) == labels).sum()
+
+                if is_train:
+                    scheduler.step()
+
+                # 에폭당 한 번만 동기화
+                epoch_loss = running_loss.item() / dataset_sizes[phase]
+                epoch_acc = running_corrects.item() / dataset_sizes[phase]
+                throughput = dataset_sizes[phase] / (time.perf_counter() - phase_start)
+
+                print(f'{phase} Loss: {epoch_loss:.4f} Acc: {epoch_acc:.4f} '
+                      f'({throughput:.1f} samples/sec)')
+
+                self.history[f'{phase}_loss'].append(epoch_loss)
+                self.history[f'{phase}_acc'].append(epoch_acc)
+                if is_train:
+                    self.history['train_throughput'].append(throughput)
+
+                if phase == 'val' and epoch_acc > best_acc:
+                    best_acc = epoch_acc
+                    best_model_wts = snapshot_state_dict(self.model)
+                    if writer:
+                        writer.save({
+                            'model_state_dict': best_model_wts,
+                            'model_name': self.model_name,
+                            'num_classes': self.num_classes,
+                            'feature_extract': self.feature_extract,
+                            'epoch': epoch,
+                            'best_acc': best_acc
+                        }, checkpoint_path)
+
+            print()
+
+        if writer:
+            writer.close()
+
+        time_elapsed = time.time() - since
+        print(f'Training complete in {time_elapsed//60:.0f}m {time_elapsed%60:.0f}s')
+        print(f'Best val Acc: {best_acc:.4f}')
+
+        self.model.load_state_dict(best_model_wts)
+        return self.model
+
+    def _split_backbone_head(self) -> Tuple[nn.Module, nn.Module]:
+        """
+        동결된 백본(trunk)과 학습 대상 헤드로 모델 분리
+        trunk 출력은 (N, D) 형태의 pooled feature
+        """
+        model = self.model
+
+        if self.model_name == "resnet50":
+            trunk = nn.Sequential(
+                *[m for name, m in model.named_children() if name != 'fc'],
+                nn.Flatten(1)
+            )
+            head = model.fc
+
+        elif self.model_name == "vgg16":
+            # classifier[0:6]도 동결 상태이므로 trunk에 포함 (4096차원 특징)
+            trunk = nn.Sequential(
+                model.features, model.avgpool, nn.Flatten(1), model.classifier[:6]
+            )
+            head = model.classifier[6]
+
+        elif self.model_name in ("efficientnet_b0", "mobilenet_v2"):
+            pool = model.avgpool if hasattr(model, 'avgpool') else nn.AdaptiveAvgPool2d(1)
+            trunk = nn.Sequential(model.features, pool, nn.Flatten(1))
+            head = model.classifier
+
+        else:
+            raise ValueError(f"Invalid model name: {self.model_name}")
+
+        if any(p.requires_grad for p in trunk.parameters()):
+            raise ValueError(
+                "Feature caching은 백본이 완전히 동결된 경우(feature_extract=True)에만 사용할 수 있습니다"
+            )
+
+        return trunk, head
+
+    @staticmethod
+    def _make_views(inputs: torch.Tensor, num_crops: int) -> List[torch.Tensor]:
+        """
+        증강 없는(결정적) multi-crop 뷰 생성
+        1: 원본, 2: 원본+좌우반전, 5: FiveCrop, 10: TenCrop
+        """
+        if num_crops == 1:
+            return [inputs]
+        if num_crops == 2:
+            return [inputs, torch.flip(inputs, dims=[3])]
+
+        crop_size = int(round(min(inputs.shape[-2:]) * 0.875))
+        if num_crops == 5:
+            return list(TF.five_crop(inputs, crop_size))
+        if num_crops == 10:
+            return list(TF.ten_crop(inputs, crop_size))
+
+        raise ValueError(f"num_crops must be one of 1, 2, 5, 10 (got {num_crops})")
+
+    def _feature_cache_fingerprint(
+        self,
+        dataloader: DataLoader,
+        trunk: nn.Module,
+        num_crops: int,
+        dtype: str
+    ) -> str:
+        """
+        특징 캐시 유효성 검사용 지문
+        데이터 파일 목록(경로, 크기, mtime), 변환 repr, 백본 가중치 해시, dtype, crop 수 기반
+        """
+        dataset = dataloader.dataset
+        digest = hashlib.sha1()
+
+        samples = getattr(dataset, 'samples', None)
+        if samples is not None:
+            for path, label in samples:
+                stat = os.stat(path)
+                digest.update(f"{path}|{label}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+        else:
+            digest.update(f"{type(dataset).__name__}|{len(dataset)}".encode())
+
+        digest.update(repr(getattr(dataset, 'transform', None)).encode())
+        digest.update(f"{self.model_name}|{dtype}|{num_crops}".encode())
+
+        for name, tensor in trunk.state_dict().items():
+            digest.update(name.encode())
+            digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+
+        return digest.hexdigest()
+
+    def extract_features_to_cache(
+        self,
+        dataloader: DataLoader,
+        cache_path: str,
+        num_crops: int = 1,
+        dtype: str = 'float16',
+        reuse: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        동결된 백본을 한 번만 실행해 pooled feature를 memory-mapped 배열로 저장
+        reuse=True면 `{cache_path}_meta.json`의 지문(데이터/변환/가중치/dtype)이 같을 때만 재사용
+
+        Returns:
+            features: (num_crops, N, D) memmap
+            labels: (N,) int64 배열
+        """
+        feat_file = Path(f"{cache_path}_features.npy")
+        label_file = Path(f"{cache_path}_labels.npy")
+        meta_file = Path(f"{cache_path}_meta.json")
+        num_samples = len(dataloader.dataset)
+
+        trunk, _ = self._split_backbone_head()
+        trunk.eval()
+        fingerprint = self._feature_cache_fingerprint(dataloader, trunk, num_crops, dtype)
+
+        if reuse and feat_file.exists() and label_file.exists() and meta_file.exists():
+            meta = json.loads(meta_file.read_text())
+            if meta.get('fingerprint') == fingerprint:
+                features = np.load(feat_file, mmap_mode='r')
+                labels = np.load(label_file)
+                if features.shape[:2] == (num_crops, num_samples) and len(labels) == num_samples:
+                    print(f"Feature cache reused: {feat_file}")
+                    return features, labels
+
+        feat_file.parent.mkdir(parents=True, exist_ok=True)
+        # 쓰는 도중 중단되면 이전 지문이 남지 않도록 먼저 삭제
+        meta_file.unlink(missing_ok=True)
+
+        features = None
+        labels = np.empty(num_samples, dtype=np.int64)
+        offset = 0
+
+        with torch.inference_mode():
+            for inputs, batch_labels in dataloader:
+                inputs = inputs.to(self.device)
+                batch_size = inputs.size(0)
+
+                for view_idx, view in enumerate(self._make_views(inputs, num_crops)):
+                    feats = trunk(view).cpu().numpy()
+                    if features is None:
+                        # 첫 배치에서 특징 차원을 알아낸 뒤 memmap 생성
+                        features = np.lib.format.open_memmap(
+                            feat_file, mode='w+', dtype=np.dtype(dtype),
+                            shape=(num_crops, num_samples, feats.shape[1])
+                        )
+                    features[view_idx, offset:offset + batch_size] = feats
+
+                labels[offset:offset + batch_size] = batch_labels.numpy()
+                offset += batch_size
+
+        features.flush()
+        np.save(label_file, labels)
+        meta_file.write_text(json.dumps({'fingerprint': fingerprint, 'shape': list(features.shape)}))
+        print(f"Feature cache saved: {feat_file} {tuple(features.shape)}")
+
+        return np.load(feat_file, mmap_mode='r'), labels
+
+    def train_model_cached(
+        self,
+        dataloaders: Dict[str, DataLoader],
+        num_epochs: int = 25,
+        learning_rate: float = 0.001,
+        cache_dir: str = 'feature_cache',
+        num_crops: int = 1,
+        batch_size: int = 256,
+        dtype: str = 'float16',
+        reuse: bool = True
+    ) -> nn.Module:
+        """
+        Feature caching 모드 학습
+        백본은 train/val 각각 한 번만 실행하고, 이후 에폭은 캐시된 특징으로 헤드만 학습
+
+        dataloaders는 랜덤 증강이 없는 로더를 권장 (create_data_loaders(augment=False))
+        학습 시에는 매 에폭 샘플마다 multi-crop 뷰 중 하나를 무작위로 선택합니다.
+        """
+        since = time.time()
+        _, head = self._split_backbone_head()
+
+        # 1. 백본 특징 추출 (1회)
+        cache = {}
+        for phase in ['train', 'val']:
+            crops = num_crops if phase == 'train' else 1
+            cache[phase] = self.extract_features_to_cache(
+                dataloaders[phase],
+                os.path.join(cache_dir, f"{self.model_name}_{phase}_c{crops}"),
+                num_crops=crops,
+                dtype=dtype,
+                reuse=reuse
+            )
+        extract_time = time.time() - since
+        print(f'Feature extraction complete in {extract_time:.1f}s')
+
+        # 2. 헤드만 학습
+        optimizer = optim.Adam(head.parameters(), lr=learning_rate)
+        scheduler = lr_scheduler.StepLR(optimizer, step_size=7, gamma=0.1)
+        criterion = nn.CrossEntropyLoss()
+
+        best_head_wts = copy.deepcopy(head.state_dict())
+        best_acc = 0.0
+
+        for epoch in range(num_epochs):
+            print(f'Epoch {epoch+1}/{num_epochs}')
+            print('-' * 10)
+
+            for phase in ['train', 'val']:
+                features, labels = cache[phase]
+                num_samples = len(labels)
+
+                if phase == 'train':
+                    head.train()
+                    order = np.random.permutation(num_samples)
+                    views = np.random.randint(features.shape[0], size=num_samples)
+                else:
+                    head.eval()
+                    order = np.arange(num_samples)
+                    views = np.zeros(num_samples, dtype=np.int64)
+
+                running_loss = 0.0
+                running_corrects = 0
+
+                for start in range(0, num_samples, batch_size):
+                    idx = order[start:start + batch_size]
+                    # memmap fancy indexing은 정렬된 인덱스가 더 빠름
+                    sort = np.argsort(idx)
+                    idx, batch_views = idx[sort], views[idx[sort]]
+                    inputs = torch.from_numpy(
+                        np.asarray(features[batch_views, idx], dtype=np.float32)
+                    ).to(self.device)
+                    targets = torch.from_numpy(labels[idx]).to(self.device)
+
+                    optimizer.zero_grad()
+
+                    with torch.set_grad_enabled(phase == 'train'):
+                        outputs = head(inputs)
+                        _, preds = torch.max(outputs, 1)
+                        loss = criterion(outputs, targets)
+
+                        if phase == 'train':
+                            loss.backward()
+                            optimizer.step()
+
+                    running_loss += loss.item() * inputs.size(0)
+                    running_corrects += torch.sum(preds == targets).item()
+
+                if phase == 'train':
+                    scheduler.step()
+
+                epoch_loss = running_loss / num_samples
+                epoch_acc = running_corrects / num_samples
+
+                print(f'{phase} Loss: {epoch_loss:.4f} Acc: {epoch_acc:.4f}')
+
+                self.history[f'{phase}_loss'].append(epoch_loss)
+                self.history[f'{phase}_acc'].append(epoch_acc)
+
+                if phase == 'val' and epoch_acc > best_acc:
+                    best_acc = epoch_acc
+                    best_head_wts = copy.deepcopy(head.state_dict())
+
+            print()
+
+        time_elapsed = time.time() - since
+        print(f'Training complete in {time_elapsed//60:.0f}m {time_elapsed%60:.0f}s '
+              f'(extraction {extract_time:.1f}s)')
+        print(f'Best val Acc: {best_acc:.4f}')
+
+        # 헤드는 self.model의 하위 모듈이므로 전체 모델에 반영됨
+        head.load_state_dict(best_head_wts)
+        return self.model
+
     def plot_training_history(self):
         """
         학습 과정 시각화
@@ -337,10 +772,12 @@ class TransferLearningModel:
 def create_data_loaders(
     data_dir: str,
     batch_size: int = 32,
-    input_size: int = 224
+    input_size: int = 224,
+    augment: bool = True
 ) -> Dict[str, DataLoader]:
     """
     데이터 로더 생성
+    augment=False면 train에도 val과 같은 결정적 변환 사용 (feature caching용)
     """
     # 데이터 변환 정의
     data_transforms = {
@@ -360,6 +797,9 @@ def create_data_loaders(
         ]),
     }
     
+    if not augment:
+        data_transforms['train'] = data_transforms['val']
+
     # 데이터셋 생성
     image_datasets = {
         x: datasets.ImageFolder(os.path.join(data_dir, x), data_transforms[x])
@@ -430,50 +870,77 @@ def compare_transfer_learning_strategies():
         print(f"  Trainable: {trainable:,} / {total:,} ({percentage:.2f}%)")
 
 
-def visualize_feature_extraction():
+def compare_cached_training_time(
+    data_dir: str,
+    model_name: str = 'resnet50',
+    num_classes: int = 10,
+    num_epochs: int = 5,
+    num_crops: int = 1
+) -> Dict[str, float]:
+    """
+    기존 학습 루프 vs Feature caching 모드 wall-clock 비교
+    """
+    results = {}
+
+    dataloaders, _ = create_data_loaders(data_dir)
+    model = TransferLearningModel(model_name, num_classes, feature_extract=True)
+    since = time.time()
+    model.train_model(dataloaders, num_epochs=num_epochs)
+    results['full_forward'] = time.time() - since
+
+    dataloaders, _ = create_data_loaders(data_dir, augment=False)
+    model = TransferLearningModel(model_name, num_classes, feature_extract=True)
+    since = time.time()
+    model.train_model_cached(dataloaders, num_epochs=num_epochs,
+                             num_crops=num_crops, reuse=False)
+    results['feature_cached'] = time.time() - since
+
+    print("\n" + "="*60)
+    print(f"WALL-CLOCK COMPARISON ({model_name}, {num_epochs} epochs)")
+    print("="*60)
+    print(f"  Full forward every epoch: {results['full_forward']:.1f}s")
+    print(f"  Cached backbone features: {results['feature_cached']:.1f}s")
+    print(f"  Speedup: {results['full_forward'] / results['feature_cached']:.1f}x")
+
+    return results
+
+
+def visualize_feature_extraction(image_path: Optional[str] = None):
     """
     Feature Extraction 과정 시각화
+    FeatureExtractionService로 요청한 레이어만 hook하고 layer4에서 순전파 종료
     """
-    import torch.nn.functional as F
-    
-    # 모델 로드
-    model = models.resnet50(pretrained=True)
-    model.eval()
-    
-    # 특징 추출용 훅
-    activations = {}
-    
-    def get_activation(name):
-        def hook(model, input, output):
-            activations[name] = output.detach()
-        return hook
-    
-    # 중간 레이어에 훅 등록
-    model.layer1.register_forward_hook(get_activation('layer1'))
-    model.layer2.register_forward_hook(get_activation('layer2'))
-    model.layer3.register_forward_hook(get_activation('layer3'))
-    model.layer4.register_forward_hook(get_activation('layer4'))
-    
-    # 더미 입력
-    dummy_input = torch.randn(1, 3, 224, 224)
-    
-    # 순전파
-    output = model(dummy_input)
-    
+    import sys
+    from PIL import Image
+
+    sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+    from modules.week03.feature_extractor import get_feature_service
+
+    service = get_feature_service()
+    layers = ['layer1', 'layer2', 'layer3', 'layer4']
+
+    if image_path:
+        image = Image.open(image_path)
+    else:
+        # 더미 입력
+        image = Image.fromarray(np.random.randint(0, 255, (224, 224, 3), dtype=np.uint8))
+
+    activations = service.extract(image, 'ResNet50', layers)
+
     # 특징 맵 시각화
     fig, axes = plt.subplots(2, 2, figsize=(10, 10))
-    
+
     for idx, (name, activation) in enumerate(activations.items()):
         ax = axes[idx // 2, idx % 2]
-        
+
         # 첫 번째 채널의 특징 맵 시각화
-        feature_map = activation[0, 0].cpu().numpy()
-        
+        feature_map = activation[0].astype(np.float32)
+
         im = ax.imshow(feature_map, cmap='viridis')
         ax.set_title(f'{name} - Shape: {activation.shape}')
         ax.axis('off')
         plt.colorbar(im, ax=ax, fraction=0.046)
-    
+
     plt.suptitle('Feature Maps at Different Layers')
     plt.tight_layout()
     plt.show()
@@ -508,6 +975,9 @@ if __name__ == "__main__":
     
     # 3. 특징 추출 시각화 (선택적)
     # visualize_feature_extraction()
+
+    # 4. Feature caching 학습 시간 비교 (데이터셋 필요, 선택적)
+    # compare_cached_training_time('path/to/data', num_epochs=5)
     
     print("\n" + "="*50)
     print("Transfer Learning Implementation Complete!")
\ No newline at end of file
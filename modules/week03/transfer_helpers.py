@@ -10,6 +10,8 @@ import torch
 import torchvision.models as models
 from typing import List, Dict, Any
 
+from .feature_extractor import get_feature_service
+
 
 class TransferLearningHelper:
     """Transfer Learning 헬퍼 클래스"""
@@ -88,16 +90,29 @@ optimizer = torch.optim.Adam(model.parameters(), lr=0.0001)
 """
         return code
 
+    def get_feature_maps(self, image, model_name: str, layer_choice: str) -> np.ndarray:
+        """실제 레이어 활성화를 (C, H, W) 특징 맵으로 반환"""
+        activation = get_feature_service().extract(image, model_name, [layer_choice])[layer_choice]
+
+        if activation.ndim == 2:
+            # ViT 토큰 (tokens, dim): CLS 제외 패치 토큰을 격자로 재배열
+            patches = activation[1:]
+            grid = int(np.sqrt(len(patches)))
+            activation = patches[:grid * grid].T.reshape(-1, grid, grid)
+
+        return activation
+
     def visualize_features(self, image, model_name: str, layer_choice: str):
-        """특징 맵 시각화"""
+        """특징 맵 시각화 (평균 활성화가 큰 상위 6개 채널)"""
+        feature_maps = self.get_feature_maps(image, model_name, layer_choice)
+        top_channels = np.argsort(feature_maps.astype(np.float32).mean(axis=(1, 2)))[::-1][:6]
+
         fig, axes = plt.subplots(2, 3, figsize=(12, 8))
         fig.suptitle(f'{model_name} - {layer_choice} 특징 시각화', fontsize=16)
 
-        for i, ax in enumerate(axes.flat):
-            # 시뮬레이션: 랜덤 특징 맵 생성
-            feature_map = np.random.randn(224, 224)
-            im = ax.imshow(feature_map, cmap='viridis')
-            ax.set_title(f'Feature Map {i+1}')
+        for ax, channel in zip(axes.flat, top_channels):
+            im = ax.imshow(feature_maps[channel].astype(np.float32), cmap='viridis')
+            ax.set_title(f'Channel {channel}')
             ax.axis('off')
 
         plt.tight_layout()
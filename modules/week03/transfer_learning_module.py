@@ -23,6 +23,7 @@ from core.base_processor import BaseImageProcessor
 from core.ai_models import AIModelManager
 from .transfer_helpers import TransferLearningHelper
 from .multimodal_helpers import MultiModalHelper
+from .feature_extractor import get_feature_service
 
 
 class TransferLearningModule(BaseImageProcessor):
@@ -1346,17 +1347,19 @@ class TransferLearningModule(BaseImageProcessor):
             with col2:
                 if st.button("🎨 특징 추출 실행", key="extract_features", width='stretch'):
                     with st.spinner(f"{model_choice}에서 {layer_choice} 특징을 추출하는 중..."):
-                        # 특징 추출 시각화 (시뮬레이션)
+                        # 실제 레이어 활성화 추출 (동일 이미지/모델/레이어는 캐시 재사용)
                         fig = self.transfer_helper.visualize_features(image, model_choice, layer_choice)
                         st.pyplot(fig)
+                        feature_maps = self.transfer_helper.get_feature_maps(image, model_choice, layer_choice)
 
                         # 특징 추출 결과 설명
                         st.success("✅ 특징 추출 완료!")
                         st.markdown(f"""
                         **추출된 특징 분석**:
                         - 모델: {model_choice}
-                        - 레이어: {layer_choice}
-                        - 특징 맵 개수: 6개 (샘플)
+                        - 레이어: {layer_choice} (`{get_feature_service().resolve_layer(model_choice, layer_choice)}`)
+                        - 특징 맵 크기: {feature_maps.shape[0]}채널 × {feature_maps.shape[1]}×{feature_maps.shape[2]} (상위 6개 표시)
+                        - 평균 활성화: {feature_maps.astype(np.float32).mean():.3f}, 희소성(≤0 비율): {(feature_maps <= 0).mean():.2f}
                         - 주요 패턴: {"엣지/색상" if "Early" in layer_choice else "텍스처/형태" if "Middle" in layer_choice else "객체/의미"}
                         """)
 
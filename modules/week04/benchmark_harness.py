@@ -0,0 +1,369 @@
+"""
+CPU 추론 벤치마크 하네스
+Vision 모델의 추론 성능을 재현 가능하게 측정하고 실행 간 결과를 비교합니다.
+
+- 스윕: 배치 크기 × 스레드 수(torch.set_num_threads) × 정밀도(fp32/bf16/int8) × 입력 해상도
+- 측정: perf_counter_ns, 백분위 지연시간(p50/p90/p95/p99), 처리량(images/sec)
+  (입력이 CUDA 텐서면 반복 앞뒤로 torch.cuda.synchronize)
+- 메모리: 측정 시작 시 RSS / 측정 중 최대 RSS (psutil), Python 힙 최대치 (tracemalloc)
+- 결과: JSON + CSV 저장, 기준(baseline) 결과와 비교해 성능 회귀 탐지
+
+정밀도:
+    fp32 - 기본
+    bf16 - torch.autocast('cpu', dtype=torch.bfloat16)
+    int8 - nn.Linear 동적 양자화 (torch.ao.quantization.quantize_dynamic)
+           Conv 레이어는 동적 양자화 대상이 아니므로 CNN에서는 효과가 작음
+
+사용 예:
+    python -m modules.week04.benchmark_harness --models resnet18 mobilenet_v3_small \\
+        --batch-sizes 1 8 --threads 1 4 --precisions fp32 int8 --output results.json
+    python -m modules.week04.benchmark_harness ... --baseline results_old.json
+    python -m modules.week04.benchmark_harness --models --cold-start 3  # 앱 콜드 스타트만 측정
+"""
+
+import argparse
+import copy
+import csv
+import json
+import os
+import platform
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+from itertools import product
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+try:
+    import psutil
+except ImportError:  # psutil이 없으면 RSS 측정 생략
+    psutil = None
+
+PRECISIONS = ('fp32', 'bf16', 'int8')
+RESULT_KEYS = ('model', 'batch_size', 'threads', 'precision', 'resolution')
+PERCENTILES = (50, 90, 95, 99)
+
+
+def environment_info() -> Dict:
+    """결과 비교 시 함께 확인할 실행 환경 정보"""
+    return {
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'python': platform.python_version(),
+        'torch': torch.__version__,
+        'cpu_count': os.cpu_count(),
+        'default_threads': torch.get_num_threads(),
+    }
+
+
+def prepare_model(model: nn.Module, precision: str) -> nn.Module:
+    """정밀도에 맞게 모델 준비 (int8은 원본을 보존하기 위해 복사본을 양자화)"""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision} (choose from {PRECISIONS})")
+
+    model = model.eval()
+    if precision == 'int8':
+        return torch.ao.quantization.quantize_dynamic(copy.deepcopy(model), {nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def _precision_context(precision: str):
+    if precision == 'bf16':
+        return torch.autocast('cpu', dtype=torch.bfloat16)
+    return nullcontext()
+
+
+class _RSSSampler:
+    """측정 중 백그라운드에서 RSS를 주기적으로 읽어 최대값 기록"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.start = 0
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._process = psutil.Process() if psutil else None
+
+    def __enter__(self):
+        if self._process is not None:
+            self.start = self.peak = self._process.memory_info().rss
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self._process.memory_info().rss)
+
+    def __exit__(self, *exc):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, self._process.memory_info().rss)
+
+
+def measure_latency(fn: Callable[[], object], warmup: int = 10, iters: int = 50,
+                    min_time_s: float = 0.0) -> List[int]:
+    """
+    fn 반복 실행 시간 측정
+
+    Args:
+        warmup: 측정 전 실행 횟수 (메모리 할당, oneDNN 커널 선택 안정화)
+        iters: 최소 측정 횟수
+        min_time_s: 측정 구간이 이 시간보다 짧으면 추가 반복
+
+    Returns:
+        반복별 지연시간 (ns)
+    """
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    start = time.perf_counter_ns()
+    while len(latencies) < iters or (time.perf_counter_ns() - start) < min_time_s * 1e9:
+        t0 = time.perf_counter_ns()
+        fn()
+        latencies.append(time.perf_counter_ns() - t0)
+    return latencies
+
+
+def summarize_latencies(latencies_ns: Sequence[int], batch_size: int) -> Dict[str, float]:
+    """지연시간 통계 (ms)와 처리량 (images/sec)"""
+    ms = np.asarray(latencies_ns, dtype=np.float64) / 1e6
+    stats = {
+        'iters': len(ms),
+        'mean_ms': float(ms.mean()),
+        'std_ms': float(ms.std()),
+        'min_ms': float(ms.min()),
+        'max_ms': float(ms.max()),
+    }
+    for p, value in zip(PERCENTILES, np.percentile(ms, PERCENTILES)):
+        stats[f'p{p}_ms'] = float(value)
+    stats['throughput_ips'] = batch_size * 1000.0 / stats['p50_ms']
+    return stats
+
+
+def benchmark_config(model: nn.Module, batch_size: int = 1, threads: Optional[int] = None,
+                     precision: str = 'fp32', resolution: int = 224, warmup: int = 10,
+                     iters: int = 50, min_time_s: float = 0.0,
+                     input_fn: Optional[Callable[[int, int], torch.Tensor]] = None) -> Dict:
+    """
+    단일 설정 벤치마크
+
+    Args:
+        input_fn: (batch_size, resolution) → 입력 텐서 (없으면 고정 시드 난수 이미지)
+
+    Returns:
+        지연시간 통계 + 메모리 사용량 (MB)
+    """
+    previous_threads = torch.get_num_threads()
+    if threads:
+        torch.set_num_threads(threads)
+
+    try:
+        prepared = prepare_model(model, precision)
+        if input_fn is not None:
+            inputs = input_fn(batch_size, resolution)
+        else:
+            generator = torch.Generator().manual_seed(0)
+            inputs = torch.randn(batch_size, 3, resolution, resolution, generator=generator)
+
+        # CUDA는 비동기 실행이므로 반복 앞뒤로 동기화해야 커널 실행 시간까지 측정됨
+        sync = torch.cuda.synchronize if inputs.is_cuda else (lambda: None)
+
+        def run():
+            sync()
+            with torch.inference_mode(), _precision_context(precision):
+                prepared(inputs)
+            sync()
+
+        with _RSSSampler() as sampler:
+            latencies = measure_latency(run, warmup, iters, min_time_s)
+
+        # tracemalloc은 할당마다 오버헤드가 있으므로 시간 측정과 분리해 1회만 실행
+        tracemalloc.start()
+        run()
+        _, py_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        result = summarize_latencies(latencies, batch_size)
+        result['py_peak_mb'] = py_peak / 2**20
+        if psutil is not None:
+            result['rss_mb'] = sampler.start / 2**20
+            result['peak_rss_mb'] = sampler.peak / 2**20
+            result['peak_rss_delta_mb'] = (sampler.peak - sampler.start) / 2**20
+        return result
+    finally:
+        torch.set_num_threads(previous_threads)
+
+
+def run_sweep(models: Dict[str, nn.Module], batch_sizes: Sequence[int] = (1,),
+              threads: Sequence[Optional[int]] = (None,), precisions: Sequence[str] = ('fp32',),
+              resolutions: Sequence[int] = (224,), warmup: int = 10, iters: int = 50,
+              min_time_s: float = 0.0, verbose: bool = True) -> Dict:
+    """
+    모든 조합에 대해 벤치마크 실행
+
+    실패한 조합(예: 고정 해상도 ViT에 다른 해상도 입력)은 error 필드와 함께 기록
+
+    Returns:
+        {'metadata': 환경 정보, 'results': [설정별 결과 dict]}
+    """
+    results = []
+    for (name, model), batch_size, n_threads, precision, resolution in product(
+            models.items(), batch_sizes, threads, precisions, resolutions):
+        record = {
+            'model': name,
+            'batch_size': batch_size,
+            'threads': n_threads or torch.get_num_threads(),
+            'precision': precision,
+            'resolution': resolution,
+        }
+        try:
+            record.update(benchmark_config(model, batch_size, n_threads, precision, resolution,
+                                           warmup, iters, min_time_s))
+            if verbose:
+                print(f"✅ {name} bs={batch_size} t={record['threads']} {precision} {resolution}px: "
+                      f"p50 {record['p50_ms']:.2f}ms, p95 {record['p95_ms']:.2f}ms, "
+                      f"{record['throughput_ips']:.1f} img/s")
+        except Exception as e:
+            record['error'] = str(e)
+            if verbose:
+                print(f"❌ {name} bs={batch_size} {precision} {resolution}px: {e}")
+        results.append(record)
+
+    return {'metadata': environment_info(), 'results': results}
+
+
+def save_results(report: Dict, path: str) -> Path:
+    """JSON과 같은 이름의 CSV로 저장"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    rows = report['results']
+    fieldnames = list(RESULT_KEYS)
+    for row in rows:
+        fieldnames.extend(k for k in row if k not in fieldnames)
+    with open(path.with_suffix('.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    return path
+
+
+def load_results(path: str) -> Dict:
+    return json.loads(Path(path).read_text(encoding='utf-8'))
+
+
+def compare_results(baseline: Dict, current: Dict, metric: str = 'p50_ms',
+                    threshold: float = 0.10) -> List[Dict]:
+    """
+    같은 설정끼리 결과 비교
+
+    Args:
+        metric: 비교 지표 (지연시간 계열은 클수록 나쁨, throughput_ips는 작을수록 나쁨)
+        threshold: 이 비율 이상 나빠지면 regression으로 표시
+
+    Returns:
+        [{설정 키..., 'baseline', 'current', 'change', 'regression'}]
+    """
+    def key(row):
+        return tuple(row[k] for k in RESULT_KEYS)
+
+    higher_is_better = metric == 'throughput_ips'
+    base_rows = {key(r): r for r in baseline['results'] if metric in r}
+    comparison = []
+
+    for row in current['results']:
+        base = base_rows.get(key(row))
+        if base is None or metric not in row:
+            continue
+        change = (row[metric] - base[metric]) / base[metric]
+        worse = -change if higher_is_better else change
+        comparison.append({
+            **{k: row[k] for k in RESULT_KEYS},
+            'baseline': base[metric],
+            'current': row[metric],
+            'change': change,
+            'regression': worse > threshold,
+        })
+
+    return comparison
+
+
+def load_torchvision_models(names: Sequence[str], pretrained: bool = False) -> Dict[str, nn.Module]:
+    """
+    torchvision 모델 생성
+    지연시간 측정에는 가중치 값이 영향을 주지 않으므로 기본은 무작위 초기화 (다운로드 없음)
+    """
+    import torchvision.models as models
+
+    loaded = {}
+    for name in names:
+        loaded[name] = getattr(models, name)(weights='DEFAULT' if pretrained else None).eval()
+    return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vision 모델 CPU 추론 벤치마크")
+    parser.add_argument('--models', nargs='*', default=['resnet50'],
+                        help="torchvision 모델 이름 (예: resnet50 efficientnet_b0 vit_b_16)")
+    parser.add_argument('--pretrained', action='store_true', help="사전학습 가중치 다운로드")
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 8])
+    parser.add_argument('--threads', nargs='+', type=int, default=[torch.get_num_threads()])
+    parser.add_argument('--precisions', nargs='+', default=['fp32'], choices=PRECISIONS)
+    parser.add_argument('--resolutions', nargs='+', type=int, default=[224])
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--iters', type=int, default=30)
+    parser.add_argument('--min-time', type=float, default=0.0, help="설정별 최소 측정 시간 (초)")
+    parser.add_argument('--output', type=str, default='benchmark_results.json')
+    parser.add_argument('--baseline', type=str, help="비교할 이전 결과 JSON")
+    parser.add_argument('--metric', type=str, default='p50_ms')
+    parser.add_argument('--threshold', type=float, default=0.10, help="회귀 판정 비율 (기본 10%%)")
+    parser.add_argument('--cold-start', type=int, default=0, metavar='RUNS',
+                        help="app.py 콜드 스타트 첫 렌더링 시간 측정 반복 횟수 (0이면 생략)")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    report = run_sweep(
+        load_torchvision_models(args.models, args.pretrained),
+        args.batch_sizes, args.threads, args.precisions, args.resolutions,
+        args.warmup, args.iters, args.min_time
+    )
+    if args.cold_start:
+        from core.startup_profile import measure_time_to_first_render
+        report['cold_start'] = measure_time_to_first_render('app.py', args.cold_start)
+        print(f"🚀 앱 첫 렌더링 p50: {report['cold_start']['ttfr_p50_s']:.2f}s")
+    path = save_results(report, args.output)
+    print(f"\n💾 결과 저장: {path} / {path.with_suffix('.csv')}")
+
+    if args.baseline:
+        comparison = compare_results(load_results(args.baseline), report, args.metric, args.threshold)
+        regressions = [c for c in comparison if c['regression']]
+        print(f"\n📊 기준 대비 비교 ({args.metric}, 임계값 {args.threshold:.0%})")
+        for c in comparison:
+            mark = '❌' if c['regression'] else '✅'
+            print(f"{mark} {c['model']} bs={c['batch_size']} t={c['threads']} {c['precision']} "
+                  f"{c['resolution']}px: {c['baseline']:.2f} → {c['current']:.2f} ({c['change']:+.1%})")
+        baseline_start = load_results(args.baseline).get('cold_start')
+        if baseline_start and 'cold_start' in report:
+            before, after = baseline_start['ttfr_p50_s'], report['cold_start']['ttfr_p50_s']
+            regressed = after > before * (1 + args.threshold)
+            print(f"{'❌' if regressed else '✅'} 앱 첫 렌더링: {before:.2f}s → {after:.2f}s "
+                  f"({after / before - 1:+.1%})")
+            if regressed:
+                regressions.append({'model': 'app.py', 'metric': 'ttfr_p50_s'})
+        if regressions:
+            raise SystemExit(f"성능 회귀 {len(regressions)}건 발견")
+
+
+if __name__ == "__main__":
+    main()
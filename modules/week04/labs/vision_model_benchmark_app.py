@@ -22,10 +22,20 @@ import pandas as pd
 import time
 import io
 import base64
+import os
+import sys
 from PIL import Image
 import warnings
 warnings.filterwarnings('ignore')
 
+# week04 벤치마크 하네스
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmark_harness import benchmark_config, run_sweep, save_results
+
+# 프로젝트 루트 (core.export_backend)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from core.export_backend import benchmark_backends
+
 # 전역 설정
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 print(f"🚀 벤치마크 앱 시작 - 디바이스: {DEVICE}")
@@ -119,8 +129,8 @@ class ModelBenchmark:
             
             return tensor
     
-    def benchmark_single_model(self, model_name, image, num_runs=10):
-        """단일 모델 벤치마크"""
+    def benchmark_single_model(self, model_name, image, num_runs=10, warmup=10):
+        """단일 모델 벤치마크 (perf_counter_ns 기반, CUDA는 반복마다 동기화, CPU에서는 RSS 증가량으로 메모리 측정)"""
         if model_name not in self.models:
             return {"error": f"모델 {model_name}을 찾을 수 없습니다."}
         
@@ -130,43 +140,34 @@ class ModelBenchmark:
             # 이미지 전처리
             input_tensor = self.preprocess_image(image, model_name)
             
-            # 추론 시간 측정
-            times = []
-            memory_usage = []
+            if torch.cuda.is_available():
+                torch.cuda.reset_peak_memory_stats()
+            
+            stats = benchmark_config(
+                model, batch_size=input_tensor.shape[0], warmup=warmup, iters=num_runs,
+                input_fn=lambda batch_size, resolution: input_tensor
+            )
             
-            # Warm-up
             with torch.no_grad():
-                for _ in range(3):
-                    _ = model(input_tensor)
+                output = model(input_tensor)
             
-            # 실제 측정
-            for _ in range(num_runs):
-                if torch.cuda.is_available():
-                    torch.cuda.reset_peak_memory_stats()
-                
-                start_time = time.time()
-                
-                with torch.no_grad():
-                    output = model(input_tensor)
-                
-                if torch.cuda.is_available():
-                    torch.cuda.synchronize()
-                
-                end_time = time.time()
-                times.append((end_time - start_time) * 1000)  # ms
-                
-                if torch.cuda.is_available():
-                    memory_usage.append(torch.cuda.max_memory_allocated() / (1024 * 1024))  # MB
+            if torch.cuda.is_available():
+                memory = torch.cuda.max_memory_allocated() / (1024 * 1024)  # MB
+            else:
+                # 프로세스 전체 RSS가 아니라 이 모델 추론 중 늘어난 양 (psutil이 없으면 Python 힙 최대치)
+                memory = stats.get('peak_rss_delta_mb', stats.get('py_peak_mb', "N/A"))
             
             # 결과 정리
             result = {
                 "model": model_name,
                 "model_name": self.model_info[model_name]["name"],
-                "avg_time": round(np.mean(times), 2),
-                "std_time": round(np.std(times), 2),
-                "min_time": round(np.min(times), 2),
-                "max_time": round(np.max(times), 2),
-                "avg_memory": round(np.mean(memory_usage), 2) if memory_usage else "N/A",
+                "avg_time": round(stats['mean_ms'], 2),
+                "std_time": round(stats['std_ms'], 2),
+                "min_time": round(stats['min_ms'], 2),
+                "max_time": round(stats['max_ms'], 2),
+                "p50_time": round(stats['p50_ms'], 2),
+                "p95_time": round(stats['p95_ms'], 2),
+                "avg_memory": round(memory, 2) if isinstance(memory, float) else memory,
                 "output_shape": str(output.shape) if hasattr(output, 'shape') else "N/A",
                 "success": True
             }
@@ -176,6 +177,35 @@ class ModelBenchmark:
         except Exception as e:
             return {"error": str(e), "success": False}
     
+    def compare_backends(self, model_name, image, backends=('eager', 'onnx', 'onnx-int8', 'torchscript'),
+                         iters=20):
+        """
+        eager vs ONNX Runtime / int8 / TorchScript 비교 (CPU 배포용)
+        변환 결과는 .cache/exported_models에 캐시되어 다음 실행부터 재사용
+        분류 헤드가 없는 모델(ViTModel, DINOv2)은 첫 번째 출력 텐서 기준으로 비교
+        """
+        if model_name not in self.models:
+            return [{"error": f"모델 {model_name}을 찾을 수 없습니다."}]
+        
+        input_tensor = self.preprocess_image(image, model_name).cpu()
+        
+        def preprocess(pil_image):
+            return self.preprocess_image(pil_image, model_name).cpu().numpy()
+        
+        return benchmark_backends(self.models[model_name], model_name, input_tensor,
+                                  backends, iters=iters, preprocess=preprocess)
+    
+    def run_sweep(self, batch_sizes=(1, 8), threads=(None,), precisions=('fp32',),
+                  resolutions=(224,), output_path=None):
+        """
+        로드된 모델 전체에 대해 배치/스레드/정밀도/해상도 스윕
+        output_path 지정 시 JSON/CSV 저장 (benchmark_harness.compare_results로 실행 간 비교)
+        """
+        report = run_sweep(self.models, batch_sizes, threads, precisions, resolutions)
+        if output_path:
+            save_results(report, output_path)
+        return report
+    
     def run_comprehensive_benchmark(self, image):
         """종합 벤치마크 실행"""
         results = []
@@ -215,7 +245,7 @@ class ModelBenchmark:
             axes[0, 0].text(bar.get_x() + bar.get_width()/2, bar.get_height() + 2,
                            f'{time_val}ms', ha='center', va='bottom', fontweight='bold')
         
-        # 2. 메모리 사용량 (CUDA 사용 시)
+        # 2. 메모리 사용량 (CUDA: 최대 할당량, CPU: 최대 RSS)
         if df['avg_memory'].dtype != 'object':
             bars2 = axes[0, 1].bar(df['model_name'], df['avg_memory'], 
                                   alpha=0.7, color='lightcoral')
@@ -543,8 +573,8 @@ def create_gradio_interface():
             3. **결과 확인**: 차트, 테이블, 리포트 탭에서 결과를 확인하세요.
             
             ### 📈 측정 지표 설명
-            - **추론 시간**: 단일 이미지 처리에 걸리는 평균 시간 (ms)
-            - **메모리 사용량**: GPU 메모리 사용량 (MB, CUDA 사용 시)
+            - **추론 시간**: 단일 이미지 처리에 걸리는 평균 시간 (ms, warm-up 10회 후 perf_counter_ns로 측정)
+            - **메모리 사용량**: GPU 최대 할당량 또는 CPU 프로세스 최대 RSS (MB)
             - **처리량(FPS)**: 초당 처리 가능한 이미지 수
             - **종합 점수**: 속도, 메모리 효율성, 모델 크기를 종합한 점수
             
@@ -9,6 +9,7 @@ from PIL import Image
 import torch
 import os
 import sys
+import time
 
 # 프로젝트 경로 추가
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -943,6 +944,13 @@ CLS 토큰 → 분류
                 st.markdown("---")
                 st.markdown("### 3️⃣ 이미지 분류")
 
+                backend = st.selectbox(
+                    "실행 백엔드",
+                    ["eager", "onnx", "onnx-int8", "torchscript"],
+                    key="vit_backend",
+                    help="onnx/torchscript는 처음 한 번 변환 후 .cache/exported_models에 저장됩니다 (int8은 data/ 이미지로 calibration)"
+                )
+
                 if st.button("🔮 이미지 분류 시작", key="classify_btn", type="primary"):
                     with st.spinner("ViT 모델로 분석 중..."):
                         try:
@@ -951,10 +959,22 @@ CLS 토큰 → 분류
                             pil_img = Image.open(uploaded_vit).convert('RGB')
 
                             inputs = processor(images=pil_img, return_tensors="pt")
-                            
+
+                            if backend != "eager":
+                                from core.export_backend import get_exported_model, hf_preprocess
+                                runner = get_exported_model(
+                                    model, st.session_state['vit_model_name'], backend,
+                                    input_shape=tuple(inputs['pixel_values'].shape),
+                                    preprocess=hf_preprocess(processor)
+                                )
+                            else:
+                                runner = model
+
+                            start = time.perf_counter()
                             with torch.no_grad():
-                                outputs = model(**inputs)
+                                outputs = runner(pixel_values=inputs['pixel_values'])
                                 logits = outputs.logits
+                            st.caption(f"추론 시간 ({backend}): {(time.perf_counter() - start) * 1000:.1f}ms")
 
                             # Top-5 예측
                             probs = torch.nn.functional.softmax(logits, dim=-1)
@@ -1549,7 +1569,7 @@ CLS 토큰 → 분류
         st.markdown("---")
 
         # 시대별 탭
-        era_tabs = st.tabs(["🏛️ 클래식 (2020-2022)", "🚀 최신 (2024-2025)", "📊 전체 비교"])
+        era_tabs = st.tabs(["🏛️ 클래식 (2020-2022)", "🚀 최신 (2024-2025)", "📊 전체 비교", "🖥️ 직접 측정 (CPU)"])
 
         with era_tabs[0]:
             st.markdown("### 🏛️ 초기 Vision Transformer 모델 (2020-2022)")
@@ -1748,6 +1768,9 @@ CLS 토큰 → 분류
 
             st.table(comparison_df)
 
+        with era_tabs[3]:
+            self._render_live_benchmark()
+
         st.markdown("---")
         st.markdown("### 🎯 Vision Transformer 모델 선택 가이드 (2025년 기준)")
 
@@ -1828,6 +1851,50 @@ CLS 토큰 → 분류
         💡 **Week 4 실습**: 위 순수 Vision Transformer 모델들 (ViT, DINO, CLIP, SAM)을 직접 사용해보세요!
         """)
 
+    def _render_live_benchmark(self):
+        """이 PC에서 CPU 추론 성능 직접 측정 (benchmark_harness)"""
+        st.markdown("### 🖥️ 이 PC에서 직접 측정")
+        st.caption("무작위 초기화 가중치로 측정합니다 (지연시간은 가중치 값과 무관, 다운로드 없음)")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            model_names = st.multiselect(
+                "모델", ["resnet18", "resnet50", "efficientnet_b0", "mobilenet_v3_small", "vit_b_16"],
+                default=["resnet18", "vit_b_16"], key="bench_models"
+            )
+            batch_sizes = st.multiselect("배치 크기", [1, 4, 8, 16], default=[1, 8], key="bench_batch")
+            resolutions = st.multiselect("입력 해상도", [160, 224, 288], default=[224], key="bench_res")
+        with col2:
+            max_threads = torch.get_num_threads()
+            threads = st.multiselect("스레드 수", sorted({1, max(1, max_threads // 2), max_threads}),
+                                     default=[max_threads], key="bench_threads")
+            precisions = st.multiselect("정밀도", ["fp32", "bf16", "int8"], default=["fp32"],
+                                        key="bench_precision")
+            iters = st.slider("측정 반복 횟수", 5, 50, 10, key="bench_iters")
+
+        if st.button("⏱️ 벤치마크 실행", key="run_live_benchmark", type="primary"):
+            from .benchmark_harness import load_torchvision_models, run_sweep
+
+            with st.spinner("측정 중... (설정 수에 따라 수 분 걸릴 수 있습니다)"):
+                report = run_sweep(load_torchvision_models(model_names), batch_sizes, threads,
+                                   precisions, resolutions, warmup=3, iters=iters, verbose=False)
+            st.session_state['live_benchmark'] = report
+
+        if 'live_benchmark' in st.session_state:
+            import json
+            import pandas as pd
+
+            report = st.session_state['live_benchmark']
+            df = pd.DataFrame(report['results'])
+            columns = [c for c in ['model', 'batch_size', 'threads', 'precision', 'resolution',
+                                   'p50_ms', 'p95_ms', 'p99_ms', 'throughput_ips', 'peak_rss_mb', 'error']
+                       if c in df.columns]
+            st.dataframe(df[columns].round(2), use_container_width=True)
+            st.caption(f"환경: {report['metadata']['platform']} · torch {report['metadata']['torch']} · "
+                       f"CPU {report['metadata']['cpu_count']}개")
+            st.download_button("💾 결과 JSON 다운로드", json.dumps(report, indent=2, ensure_ascii=False),
+                               file_name="benchmark_results.json", mime="application/json")
+
     def _render_project_tab(self):
         """실전 프로젝트 탭"""
         st.header("🚀 실전 Vision Transformer 프로젝트")
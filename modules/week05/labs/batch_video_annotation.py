@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Week 5 Lab: 헤드리스 배치 비디오 어노테이션
+디스플레이 없는 서버에서 긴 비디오를 여러 프로세스로 나눠 탐지/어노테이션합니다.
+
+처리 과정:
+1. 분할 계획: 키프레임(GOP 경계) 위치에서 비디오를 구간으로 나눔
+   (ffprobe가 있으면 실제 키프레임 사용, 없으면 균등 분할 후 OpenCV 프레임 단위 seek)
+2. 구간 처리: 워커 프로세스마다 YOLO 모델을 한 번 로드하고 구간을 디코딩 → 탐지 → 어노테이션
+3. 구간 인코딩: 워커 안의 writer 스레드가 구간 파일을 인코딩 (탐지와 겹침, 구간끼리는 프로세스 병렬)
+4. 이어 붙이기: ffmpeg concat(-c copy), 없으면 OpenCV로 재인코딩
+
+진행률과 단계별 시간은 JSON lines로 출력합니다 (한 줄에 이벤트 하나):
+    {"event": "plan", ...} / {"event": "progress", ...} / {"event": "segment_done", ...} /
+    {"event": "concat", ...} / {"event": "done", ...}
+
+사용법:
+    python batch_video_annotation.py input.mp4 -o output.mp4 --workers 4
+    python batch_video_annotation.py input.mp4 -o output.mp4 --progress progress.jsonl
+    python realtime_video_detection.py --source input.mp4 --headless --workers 4
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TextIO
+
+import cv2
+
+
+def probe_video(path: str) -> Dict[str, Any]:
+    """비디오 정보 (fps, 프레임 수, 크기)"""
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        raise ValueError(f"비디오 파일을 열 수 없습니다: {path}")
+    info = {
+        'fps': cap.get(cv2.CAP_PROP_FPS) or 30.0,
+        'frame_count': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+    }
+    cap.release()
+    return info
+
+
+def keyframe_indices(path: str, fps: float) -> Optional[List[int]]:
+    """
+    키프레임 위치 (프레임 번호)
+
+    ffprobe로 키프레임만 디코딩 없이 읽습니다. ffprobe가 없거나 실패하면 None.
+    """
+    ffprobe = shutil.which('ffprobe')
+    if ffprobe is None:
+        return None
+    proc = subprocess.run(
+        [ffprobe, '-v', 'error', '-select_streams', 'v:0', '-skip_frame', 'nokey',
+         '-show_entries', 'frame=pts_time', '-of', 'csv=p=0', str(path)],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        return None
+    times = [float(line.strip().rstrip(',')) for line in proc.stdout.splitlines() if line.strip()]
+    return sorted({int(round(t * fps)) for t in times})
+
+
+def plan_segments(frame_count: int, num_segments: int, keyframes: Optional[List[int]] = None,
+                  min_frames: int = 30) -> List[Dict[str, int]]:
+    """
+    [start, end) 구간 목록
+
+    균등 분할 지점을 가장 가까운 키프레임으로 옮겨, 각 워커가 키프레임에서 바로 디코딩을 시작하도록 함
+    """
+    num_segments = max(1, min(num_segments, frame_count // max(min_frames, 1) or 1))
+    bounds = [round(frame_count * i / num_segments) for i in range(num_segments + 1)]
+
+    if keyframes:
+        candidates = [k for k in keyframes if 0 < k < frame_count]
+        snapped = []
+        for bound in bounds[1:-1]:
+            if candidates:
+                snapped.append(min(candidates, key=lambda k: abs(k - bound)))
+        bounds = [0] + sorted(set(snapped)) + [frame_count]
+
+    return [
+        {'index': i, 'start': start, 'end': end}
+        for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])) if end > start
+    ]
+
+
+class JsonLinesReporter:
+    """이벤트를 한 줄씩 JSON으로 기록 (t: 시작 후 경과 초)"""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.start = time.perf_counter()
+
+    def emit(self, event: str, **fields):
+        record = {'event': event, 't': round(time.perf_counter() - self.start, 3), **fields}
+        self.stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.stream.flush()
+
+
+class _SegmentWriter:
+    """writer 스레드에서 구간 파일 인코딩 (cv2 인코딩은 GIL을 풀어 탐지와 겹침)"""
+
+    def __init__(self, path: str, fps: float, size, fourcc: str = 'mp4v', max_pending: int = 16):
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        self.pending: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self.encode_s = 0.0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            frame = self.pending.get()
+            if frame is None:
+                break
+            start = time.perf_counter()
+            self.writer.write(frame)
+            self.encode_s += time.perf_counter() - start
+
+    def write(self, frame):
+        self.pending.put(frame)
+
+    def close(self):
+        self.pending.put(None)
+        self.thread.join()
+        self.writer.release()
+
+
+# ----------------------------------------------------------------------
+# 워커 프로세스
+# ----------------------------------------------------------------------
+_worker: Dict[str, Any] = {}
+
+
+def _stdout_logs_to_stderr() -> List[tuple]:
+    """
+    stdout에 묶인 logging 핸들러(ultralytics LOGGER 등)를 stderr로 전환
+    (spawn 워커가 __main__을 다시 import하면서 만든 핸들러는 sys.stdout 교체만으로는 바뀌지 않음)
+
+    Returns:
+        [(핸들러, 원래 스트림)] (복원용)
+    """
+    stdout_ids = {id(sys.__stdout__), id(sys.stdout)}
+    loggers = [logging.getLogger()] + [
+        logger for logger in logging.Logger.manager.loggerDict.values() if isinstance(logger, logging.Logger)
+    ]
+    changed = []
+    for logger in loggers:
+        for handler in logger.handlers:
+            if isinstance(handler, logging.StreamHandler) and id(handler.stream) in stdout_ids:
+                changed.append((handler, handler.setStream(sys.stderr)))
+    return changed
+
+
+def _init_worker(model_path: str, conf: float, iou: float, threads: int, progress_queue):
+    # 모델 로드 로그가 JSON lines 출력(stdout)에 섞이지 않도록
+    _stdout_logs_to_stderr()
+    sys.stdout = sys.stderr
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from realtime_video_detection import RealTimeDetector
+
+    _worker['detector'] = RealTimeDetector(model_path=model_path, conf_threshold=conf, iou_threshold=iou)
+    _worker['progress'] = progress_queue
+
+
+def _annotate_segment(task: Dict[str, Any]) -> Dict[str, Any]:
+    """구간 하나 디코딩 → 탐지 → 어노테이션 → 구간 파일 인코딩"""
+    detector = _worker['detector']
+    progress = _worker['progress']
+    start, end = task['start'], task['end']
+    wall_start = time.perf_counter()
+
+    cap = cv2.VideoCapture(task['input'])
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != start:
+        # seek을 지원하지 않는 컨테이너: 처음부터 grab으로 이동
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        for _ in range(start):
+            cap.grab()
+
+    writer = _SegmentWriter(task['path'], task['fps'], (task['width'], task['height']))
+    timings = {'decode_s': 0.0, 'detect_s': 0.0, 'annotate_s': 0.0}
+    frames = detections = 0
+
+    for offset in range(end - start):
+        t0 = time.perf_counter()
+        ok, frame = cap.read()
+        t1 = time.perf_counter()
+        if not ok:
+            break
+        annotated, count, inference_ms = detector.annotate_frame(frame, start + offset + 1, task['total_frames'])
+        t2 = time.perf_counter()
+        writer.write(annotated)
+
+        timings['decode_s'] += t1 - t0
+        timings['detect_s'] += inference_ms / 1000
+        timings['annotate_s'] += max(t2 - t1 - inference_ms / 1000, 0.0)
+        frames += 1
+        detections += count
+        if frames % task['progress_every'] == 0:
+            progress.put({'segment': task['index'], 'frames': frames})
+
+    cap.release()
+    close_start = time.perf_counter()
+    writer.close()
+    return {
+        'segment': task['index'],
+        'start': start,
+        'end': end,
+        'frames': frames,
+        'detections': detections,
+        **{key: round(value, 4) for key, value in timings.items()},
+        'encode_s': round(writer.encode_s, 4),
+        'encode_flush_s': round(time.perf_counter() - close_start, 4),
+        'wall_s': round(time.perf_counter() - wall_start, 4),
+    }
+
+
+# ----------------------------------------------------------------------
+# 이어 붙이기
+# ----------------------------------------------------------------------
+def concat_segments(paths: List[str], output_path: str, fps: float, size) -> str:
+    """
+    구간 파일을 하나로 이어 붙임
+
+    Returns:
+        사용한 방법 ('ffmpeg-copy' 또는 'opencv-reencode')
+    """
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is not None:
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as listing:
+            for path in paths:
+                listing.write(f"file '{Path(path).resolve()}'\n")
+        try:
+            proc = subprocess.run(
+                [ffmpeg, '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', listing.name,
+                 '-c', 'copy', str(output_path)],
+                capture_output=True, text=True
+            )
+        finally:
+            os.unlink(listing.name)
+        if proc.returncode == 0:
+            return 'ffmpeg-copy'
+
+    writer = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    for path in paths:
+        cap = cv2.VideoCapture(path)
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            writer.write(frame)
+        cap.release()
+    writer.release()
+    return 'opencv-reencode'
+
+
+def annotate_video(input_path: str, output_path: str, model_path: str = 'yolov8n.pt',
+                   conf: float = 0.25, iou: float = 0.7, workers: Optional[int] = None,
+                   segments_per_worker: int = 2, progress_every: int = 25,
+                   progress_stream: Optional[TextIO] = None, keep_segments: bool = False) -> Dict[str, Any]:
+    """
+    헤드리스 병렬 비디오 어노테이션
+
+    Args:
+        workers: 워커 프로세스 수 (기본: CPU 코어 수, 최대 4). 1이면 현재 프로세스에서 처리
+        segments_per_worker: 워커당 구간 수 (구간마다 처리 시간이 달라도 부하가 고르게 분산)
+        progress_every: 워커가 진행률을 보고하는 프레임 간격
+        progress_stream: JSON lines를 기록할 스트림 (기본: stdout)
+
+    Returns:
+        'done' 이벤트와 같은 요약 dict
+    """
+    reporter = JsonLinesReporter(progress_stream or sys.stdout)
+    workers = workers or min(os.cpu_count() or 1, 4)
+
+    t0 = time.perf_counter()
+    info = probe_video(input_path)
+    keyframes = keyframe_indices(input_path, info['fps'])
+    segments = plan_segments(info['frame_count'], workers * segments_per_worker, keyframes)
+    plan_s = time.perf_counter() - t0
+    reporter.emit('plan', input=str(input_path), output=str(output_path), workers=workers,
+                  keyframes='ffprobe' if keyframes is not None else 'uniform', plan_s=round(plan_s, 4),
+                  segments=[[s['start'], s['end']] for s in segments], **info)
+
+    segment_dir = tempfile.mkdtemp(prefix='annotate_segments_', dir=str(Path(output_path).resolve().parent))
+    tasks = [
+        dict(segment, input=str(input_path), path=os.path.join(segment_dir, f"segment_{segment['index']:04d}.mp4"),
+             total_frames=info['frame_count'], fps=info['fps'], width=info['width'], height=info['height'],
+             progress_every=progress_every)
+        for segment in segments
+    ]
+
+    done_frames: Dict[int, int] = {}
+    results: List[Dict[str, Any]] = []
+
+    def report_progress(message):
+        done_frames[message['segment']] = message['frames']
+        total = sum(done_frames.values())
+        reporter.emit('progress', segment=message['segment'], frames_done=total,
+                      percent=round(100 * total / max(info['frame_count'], 1), 2))
+
+    def report_segment(result):
+        done_frames[result['segment']] = result['frames']
+        results.append(result)
+        reporter.emit('segment_done', **result)
+
+    t1 = time.perf_counter()
+    if workers <= 1:
+        local_queue: "queue.Queue" = queue.Queue()
+        handlers = _stdout_logs_to_stderr()
+        try:
+            with redirect_stdout(sys.stderr):
+                _init_worker(model_path, conf, iou, os.cpu_count() or 1, local_queue)
+                for task in tasks:
+                    result = _annotate_segment(task)
+                    while not local_queue.empty():
+                        report_progress(local_queue.get())
+                    report_segment(result)
+        finally:
+            for handler, stream in handlers:
+                handler.setStream(stream)
+    else:
+        context = multiprocessing.get_context('spawn')
+        progress_queue = context.Queue()
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(model_path, conf, iou, threads, progress_queue)) as executor:
+            pending = {executor.submit(_annotate_segment, task) for task in tasks}
+            while pending:
+                finished, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                while True:
+                    try:
+                        report_progress(progress_queue.get_nowait())
+                    except queue.Empty:
+                        break
+                for future in finished:
+                    report_segment(future.result())
+    process_s = time.perf_counter() - t1
+
+    t2 = time.perf_counter()
+    method = concat_segments([task['path'] for task in tasks], output_path, info['fps'],
+                             (info['width'], info['height']))
+    concat_s = time.perf_counter() - t2
+    reporter.emit('concat', method=method, concat_s=round(concat_s, 4), segments=len(tasks))
+
+    if not keep_segments:
+        shutil.rmtree(segment_dir, ignore_errors=True)
+
+    frames = sum(r['frames'] for r in results)
+    wall_s = time.perf_counter() - t0
+    summary = {
+        'output': str(output_path),
+        'frames': frames,
+        'detections': sum(r['detections'] for r in results),
+        'workers': workers,
+        'segments': len(tasks),
+        'plan_s': round(plan_s, 4),
+        'process_s': round(process_s, 4),
+        'concat_s': round(concat_s, 4),
+        'wall_s': round(wall_s, 4),
+        'fps': round(frames / wall_s, 2) if wall_s > 0 else 0.0,
+        # 워커 전체 합 (병렬이라 wall보다 클 수 있음)
+        'stage_s': {key: round(sum(r[key] for r in results), 4)
+                    for key in ('decode_s', 'detect_s', 'annotate_s', 'encode_s')},
+    }
+    reporter.emit('done', **summary)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="헤드리스 배치 비디오 어노테이션")
+    parser.add_argument('input', type=str, help='입력 비디오 경로')
+    parser.add_argument('-o', '--output', type=str, default=None, help='출력 비디오 경로')
+    parser.add_argument('--model', type=str, default='yolov8n.pt', help='YOLO 모델 경로')
+    parser.add_argument('--conf', type=float, default=0.25, help='신뢰도 임계값')
+    parser.add_argument('--iou', type=float, default=0.7, help='IoU 임계값')
+    parser.add_argument('--workers', type=int, default=None, help='워커 프로세스 수')
+    parser.add_argument('--segments-per-worker', type=int, default=2, help='워커당 구간 수')
+    parser.add_argument('--progress', type=str, default='-', help="JSON lines 출력 경로 ('-'면 stdout)")
+    parser.add_argument('--keep-segments', action='store_true', help='구간 파일 보존')
+    args = parser.parse_args()
+
+    output = args.output or f"{Path(args.input).stem}_detected.mp4"
+    stream = sys.stdout if args.progress == '-' else open(args.progress, 'w', encoding='utf-8')
+    try:
+        annotate_video(args.input, output, model_path=args.model, conf=args.conf, iou=args.iou,
+                       workers=args.workers, segments_per_worker=args.segments_per_worker,
+                       progress_stream=stream, keep_segments=args.keep_segments)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+
+if __name__ == "__main__":
+    main()
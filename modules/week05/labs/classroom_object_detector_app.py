@@ -16,7 +16,7 @@ import cv2
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 import torch
 import time
 import json
@@ -24,10 +24,14 @@ from pathlib import Path
 from collections import Counter, defaultdict
 import io
 import base64
+import sys
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+from core.annotation_renderer import AnnotationRenderer
+
 # YOLOv8 import
 try:
     from ultralytics import YOLO
@@ -100,6 +104,9 @@ class ClassroomObjectDetector:
             'remote': (64, 224, 208)
         }
         
+        # 박스/라벨 렌더러 (라벨 스프라이트 캐시)
+        self.renderer = AnnotationRenderer(font_scale=0.6, font_thickness=2, box_thickness=3)
+        
         # 통계 저장
         self.detection_history = []
         self.performance_stats = {
@@ -228,9 +235,6 @@ class ClassroomObjectDetector:
         elif isinstance(image, np.ndarray):
             image = Image.fromarray(image)
         
-        annotated_image = image.copy()
-        draw = ImageDraw.Draw(annotated_image)
-        
         detection_info = {
             'total_objects': 0,
             'classes': {},
@@ -239,7 +243,7 @@ class ClassroomObjectDetector:
         }
         
         if results is None or results.boxes is None:
-            return annotated_image, detection_info
+            return image.copy(), detection_info
         
         # 탐지 결과 추출
         boxes = results.boxes.xyxy.cpu().numpy()
@@ -248,42 +252,23 @@ class ClassroomObjectDetector:
         
         detection_info['total_objects'] = len(boxes)
         
+        # 클래스 이름 결정
+        if self.is_custom_model:
+            class_names = [self.classroom_classes.get(class_id, f'class_{class_id}') for class_id in class_ids]
+        else:
+            class_names = [results.names[class_id] for class_id in class_ids]
+        
         # 클래스별 카운트
-        class_counts = Counter()
+        class_counts = Counter(class_names)
         
-        try:
-            # 폰트 로드 시도
-            font = ImageFont.truetype("arial.ttf", 16)
-        except:
-            font = ImageFont.load_default()
-        
-        # 각 탐지 결과 그리기
-        for i, (box, conf, class_id) in enumerate(zip(boxes, confidences, class_ids)):
-            x1, y1, x2, y2 = box.astype(int)
-            
-            # 클래스 이름 결정
-            if self.is_custom_model:
-                class_name = self.classroom_classes.get(class_id, f'class_{class_id}')
-            else:
-                class_name = results.names[class_id]
-            
-            class_counts[class_name] += 1
-            
-            # 색상 선택
-            color = self.class_colors.get(class_name, (128, 128, 128))
-            
-            # 바운딩 박스 그리기
-            draw.rectangle([x1, y1, x2, y2], outline=color, width=3)
-            
-            # 라벨 텍스트
-            label = f"{class_name}: {conf:.2f}"
-            
-            # 라벨 배경
-            bbox = draw.textbbox((x1, y1-25), label, font=font)
-            draw.rectangle(bbox, fill=color)
-            
-            # 라벨 텍스트
-            draw.text((x1, y1-25), label, fill='white', font=font)
+        # 라벨 텍스트와 색상 (RGB 배열에 그리므로 class_colors를 그대로 사용)
+        labels = [f"{name}: {conf:.2f}" for name, conf in zip(class_names, confidences)]
+        colors = [self.class_colors.get(name, (128, 128, 128)) for name in class_names]
+        
+        # PIL → 배열 변환 복사본 하나에 박스/라벨을 직접 그림 (라벨 이미지는 렌더러가 캐시)
+        canvas = np.array(image.convert('RGB'))
+        self.renderer.render(canvas, boxes, labels, colors, inplace=True)
+        annotated_image = Image.fromarray(canvas)
         
         detection_info['classes'] = dict(class_counts)
         
@@ -12,16 +12,21 @@ Week 5 Lab: 커스텀 데이터셋 준비 및 YOLOv8 학습
 """
 
 import os
+import io
 import json
 import yaml
 import shutil
 import random
+import tarfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 from PIL import Image, ImageDraw, ImageFont
 import cv2
+import torch
 from sklearn.model_selection import train_test_split
 import albumentations as A
 from collections import Counter, defaultdict
@@ -42,12 +47,13 @@ class ClassroomDatasetGenerator:
     교실 물건 탐지를 위한 데이터셋 생성기
     """
     
-    def __init__(self, output_dir="classroom_dataset"):
+    def __init__(self, output_dir="classroom_dataset", setup_dirs=True):
         """
         데이터셋 생성기 초기화
         
         Args:
             output_dir: 출력 디렉토리 경로
+            setup_dirs: 디렉토리 구조 생성 여부 (병렬 워커에서는 False)
         """
         self.output_dir = Path(output_dir)
         self.classes = {
@@ -68,7 +74,8 @@ class ClassroomDatasetGenerator:
         }
         
         # 데이터셋 구조 생성
-        self.setup_directory_structure()
+        if setup_dirs:
+            self.setup_directory_structure()
     
     def setup_directory_structure(self):
         """데이터셋 디렉토리 구조 생성"""
@@ -86,19 +93,21 @@ class ClassroomDatasetGenerator:
         
         print(f"✅ 데이터셋 디렉토리 구조 생성: {self.output_dir}")
     
-    def generate_synthetic_image(self, image_id, image_size=(640, 480)):
+    def generate_synthetic_image(self, image_id, image_size=(640, 480), rng=None):
         """
         합성 교실 이미지 생성
         
         Args:
             image_id: 이미지 ID
             image_size: 이미지 크기 (width, height)
+            rng: random.Random 인스턴스 (None이면 전역 random 사용)
         
         Returns:
             image: PIL Image
             annotations: 바운딩 박스 정보 리스트
         """
         width, height = image_size
+        rng = rng or random
         
         # 배경 색상 랜덤 선택
         background_colors = [
@@ -109,23 +118,23 @@ class ClassroomDatasetGenerator:
             (248, 248, 255)   # 고스트 화이트
         ]
         
-        bg_color = random.choice(background_colors)
+        bg_color = rng.choice(background_colors)
         image = Image.new('RGB', image_size, color=bg_color)
         draw = ImageDraw.Draw(image)
         
         annotations = []
         
         # 객체 개수 랜덤 결정 (1-8개)
-        num_objects = random.randint(1, 8)
+        num_objects = rng.randint(1, 8)
         
         for _ in range(num_objects):
             # 클래스 랜덤 선택
-            class_id = random.randint(0, 4)
+            class_id = rng.randint(0, 4)
             class_name = self.classes[class_id]
             
             # 객체 크기와 위치 결정
             obj_width, obj_height, obj_x, obj_y = self.generate_object_bbox(
-                class_name, width, height
+                class_name, width, height, rng
             )
             
             # 겹침 검사 (간단한 버전)
@@ -151,7 +160,7 @@ class ClassroomDatasetGenerator:
         
         return image, annotations
     
-    def generate_object_bbox(self, class_name, img_width, img_height):
+    def generate_object_bbox(self, class_name, img_width, img_height, rng=None):
         """
         클래스별 적절한 바운딩 박스 크기와 위치 생성
         
@@ -159,6 +168,7 @@ class ClassroomDatasetGenerator:
             class_name: 객체 클래스 이름
             img_width: 이미지 너비
             img_height: 이미지 높이
+            rng: random.Random 인스턴스 (None이면 전역 random 사용)
         
         Returns:
             width, height, x, y: 객체의 크기와 위치
@@ -173,17 +183,18 @@ class ClassroomDatasetGenerator:
         }
         
         size_range = size_ranges[class_name]
+        rng = rng or random
         
         # 크기 랜덤 결정
-        obj_width = random.randint(*size_range['w'])
-        obj_height = random.randint(*size_range['h'])
+        obj_width = rng.randint(*size_range['w'])
+        obj_height = rng.randint(*size_range['h'])
         
         # 이미지 경계 내 위치 결정
         max_x = max(0, img_width - obj_width)
         max_y = max(0, img_height - obj_height)
         
-        obj_x = random.randint(0, max_x) if max_x > 0 else 0
-        obj_y = random.randint(0, max_y) if max_y > 0 else 0
+        obj_x = rng.randint(0, max_x) if max_x > 0 else 0
+        obj_y = rng.randint(0, max_y) if max_y > 0 else 0
         
         return obj_width, obj_height, obj_x, obj_y
     
@@ -302,11 +313,17 @@ class ClassroomDatasetGenerator:
             label_path: 라벨 파일 경로
         """
         with open(label_path, 'w') as f:
-            for ann in annotations:
-                class_id = ann['class_id']
-                bbox = ann['bbox']
-                # YOLO 형식: class_id center_x center_y width height
-                f.write(f"{class_id} {bbox[0]:.6f} {bbox[1]:.6f} {bbox[2]:.6f} {bbox[3]:.6f}\n")
+            f.write(self.format_yolo_labels(annotations))
+    
+    @staticmethod
+    def format_yolo_labels(annotations):
+        """어노테이션 리스트 → YOLO 라벨 텍스트"""
+        # YOLO 형식: class_id center_x center_y width height
+        return ''.join(
+            f"{ann['class_id']} {ann['bbox'][0]:.6f} {ann['bbox'][1]:.6f} "
+            f"{ann['bbox'][2]:.6f} {ann['bbox'][3]:.6f}\n"
+            for ann in annotations
+        )
     
     def generate_dataset(self, num_images=1000, train_ratio=0.7, val_ratio=0.2):
         """
@@ -382,6 +399,73 @@ class ClassroomDatasetGenerator:
         
         return class_counts
     
+    def generate_dataset_parallel(self, num_images=1000, train_ratio=0.7, val_ratio=0.2,
+                                  workers=None, shard_size=500, seed=42,
+                                  output_format='files'):
+        """
+        프로세스 풀을 이용한 샤드 단위 병렬 데이터셋 생성
+        
+        이미지 ID를 split별로 shard_size씩 나눈 샤드마다 (seed, 시작 ID)로 RNG를 만들기 때문에
+        워커 수와 관계없이 항상 같은 데이터셋이 생성됩니다.
+        
+        Args:
+            num_images: 생성할 이미지 수
+            train_ratio: 훈련 데이터 비율
+            val_ratio: 검증 데이터 비율
+            workers: 워커 프로세스 수 (None이면 CPU 코어 수)
+            shard_size: 샤드당 이미지 수
+            seed: 기본 시드
+            output_format: 'files' (이미지/라벨 개별 파일, YOLO 학습용),
+                           'npy' (샤드별 이미지 배열 .npy + 라벨 .npy),
+                           'tar' (샤드별 WebDataset 형식 tar)
+        
+        Returns:
+            stats: {'class_counts', 'total_objects', 'seconds', 'images_per_sec', 'workers'}
+        """
+        if output_format not in ('files', 'npy', 'tar'):
+            raise ValueError(f"output_format must be 'files', 'npy' or 'tar' (got {output_format})")
+        
+        num_train = int(num_images * train_ratio)
+        num_val = int(num_images * val_ratio)
+        num_test = num_images - num_train - num_val
+        workers = workers or os.cpu_count() or 1
+        
+        # split 경계를 넘지 않는 샤드 목록 (워커 수와 무관)
+        shards = []
+        start = 0
+        for split_name, split_count in [('train', num_train), ('val', num_val), ('test', num_test)]:
+            for shard_start in range(start, start + split_count, shard_size):
+                shard_end = min(shard_start + shard_size, start + split_count)
+                shards.append((str(self.output_dir), split_name, shard_start, shard_end,
+                               seed, output_format))
+            start += split_count
+        
+        print(f"🔄 {num_images}개 이미지를 {len(shards)}개 샤드로 병렬 생성 중 (워커 {workers}개)...")
+        
+        class_counts = Counter()
+        started = time.perf_counter()
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for shard_counts in executor.map(_generate_shard, shards):
+                class_counts.update(shard_counts)
+        
+        elapsed = time.perf_counter() - started
+        self.create_dataset_config()
+        
+        total_objects = sum(class_counts.values())
+        stats = {
+            'class_counts': class_counts,
+            'total_objects': total_objects,
+            'seconds': elapsed,
+            'images_per_sec': num_images / elapsed if elapsed > 0 else 0.0,
+            'workers': workers
+        }
+        
+        print(f"📊 생성 완료: {num_images}개 이미지, {total_objects}개 객체, "
+              f"{elapsed:.1f}초 ({stats['images_per_sec']:.1f} images/sec)")
+        
+        return stats
+    
     def create_dataset_config(self):
         """YOLO 데이터셋 설정 파일 생성"""
         config = {
@@ -463,6 +547,108 @@ class ClassroomDatasetGenerator:
         plt.tight_layout()
         plt.show()
 
+def _shard_rng(seed, shard_start):
+    """샤드 RNG: (기본 시드, 샤드 시작 ID)로만 결정"""
+    return random.Random(seed * 1_000_003 + shard_start)
+
+
+def _generate_shard(task):
+    """
+    샤드 하나 생성 (워커 프로세스에서 실행)
+    
+    Returns:
+        Counter: 클래스별 객체 수
+    """
+    output_dir, split_name, shard_start, shard_end, seed, output_format = task
+    
+    generator = ClassroomDatasetGenerator(output_dir, setup_dirs=False)
+    rng = _shard_rng(seed, shard_start)
+    output_dir = Path(output_dir)
+    shard_name = f"shard_{shard_start:06d}"
+    
+    class_counts = Counter()
+    images = []
+    label_rows = []
+    label_texts = []
+    
+    for image_id in range(shard_start, shard_end):
+        image, annotations = generator.generate_synthetic_image(image_id, rng=rng)
+        images.append((image_id, image))
+        label_texts.append(generator.format_yolo_labels(annotations))
+        
+        for ann in annotations:
+            class_counts[ann['class_name']] += 1
+            label_rows.append([image_id, ann['class_id'], *ann['bbox']])
+    
+    if output_format == 'files':
+        images_dir = output_dir / 'images' / split_name
+        labels_dir = output_dir / 'labels' / split_name
+        for (image_id, image), text in zip(images, label_texts):
+            image.save(images_dir / f"image_{image_id:06d}.jpg", quality=95)
+            (labels_dir / f"image_{image_id:06d}.txt").write_text(text)
+    
+    elif output_format == 'npy':
+        # 라벨: (image_id, class_id, cx, cy, w, h) 행렬 하나로 저장
+        packed_dir = output_dir / 'packed' / split_name
+        packed_dir.mkdir(parents=True, exist_ok=True)
+        np.save(packed_dir / f"{shard_name}_images.npy",
+                np.stack([np.asarray(image) for _, image in images]))
+        np.save(packed_dir / f"{shard_name}_labels.npy",
+                np.asarray(label_rows, dtype=np.float32).reshape(-1, 6))
+    
+    else:  # tar (WebDataset 형식: 같은 key의 .jpg/.txt 쌍)
+        packed_dir = output_dir / 'packed' / split_name
+        packed_dir.mkdir(parents=True, exist_ok=True)
+        with tarfile.open(packed_dir / f"{shard_name}.tar", 'w') as tar:
+            for (image_id, image), text in zip(images, label_texts):
+                buffer = io.BytesIO()
+                image.save(buffer, format='JPEG', quality=95)
+                for suffix, payload in (('jpg', buffer.getvalue()), ('txt', text.encode())):
+                    info = tarfile.TarInfo(f"image_{image_id:06d}.{suffix}")
+                    info.size = len(payload)
+                    tar.addfile(info, io.BytesIO(payload))
+    
+    return class_counts
+
+
+def benchmark_generation_scaling(num_images=2000, worker_counts=(1, 2, 4, 8),
+                                 output_format='files', base_dir='generation_benchmark',
+                                 shard_size=100):
+    """
+    코어 수별 images/sec 측정 및 결과 동일성 확인
+    (샤드 크기는 모든 워커 수에서 같아야 결과가 동일함)
+    
+    Returns:
+        results: [{'workers', 'images_per_sec', 'speedup', 'class_counts'}, ...]
+    """
+    results = []
+    
+    for workers in worker_counts:
+        output_dir = Path(base_dir) / f"workers_{workers}"
+        if output_dir.exists():
+            shutil.rmtree(output_dir)
+        
+        generator = ClassroomDatasetGenerator(output_dir)
+        stats = generator.generate_dataset_parallel(
+            num_images=num_images, workers=workers, shard_size=shard_size,
+            output_format=output_format
+        )
+        results.append({
+            'workers': workers,
+            'images_per_sec': stats['images_per_sec'],
+            'speedup': stats['images_per_sec'] / results[0]['images_per_sec'] if results else 1.0,
+            'class_counts': dict(stats['class_counts'])
+        })
+    
+    identical = all(r['class_counts'] == results[0]['class_counts'] for r in results)
+    
+    print("\n📈 코어 수별 생성 속도:")
+    for r in results:
+        print(f"   {r['workers']:>2} workers: {r['images_per_sec']:.1f} images/sec (x{r['speedup']:.2f})")
+    print(f"   워커 수와 무관하게 동일한 결과: {'✅' if identical else '❌'}")
+    
+    return results
+
 class DataAugmentation:
     """
     데이터 증강 클래스
@@ -579,6 +765,23 @@ class DataAugmentation:
         
         print("✅ 데이터 증강 완료!")
     
+    def make_streaming_dataset(self, dataset_dir, split='train', multiplier=2,
+                               img_size=640, cache_path=None):
+        """
+        디스크에 증강본을 만들지 않고 학습 시점에 self.transform을 적용하는 데이터셋 생성
+        (검증/테스트 split에는 증강을 적용하지 않음)
+        """
+        dataset_dir = Path(dataset_dir)
+        is_train = split == 'train'
+        return StreamingAugmentationDataset(
+            dataset_dir / 'images' / split,
+            dataset_dir / 'labels' / split,
+            transform=self.transform if is_train else None,
+            multiplier=multiplier if is_train else 1,
+            img_size=img_size,
+            cache_path=cache_path
+        )
+    
     def create_augmented_sample(self, image_path, label_path, 
                               output_images_dir, output_labels_dir, aug_idx):
         """
@@ -634,6 +837,212 @@ class DataAugmentation:
         except Exception as e:
             print(f"   ⚠️ 증강 실패: {image_path.name} - {e}")
 
+def build_decoded_cache(images_dir, cache_path):
+    """
+    디코딩된 RGB 이미지를 하나의 평면 uint8 배열(.npy)로 저장
+    크기가 다른 이미지도 저장할 수 있도록 (offset, h, w) 테이블을 함께 저장
+    
+    Returns:
+        cache_path: 저장된 캐시 경로 (.npy, 인덱스는 *_index.npy)
+    """
+    image_files = sorted(Path(images_dir).glob('*.jpg'))
+    shapes = []
+    for image_path in image_files:
+        with Image.open(image_path) as img:
+            shapes.append((img.height, img.width))
+    
+    sizes = [h * w * 3 for h, w in shapes]
+    offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+    
+    cache_path = Path(cache_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    data = np.lib.format.open_memmap(cache_path, mode='w+', dtype=np.uint8,
+                                     shape=(int(offsets[-1]),))
+    
+    for image_path, offset, size in zip(image_files, offsets[:-1], sizes):
+        image = cv2.cvtColor(cv2.imread(str(image_path)), cv2.COLOR_BGR2RGB)
+        data[offset:offset + size] = image.reshape(-1)
+    data.flush()
+    
+    index = np.array([[o, h, w] for o, (h, w) in zip(offsets[:-1], shapes)], dtype=np.int64)
+    np.save(cache_path.with_name(cache_path.stem + '_index.npy'), index)
+    np.save(cache_path.with_name(cache_path.stem + '_files.npy'),
+            np.array([p.name for p in image_files]))
+    
+    print(f"✅ 디코딩 캐시 생성: {cache_path} ({offsets[-1] / 1e6:.1f} MB)")
+    return cache_path
+
+
+class StreamingAugmentationDataset(torch.utils.data.Dataset):
+    """
+    학습 시점에 증강을 적용하는 데이터셋
+    
+    원본 이미지를 한 번씩만 읽고(선택적으로 디코딩 캐시 사용), DataLoader 워커에서
+    albumentations 변환을 적용해 YOLO 형식 텐서를 바로 반환합니다.
+    증강본을 디스크에 저장하지 않으므로 매 에폭 새로운 증강이 적용됩니다.
+    """
+    
+    def __init__(self, images_dir, labels_dir, transform=None, multiplier=2,
+                 include_original=True, img_size=640, cache_path=None):
+        """
+        Args:
+            images_dir: 원본 이미지 디렉토리
+            labels_dir: YOLO 라벨 디렉토리
+            transform: albumentations Compose (bbox_params format='yolo')
+            multiplier: 에폭당 원본 1장이 등장하는 횟수 (materialized 방식의 배수와 동일)
+            include_original: True면 첫 번째 등장은 증강 없이 원본 사용
+            img_size: 출력 정사각형 크기 (배치 구성을 위해 리사이즈)
+            cache_path: build_decoded_cache로 만든 캐시 경로 (없으면 JPEG 디코딩)
+        """
+        self.images_dir = Path(images_dir)
+        self.transform = transform
+        self.multiplier = multiplier
+        self.include_original = include_original
+        self.img_size = img_size
+        self.cache_path = cache_path
+        self._cache = None  # 워커 프로세스에서 처음 접근할 때 memmap으로 연결
+        
+        if cache_path:
+            cache_path = Path(cache_path)
+            self.image_names = list(np.load(cache_path.with_name(cache_path.stem + '_files.npy')))
+            self.cache_index = np.load(cache_path.with_name(cache_path.stem + '_index.npy'))
+        else:
+            self.image_names = sorted(p.name for p in self.images_dir.glob('*.jpg'))
+            self.cache_index = None
+        
+        # 라벨은 초기화 시 한 번만 파싱
+        self.labels = []
+        for name in self.image_names:
+            label_path = Path(labels_dir) / (Path(name).stem + '.txt')
+            rows = np.loadtxt(label_path, ndmin=2, dtype=np.float32) if label_path.exists() else None
+            self.labels.append(self._clip_yolo(rows) if rows is not None and rows.size
+                               else np.zeros((0, 5), np.float32))
+    
+    @staticmethod
+    def _clip_yolo(rows):
+        """저장 시 반올림 오차로 [0, 1]을 살짝 벗어난 박스를 이미지 안으로 보정"""
+        cls, cx, cy, w, h = rows.T
+        x1, y1 = np.clip(cx - w / 2, 0, 1), np.clip(cy - h / 2, 0, 1)
+        x2, y2 = np.clip(cx + w / 2, 0, 1), np.clip(cy + h / 2, 0, 1)
+        return np.stack([cls, (x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1], axis=1).astype(np.float32)
+    
+    def __len__(self):
+        return len(self.image_names) * self.multiplier
+    
+    def _load_image(self, idx):
+        if self.cache_index is not None:
+            if self._cache is None:
+                self._cache = np.load(self.cache_path, mmap_mode='r')
+            offset, h, w = self.cache_index[idx]
+            return np.array(self._cache[offset:offset + h * w * 3]).reshape(h, w, 3)
+        
+        image = cv2.imread(str(self.images_dir / self.image_names[idx]))
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    
+    def __getitem__(self, index):
+        idx, repeat = index % len(self.image_names), index // len(self.image_names)
+        image = self._load_image(idx)
+        labels = self.labels[idx]
+        bboxes, classes = labels[:, 1:].tolist(), labels[:, 0].astype(int).tolist()
+        
+        if self.transform is not None and not (self.include_original and repeat == 0):
+            augmented = self.transform(image=image, bboxes=bboxes, class_labels=classes)
+            image, bboxes, classes = augmented['image'], augmented['bboxes'], augmented['class_labels']
+        
+        # YOLO 정규화 좌표는 리사이즈해도 그대로 유지됨
+        image = cv2.resize(image, (self.img_size, self.img_size))
+        image_tensor = torch.from_numpy(image).permute(2, 0, 1).float().div_(255)
+        
+        targets = torch.zeros((len(bboxes), 5))
+        if len(bboxes):
+            targets[:, 0] = torch.tensor(classes, dtype=torch.float32)
+            targets[:, 1:] = torch.tensor(bboxes, dtype=torch.float32)
+        
+        return image_tensor, targets
+    
+    @staticmethod
+    def collate_fn(batch):
+        """
+        배치 구성
+        Returns:
+            images: (B, 3, S, S)
+            targets: (N, 6) [batch_idx, class_id, cx, cy, w, h]
+        """
+        images, targets = zip(*batch)
+        rows = [torch.cat([torch.full((len(t), 1), float(i)), t], dim=1) for i, t in enumerate(targets)]
+        return torch.stack(images), torch.cat(rows) if rows else torch.zeros((0, 6))
+
+
+def _directory_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob('*') if f.is_file())
+
+
+def compare_augmentation_strategies(dataset_dir, multiplier=2, batch_size=16,
+                                    num_workers=2, use_cache=True):
+    """
+    증강본을 디스크에 저장하는 방식 vs 학습 시점 증강(스트리밍) 비교
+    
+    Returns:
+        results: {'materialized': {...}, 'streaming': {...}}
+            각 항목: prepare_sec(준비 시간), epoch_sec(1 에폭 로딩 시간), disk_mb(추가 디스크 사용량)
+    """
+    dataset_dir = Path(dataset_dir)
+    augmentation = DataAugmentation()
+    results = {}
+    
+    def time_epoch(dataset):
+        loader = torch.utils.data.DataLoader(
+            dataset, batch_size=batch_size, shuffle=True, num_workers=num_workers,
+            collate_fn=StreamingAugmentationDataset.collate_fn
+        )
+        start = time.perf_counter()
+        for _ in loader:
+            pass
+        return time.perf_counter() - start
+    
+    # 1. Materialized: 증강본을 먼저 디스크에 기록
+    materialized_dir = dataset_dir.parent / (dataset_dir.name + '_materialized')
+    if materialized_dir.exists():
+        shutil.rmtree(materialized_dir)
+    start = time.perf_counter()
+    augmentation.augment_dataset(dataset_dir, materialized_dir, multiplier=multiplier)
+    prepare = time.perf_counter() - start
+    materialized = StreamingAugmentationDataset(
+        materialized_dir / 'images' / 'train', materialized_dir / 'labels' / 'train',
+        transform=None, multiplier=1
+    )
+    results['materialized'] = {
+        'prepare_sec': prepare,
+        'epoch_sec': time_epoch(materialized),
+        'disk_mb': _directory_size(materialized_dir) / 1e6,
+        'samples': len(materialized)
+    }
+    
+    # 2. Streaming: 원본만 읽고 워커에서 증강
+    cache_path = None
+    start = time.perf_counter()
+    if use_cache:
+        cache_path = build_decoded_cache(dataset_dir / 'images' / 'train',
+                                         dataset_dir / 'cache' / 'train_decoded.npy')
+    prepare = time.perf_counter() - start
+    streaming = StreamingAugmentationDataset(
+        dataset_dir / 'images' / 'train', dataset_dir / 'labels' / 'train',
+        transform=augmentation.transform, multiplier=multiplier, cache_path=cache_path
+    )
+    results['streaming'] = {
+        'prepare_sec': prepare,
+        'epoch_sec': time_epoch(streaming),
+        'disk_mb': _directory_size(dataset_dir / 'cache') / 1e6 if use_cache else 0.0,
+        'samples': len(streaming)
+    }
+    
+    print("\n📊 증강 방식 비교 (train split):")
+    for name, r in results.items():
+        print(f"   {name:>12}: 준비 {r['prepare_sec']:.1f}s, 에폭 {r['epoch_sec']:.1f}s, "
+              f"추가 디스크 {r['disk_mb']:.1f}MB, 샘플 {r['samples']}개")
+    
+    return results
+
 class YOLOv8Trainer:
     """
     YOLOv8 커스텀 학습 클래스
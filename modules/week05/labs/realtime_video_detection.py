@@ -20,16 +20,23 @@ import json
 from datetime import datetime
 import threading
 import queue
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+from core.adaptive_scheduler import AdaptiveInferenceScheduler
+from core.annotation_renderer import AnnotationRenderer
+from core.video_capture import ThreadedCapture
+
 # YOLOv8 import
+# (로그는 stderr로: --headless의 stdout JSON lines에 섞이지 않도록, spawn 워커가 이 모듈을 다시 import할 때 포함)
 try:
     from ultralytics import YOLO
-    print("✅ Ultralytics YOLOv8 패키지 로드 완료")
+    print("✅ Ultralytics YOLOv8 패키지 로드 완료", file=sys.stderr)
 except ImportError:
-    print("❌ Ultralytics 패키지가 설치되지 않았습니다.")
-    print("설치 명령어: pip install ultralytics")
+    print("❌ Ultralytics 패키지가 설치되지 않았습니다.", file=sys.stderr)
+    print("설치 명령어: pip install ultralytics", file=sys.stderr)
     exit(1)
 
 class RealTimeDetector:
@@ -37,7 +44,7 @@ class RealTimeDetector:
     실시간 객체 탐지 클래스
     """
     
-    def __init__(self, model_path='yolov8n.pt', conf_threshold=0.25, iou_threshold=0.7):
+    def __init__(self, model_path='yolov8n.pt', conf_threshold=0.25, iou_threshold=0.7, imgsz=640):
         """
         실시간 탐지기 초기화
         
@@ -45,10 +52,12 @@ class RealTimeDetector:
             model_path: YOLO 모델 경로
             conf_threshold: 신뢰도 임계값
             iou_threshold: IoU 임계값
+            imgsz: 기본 추론 입력 크기 (웹캠 모드에서는 스케줄러가 배율을 조정)
         """
         self.model_path = model_path
         self.conf_threshold = conf_threshold
         self.iou_threshold = iou_threshold
+        self.imgsz = imgsz
         
         # 모델 로드
         self.model = None
@@ -114,6 +123,12 @@ class RealTimeDetector:
         self.is_recording = False
         self.video_writer = None
         self.output_path = None
+        
+        # 웹캠 모드 추론 스케줄러 (process_webcam에서 생성)
+        self.scheduler = None
+        
+        # 박스/라벨 렌더러 (라벨 스프라이트 캐시 + 재사용 출력 버퍼)
+        self.renderer = AnnotationRenderer(font_scale=0.6, font_thickness=2, box_thickness=2)
     
     def load_model(self):
         """YOLO 모델 로드"""
@@ -130,12 +145,13 @@ class RealTimeDetector:
             print(f"❌ 모델 로드 실패: {e}")
             self.model = None
     
-    def detect_objects(self, frame):
+    def detect_objects(self, frame, imgsz=None):
         """
         프레임에서 객체 탐지
         
         Args:
             frame: 입력 프레임
+            imgsz: 추론 입력 크기 (기본: self.imgsz)
         
         Returns:
             results: 탐지 결과
@@ -151,6 +167,7 @@ class RealTimeDetector:
                 frame,
                 conf=self.conf_threshold,
                 iou=self.iou_threshold,
+                imgsz=imgsz or self.imgsz,
                 verbose=False,
                 stream=False
             )
@@ -198,7 +215,7 @@ class RealTimeDetector:
         
         return results
     
-    def draw_detections(self, frame, results, inference_time):
+    def draw_detections(self, frame, results, inference_time, inplace=False):
         """
         탐지 결과를 프레임에 그리기
         
@@ -206,14 +223,16 @@ class RealTimeDetector:
             frame: 원본 프레임
             results: 탐지 결과
             inference_time: 추론 시간
+            inplace: True면 frame에 직접 그림 (복사 없음, 원본을 다시 쓰지 않을 때)
         
         Returns:
-            annotated_frame: 어노테이션된 프레임
+            annotated_frame: 어노테이션된 프레임 (inplace가 아니면 렌더러 버퍼, 다음 호출 때 덮어써짐)
             detection_count: 탐지된 객체 수
         """
-        annotated_frame = frame.copy()
         detection_count = 0
         class_counts = Counter()
+        boxes = np.empty((0, 4), dtype=np.float32)
+        labels, colors = [], []
         
         if results is not None and results.boxes is not None:
             boxes = results.boxes.xyxy.cpu().numpy()
@@ -221,35 +240,17 @@ class RealTimeDetector:
             class_ids = results.boxes.cls.cpu().numpy().astype(int)
             
             detection_count = len(boxes)
+            class_names = [results.names[class_id] for class_id in class_ids]
+            class_counts.update(class_names)
             
-            # 각 탐지 결과 그리기
-            for box, conf, class_id in zip(boxes, confidences, class_ids):
-                x1, y1, x2, y2 = box.astype(int)
-                
-                # 클래스 이름 결정
-                class_name = results.names[class_id]
-                class_counts[class_name] += 1
-                
-                # 색상 선택
-                color = self.class_colors.get(class_name, (128, 128, 128))
-                
-                # 바운딩 박스 그리기
-                cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2)
-                
-                # 라벨 텍스트
-                if self.show_confidence:
-                    label = f"{class_name}: {conf:.2f}"
-                else:
-                    label = class_name
-                
-                # 라벨 배경
-                label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
-                cv2.rectangle(annotated_frame, (x1, y1 - label_size[1] - 10), 
-                            (x1 + label_size[0], y1), color, -1)
-                
-                # 라벨 텍스트
-                cv2.putText(annotated_frame, label, (x1, y1 - 5), 
-                          cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            # 라벨 텍스트와 색상 (라벨 이미지는 렌더러가 캐시)
+            if self.show_confidence:
+                labels = [f"{name}: {conf:.2f}" for name, conf in zip(class_names, confidences)]
+            else:
+                labels = class_names
+            colors = [self.class_colors.get(name, (128, 128, 128)) for name in class_names]
+        
+        annotated_frame = self.renderer.render(frame, boxes, labels, colors or (128, 128, 128), inplace=inplace)
         
         # 통계 업데이트
         self.update_statistics(detection_count, class_counts, inference_time)
@@ -297,7 +298,10 @@ class RealTimeDetector:
         
         # 추론 시간 표시
         if self.show_inference_time:
-            cv2.putText(frame, f"Inference: {inference_time:.1f}ms", (20, y_offset), 
+            text = f"Inference: {inference_time:.1f}ms"
+            if self.scheduler is not None:
+                text += f" (every {self.scheduler.stride}, x{self.scheduler.scale:.2f})"
+            cv2.putText(frame, text, (20, y_offset), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
             y_offset += 20
         
@@ -336,31 +340,42 @@ class RealTimeDetector:
             self.is_recording = False
             print(f"⏹️ 녹화 완료: {self.output_path}")
     
-    def process_webcam(self, camera_id=0, window_name="교실 물건 탐지기"):
+    def process_webcam(self, camera_id=0, window_name="교실 물건 탐지기",
+                       target_fps=30.0, latency_slo_ms=50.0):
         """
         웹캠을 사용한 실시간 탐지
         
+        추론 간격과 입력 크기는 AdaptiveInferenceScheduler가 측정된 추론 시간에 맞춰 조정하고,
+        추론하지 않는 프레임에는 직전 탐지 결과를 그립니다.
+        
         Args:
             camera_id: 카메라 ID (기본값: 0)
             window_name: 윈도우 이름
+            target_fps: 목표 표시 FPS
+            latency_slo_ms: 추론 1회 지연시간 목표 (ms)
         """
+        self.scheduler = AdaptiveInferenceScheduler(
+            target_fps=target_fps,
+            latency_slo_ms=latency_slo_ms,
+            scales=(1.0, 0.8, 0.6, 0.5)
+        )
+        results, inference_time = None, 0
         print(f"📹 웹캠 시작 (카메라 ID: {camera_id})")
         
-        # 웹캠 초기화
-        cap = cv2.VideoCapture(camera_id)
+        # 웹캠 초기화 (디코딩은 백그라운드 스레드, 큐가 차면 오래된 프레임부터 버림)
+        cap = ThreadedCapture(camera_id, queue_size=2, policy='drop_oldest', properties={
+            cv2.CAP_PROP_FRAME_WIDTH: 1280,
+            cv2.CAP_PROP_FRAME_HEIGHT: 720,
+            cv2.CAP_PROP_FPS: 30,
+        })
         
         if not cap.isOpened():
             print(f"❌ 카메라 {camera_id}를 열 수 없습니다.")
             return
         
-        # 카메라 설정
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        cap.set(cv2.CAP_PROP_FPS, 30)
-        
-        actual_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        actual_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        actual_fps = cap.get(cv2.CAP_PROP_FPS)
+        actual_width = cap.width
+        actual_height = cap.height
+        actual_fps = cap.fps
         
         print(f"✅ 카메라 설정: {actual_width}x{actual_height} @ {actual_fps}fps")
         print("\n🎮 조작법:")
@@ -375,10 +390,11 @@ class RealTimeDetector:
         
         try:
             while True:
-                ret, frame = cap.read()
-                if not ret:
+                captured = cap.next_frame(timeout=5.0)
+                if captured is None:
                     print("❌ 프레임을 읽을 수 없습니다.")
                     break
+                frame = captured.image
                 
                 # FPS 계산
                 current_time = time.time()
@@ -386,12 +402,16 @@ class RealTimeDetector:
                 frame_time = current_time
                 self.fps_queue.append(fps)
                 
-                # 객체 탐지
-                results, inference_time = self.detect_objects(frame)
-                results = self.filter_classroom_objects(results)
+                # 객체 탐지 (스케줄러가 고른 프레임만, 나머지는 직전 결과 재사용)
+                if self.scheduler.should_infer(captured.timestamp):
+                    imgsz = max(32, int(round(self.imgsz * self.scheduler.scale / 32)) * 32)
+                    with self.scheduler.measure():
+                        results, inference_time = self.detect_objects(frame, imgsz=imgsz)
+                        results = self.filter_classroom_objects(results)
                 
-                # 결과 시각화
-                annotated_frame, detection_count = self.draw_detections(frame, results, inference_time)
+                # 결과 시각화 (캡처 프레임은 다시 쓰지 않으므로 직접 그림)
+                annotated_frame, detection_count = self.draw_detections(frame, results, inference_time,
+                                                                        inplace=True)
                 
                 # 녹화
                 if self.is_recording:
@@ -435,6 +455,8 @@ class RealTimeDetector:
                 elif key == ord('i'):  # I - 추론 시간 토글
                     self.show_inference_time = not self.show_inference_time
                     print(f"추론 시간 표시: {'ON' if self.show_inference_time else 'OFF'}")
+                
+                self.scheduler.frame_done()
         
         except KeyboardInterrupt:
             print("\n⏹️ 사용자 중단")
@@ -450,13 +472,44 @@ class RealTimeDetector:
             # 세션 통계 출력
             self.print_session_statistics()
     
-    def process_video_file(self, input_path, output_path=None):
+    def annotate_frame(self, frame, frame_number, total_frames):
+        """
+        비디오 프레임 1장 탐지 + 어노테이션 (파일 처리와 배치 처리에서 공용)
+        
+        Args:
+            frame: 입력 프레임
+            frame_number: 1부터 시작하는 프레임 번호
+            total_frames: 전체 프레임 수
+        
+        Returns:
+            annotated_frame: 어노테이션된 프레임
+            detection_count: 탐지된 객체 수
+            inference_time: 추론 시간 (ms)
+        """
+        # 객체 탐지
+        results, inference_time = self.detect_objects(frame)
+        results = self.filter_classroom_objects(results)
+        
+        # 결과 시각화 (디코딩한 프레임에 직접 그림: 인코딩 큐에 넣어도 다음 프레임과 버퍼를 공유하지 않음)
+        annotated_frame, detection_count = self.draw_detections(frame, results, inference_time, inplace=True)
+        
+        # 진행률을 프레임에 표시
+        progress = (frame_number / total_frames) * 100 if total_frames > 0 else 0.0
+        cv2.putText(annotated_frame, f"Progress: {progress:.1f}% ({frame_number}/{total_frames})", 
+                   (10, annotated_frame.shape[0] - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        
+        return annotated_frame, detection_count, inference_time
+    
+    def process_video_file(self, input_path, output_path=None, headless=False):
         """
         비디오 파일 처리
         
         Args:
             input_path: 입력 비디오 파일 경로
             output_path: 출력 비디오 파일 경로 (선택사항)
+            headless: True면 화면 출력(imshow/waitKey) 없이 처리 (디스플레이 없는 서버용)
+        
+        긴 비디오를 여러 코어로 처리하려면 batch_video_annotation.annotate_video를 사용하세요.
         """
         input_path = Path(input_path)
         
@@ -466,18 +519,18 @@ class RealTimeDetector:
         
         print(f"🎬 비디오 파일 처리: {input_path}")
         
-        # 비디오 캡처 초기화
-        cap = cv2.VideoCapture(str(input_path))
+        # 비디오 캡처 초기화 (파일은 프레임 손실 없이 디코딩을 추론과 겹쳐 수행)
+        cap = ThreadedCapture(str(input_path), queue_size=8, policy='block')
         
         if not cap.isOpened():
             print(f"❌ 비디오 파일을 열 수 없습니다: {input_path}")
             return
         
         # 비디오 정보
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        total_frames = cap.frame_count
+        fps = cap.fps
+        width = cap.width
+        height = cap.height
         
         print(f"📊 비디오 정보: {width}x{height}, {fps:.1f}fps, {total_frames}프레임")
         
@@ -493,38 +546,27 @@ class RealTimeDetector:
         start_time = time.time()
         
         try:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
+            for captured in cap:
+                frame = captured.image
                 frame_count += 1
                 
-                # 객체 탐지
-                results, inference_time = self.detect_objects(frame)
-                results = self.filter_classroom_objects(results)
-                
-                # 결과 시각화
-                annotated_frame, detection_count = self.draw_detections(frame, results, inference_time)
-                
-                # 진행률 표시
-                progress = (frame_count / total_frames) * 100
-                
-                # 진행률을 프레임에 표시
-                cv2.putText(annotated_frame, f"Progress: {progress:.1f}% ({frame_count}/{total_frames})", 
-                           (10, height - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                # 탐지 + 시각화
+                annotated_frame, detection_count, inference_time = self.annotate_frame(
+                    frame, frame_count, total_frames)
+                progress = (frame_count / total_frames) * 100 if total_frames > 0 else 0.0
                 
                 # 출력 비디오에 저장
                 if video_writer is not None:
                     video_writer.write(annotated_frame)
                 
-                # 화면 출력 (선택사항)
-                cv2.imshow('비디오 처리 중...', annotated_frame)
-                
-                # ESC로 중단 가능
-                if cv2.waitKey(1) & 0xFF == 27:
-                    print("\n⏹️ 사용자 중단")
-                    break
+                if not headless:
+                    # 화면 출력 (선택사항)
+                    cv2.imshow('비디오 처리 중...', annotated_frame)
+                    
+                    # ESC로 중단 가능
+                    if cv2.waitKey(1) & 0xFF == 27:
+                        print("\n⏹️ 사용자 중단")
+                        break
                 
                 # 진행률 출력 (매 100프레임마다)
                 if frame_count % 100 == 0:
@@ -544,7 +586,8 @@ class RealTimeDetector:
             cap.release()
             if video_writer is not None:
                 video_writer.release()
-            cv2.destroyAllWindows()
+            if not headless:
+                cv2.destroyAllWindows()
             
             # 처리 완료 메시지
             total_time = time.time() - start_time
@@ -573,6 +616,12 @@ class RealTimeDetector:
         if self.session_stats['total_frames'] > 0:
             print(f"프레임당 평균 객체: {self.session_stats['total_detections']/self.session_stats['total_frames']:.1f}")
         
+        if self.scheduler is not None:
+            summary = self.scheduler.metrics.summary()
+            print(f"추론 스케줄: {summary['inferences']}회 추론 / {summary['skipped']}회 결과 재사용 / "
+                  f"{summary['dropped']}회 버림 (p90 {summary['latency_p90_ms']:.1f}ms, "
+                  f"간격 {summary['stride']}, 배율 {summary['scale']:.2f})")
+        
         print("\n클래스별 탐지 수:")
         for class_name, count in self.session_stats['class_counts'].most_common():
             percentage = (count / self.session_stats['total_detections']) * 100 if self.session_stats['total_detections'] > 0 else 0
@@ -593,9 +642,29 @@ def main():
                        help='IoU 임계값 (기본값: 0.7)')
     parser.add_argument('--camera', type=int, default=0, 
                        help='카메라 ID (기본값: 0)')
+    parser.add_argument('--target-fps', type=float, default=30.0,
+                       help='웹캠 목표 표시 FPS (기본값: 30)')
+    parser.add_argument('--latency-slo', type=float, default=50.0,
+                       help='웹캠 추론 지연시간 목표 ms (기본값: 50)')
+    parser.add_argument('--headless', action='store_true',
+                       help='화면 출력 없이 비디오 파일 처리 (서버용, 진행률은 JSON lines)')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='헤드리스 처리 워커 프로세스 수 (기본값: CPU 코어 수, 최대 4)')
     
     args = parser.parse_args()
     
+    if args.headless and args.source != 'webcam':
+        # 헤드리스 파일 처리: 구간별 병렬 워커 (모델은 워커마다 로드)
+        from batch_video_annotation import annotate_video
+        
+        if not Path(args.source).exists():
+            print(f"❌ 입력 파일이 존재하지 않습니다: {args.source}", file=sys.stderr)
+            return
+        output_path = args.output or f"{Path(args.source).stem}_detected_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
+        annotate_video(args.source, output_path, model_path=args.model, conf=args.conf,
+                       iou=args.iou, workers=args.workers)
+        return
+    
     print("🎯 실시간 교실 물건 탐지 시스템")
     print("=" * 60)
     print(f"모델: {args.model}")
@@ -616,7 +685,8 @@ def main():
     try:
         if args.source == 'webcam':
             # 웹캠 모드
-            detector.process_webcam(camera_id=args.camera)
+            detector.process_webcam(camera_id=args.camera, target_fps=args.target_fps,
+                                    latency_slo_ms=args.latency_slo)
         else:
             # 비디오 파일 모드
             if not Path(args.source).exists():
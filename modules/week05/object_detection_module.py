@@ -10,7 +10,8 @@ from PIL import Image
 import matplotlib.pyplot as plt
 import io
 import os
-import google.generativeai as genai
+
+from core.nms import detections_to_arrays, diou_nms, nms, soft_nms
 
 class ObjectDetectionModule:
     def _check_environment(self):
@@ -994,6 +995,18 @@ def soft_nms(detections, sigma=0.5):
     return detections
             """, language="python")
 
+            st.markdown("#### Soft NMS 시뮬레이션")
+            sigma = st.slider("sigma (작을수록 강하게 감점)", 0.1, 1.0, 0.5, 0.1, key="soft_nms_sigma")
+            sample = [
+                {"bbox": [100, 100, 200, 200], "confidence": 0.9},
+                {"bbox": [130, 110, 230, 210], "confidence": 0.85},
+                {"bbox": [300, 150, 400, 250], "confidence": 0.8},
+            ]
+            sample_boxes, sample_scores = detections_to_arrays(sample)
+            kept, decayed = soft_nms(sample_boxes, sample_scores, method='gaussian', sigma=sigma)
+            for idx, score in zip(kept, decayed):
+                st.write(f"박스 {idx + 1}: {sample_scores[idx]:.2f} → {score:.2f}")
+
         with nms_tabs[2]:
             st.subheader("DIoU NMS (고급)")
 
@@ -1032,6 +1045,17 @@ def soft_nms(detections, sigma=0.5):
 → A와 C는 다른 객체로 판단!
 """, language="python")
 
+            st.markdown("#### NMS vs DIoU NMS 비교")
+            crowd = [
+                {"bbox": [100, 100, 200, 200], "confidence": 0.9},
+                {"bbox": [150, 100, 250, 200], "confidence": 0.85},  # 옆에 붙은 다른 객체
+                {"bbox": [102, 98, 202, 198], "confidence": 0.8},    # 같은 객체 중복
+            ]
+            crowd_boxes, crowd_scores = detections_to_arrays(crowd)
+            diou_threshold = st.slider("IoU 임계값", 0.0, 1.0, 0.3, 0.05, key="diou_threshold")
+            st.write(f"기본 NMS 결과: {len(nms(crowd_boxes, crowd_scores, diou_threshold))}개 유지")
+            st.write(f"DIoU NMS 결과: {len(diou_nms(crowd_boxes, crowd_scores, diou_threshold))}개 유지")
+
             st.info("""
             **🎓 요약**
             - 기본 NMS: 단순하고 빠름
@@ -1694,6 +1718,7 @@ print(response.text)
                             if api_key and api_key != 'your_api_key_here':
                                 with st.spinner("Gemini API로 얼굴 분석 중..."):
                                     try:
+                                        import google.generativeai as genai
                                         genai.configure(api_key=api_key)
                                         model = genai.GenerativeModel('gemini-2.0-flash-exp')
 
@@ -1842,6 +1867,7 @@ print(response.text)
                     if api_key and api_key != 'your_api_key_here':
                         with st.spinner("번호판 인식 중..."):
                             try:
+                                import google.generativeai as genai
                                 genai.configure(api_key=api_key)
                                 model = genai.GenerativeModel('gemini-2.0-flash-exp')
 
@@ -2463,6 +2489,7 @@ print(response.text)
                             if api_key and api_key != 'your_api_key_here':
                                 with st.spinner("Gemini API로 손동작 분석 중..."):
                                     try:
+                                        import google.generativeai as genai
                                         genai.configure(api_key=api_key)
                                         model = genai.GenerativeModel('gemini-2.0-flash-exp')
 
@@ -2532,20 +2559,6 @@ if results.multi_hand_landmarks:
         return intersection / union if union > 0 else 0
 
     def apply_nms(self, detections, iou_threshold):
-        """NMS 적용"""
-        detections = sorted(detections, key=lambda x: x['confidence'], reverse=True)
-
-        keep = []
-        while detections:
-            best = detections.pop(0)
-            keep.append(best)
-
-            remaining = []
-            for det in detections:
-                iou = self.calculate_iou(best['bbox'], det['bbox'])
-                if iou <= iou_threshold:
-                    remaining.append(det)
-
-            detections = remaining
-
-        return keep
\ No newline at end of file
+        """NMS 적용 (core.nms 벡터화 구현 사용)"""
+        boxes, scores = detections_to_arrays(detections)
+        return [detections[i] for i in nms(boxes, scores, iou_threshold)]
\ No newline at end of file
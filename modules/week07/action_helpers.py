@@ -301,25 +301,10 @@ class VideoHelper(BaseImageProcessor):
             np.ndarray: RGB 이미지 (H, W, 3)
         """
         try:
-            import cv2
-
-            h, w = flow.shape[:2]
-
-            # HSV 이미지 생성
-            hsv = np.zeros((h, w, 3), dtype=np.uint8)
-            hsv[..., 1] = 255  # Saturation을 최대로
-
-            # Magnitude (크기)와 Angle (각도) 계산
-            magnitude, angle = cv2.cartToPolar(flow[..., 0], flow[..., 1])
-
-            # Hue: 방향 (0-180 범위)
-            hsv[..., 0] = angle * 180 / np.pi / 2
-
-            # Value: 크기 (정규화)
-            hsv[..., 2] = cv2.normalize(magnitude, None, 0, 255, cv2.NORM_MINMAX)
+            # Hue LUT 기반 렌더러 (방향 → 색상, 크기 → 밝기)
+            from core.overlay import render_flow
 
-            # HSV → RGB 변환
-            rgb = cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB)
+            rgb = render_flow(flow, color_order='rgb')
 
             return rgb
 
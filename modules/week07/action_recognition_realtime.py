@@ -15,6 +15,7 @@ import io
 import base64
 
 # Core imports
+from core.adaptive_scheduler import AdaptiveInferenceScheduler
 from core.base_processor import BaseImageProcessor
 
 
@@ -157,6 +158,14 @@ class RealtimeActionRecognitionModule(BaseImageProcessor):
         else:
             action_type = "통합 분석"
 
+        # 실시간 처리 설정 (추론 간격/해상도는 지연시간에 맞춰 자동 조정)
+        with st.expander("⚙️ 실시간 처리 설정"):
+            playback_speed = st.slider(
+                "재생 속도 (실시간 배수)", 1.0, 8.0, 4.0, 0.5, key="mp_speed",
+                help="비디오를 이 속도로 재생한다고 보고, 따라가지 못하는 프레임은 추론 없이 버립니다."
+            )
+            latency_slo_ms = st.slider("추론 지연시간 목표 (ms)", 10, 200, 50, key="mp_slo")
+
         # 비디오 입력
         st.subheader("📹 비디오 입력")
         input_source = st.radio(
@@ -181,14 +190,16 @@ class RealtimeActionRecognitionModule(BaseImageProcessor):
                 st.video(uploaded_file)
 
                 if st.button("🎬 MediaPipe 분석 시작", type="primary", key="mp_analyze"):
-                    self._process_with_mediapipe(video_path, detection_mode, action_type)
+                    self._process_with_mediapipe(video_path, detection_mode, action_type,
+                                                 playback_speed, latency_slo_ms)
 
         elif input_source == "샘플 비디오":
             st.info("샘플 비디오를 생성합니다...")
             if st.button("🎥 샘플 비디오 생성 및 분석", key="mp_sample"):
                 video_path = self._create_sample_video()
                 if video_path:
-                    self._process_with_mediapipe(video_path, detection_mode, action_type)
+                    self._process_with_mediapipe(video_path, detection_mode, action_type,
+                                                 playback_speed, latency_slo_ms)
 
         else:
             st.markdown("""
@@ -229,8 +240,15 @@ class RealtimeActionRecognitionModule(BaseImageProcessor):
             ```
             """)
 
-    def _process_with_mediapipe(self, video_path: str, detection_mode: str, action_type: str):
-        """MediaPipe로 비디오 처리"""
+    def _process_with_mediapipe(self, video_path: str, detection_mode: str, action_type: str,
+                                playback_speed: float = 4.0, latency_slo_ms: float = 50.0):
+        """
+        MediaPipe로 비디오 처리
+
+        비디오를 playback_speed배로 재생하는 실시간 루프처럼 처리합니다.
+        추론 간격과 입력 해상도는 AdaptiveInferenceScheduler가 측정된 지연시간으로 정하고,
+        재생 시각을 놓친 프레임은 추론 없이 버립니다.
+        """
         import mediapipe as mp
         import cv2
 
@@ -267,10 +285,16 @@ class RealtimeActionRecognitionModule(BaseImageProcessor):
             )
             connections = None
 
-        # 비디오 처리
+        # 비디오 처리 (스케줄러가 건너뛰는 프레임은 grab()만 하므로 백그라운드 디코딩을 쓰지 않음)
         cap = cv2.VideoCapture(video_path)
+        video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        scheduler = AdaptiveInferenceScheduler(
+            target_fps=video_fps * playback_speed,
+            latency_slo_ms=latency_slo_ms,
+            scales=(1.0, 0.75, 0.5),
+            max_stride=30
+        )
 
-        # 프레임 샘플링 (매 5프레임마다 처리)
         frame_count = 0
         processed_frames = []
         landmarks_history = []
@@ -281,27 +305,36 @@ class RealtimeActionRecognitionModule(BaseImageProcessor):
 
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
+        start_time = time.perf_counter()
         while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-
+            # 이 프레임이 재생될 시각 기준으로 추론 여부 결정
+            frame_time = start_time + frame_count / scheduler.target_fps
             frame_count += 1
 
-            # 프레임 샘플링
-            if frame_count % 5 != 0:
+            if not scheduler.should_infer(frame_time):
+                # 추론하지 않을 프레임은 retrieve(BGR 변환) 없이 넘김
+                if not cap.grab():
+                    break
                 continue
 
+            ret, frame = cap.read()
+            if not ret:
+                break
+
             # 진행률 업데이트
-            progress = min(frame_count / total_frames, 1.0)
+            progress = min(frame_count / total_frames, 1.0) if total_frames > 0 else 0.0
             progress_bar.progress(progress)
             status_text.text(f"프레임 {frame_count}/{total_frames} 처리 중...")
 
-            # RGB 변환
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            # RGB 변환 (스케줄러가 정한 해상도로 축소, 랜드마크는 정규화 좌표라 그대로 사용)
+            scale = scheduler.scale
+            small = frame if scale >= 1.0 else cv2.resize(
+                frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            rgb_frame = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
 
             # MediaPipe 처리
-            results = detector.process(rgb_frame)
+            with scheduler.measure():
+                results = detector.process(rgb_frame)
 
             # 결과 시각화
             annotated_frame = frame.copy()
@@ -342,6 +375,7 @@ class RealtimeActionRecognitionModule(BaseImageProcessor):
 
         cap.release()
         detector.close()
+        schedule = scheduler.metrics.summary()
 
         # 결과 표시
         st.success("✅ MediaPipe 분석 완료!")
@@ -370,11 +404,30 @@ class RealtimeActionRecognitionModule(BaseImageProcessor):
                 "detection_mode": detection_mode,
                 "action_type": action_type,
                 "total_frames": total_frames,
-                "processed_frames": frame_count // 5,
+                "processed_frames": schedule['inferences'],
                 "landmarks_detected": len(landmarks_history),
                 "action_counts": action_counts if "운동" in action_type else "N/A"
             })
 
+        # 스케줄러 결정/지연시간
+        with st.expander("⏱️ 추론 스케줄 기록"):
+            import pandas as pd
+
+            cols = st.columns(4)
+            cols[0].metric("추론 프레임", f"{schedule['inferences']}")
+            cols[1].metric("건너뜀 / 버림", f"{schedule['skipped']} / {schedule['dropped']}")
+            cols[2].metric("지연시간 p90", f"{schedule['latency_p90_ms']:.1f}ms")
+            cols[3].metric("최종 간격 / 배율", f"{schedule['stride']} / {schedule['scale']:.2f}")
+
+            history = pd.DataFrame(scheduler.metrics.as_columns())
+            if not history.empty:
+                history['t'] -= start_time
+                history = history.set_index('t')
+                st.line_chart(history[history['action'] == 'infer'][['latency_ms']])
+                st.line_chart(history[['stride', 'scale']])
+                st.caption(f"재생 속도 {playback_speed}x (프레임 예산 {scheduler.frame_budget_ms:.1f}ms), "
+                           f"지연시간 목표 {latency_slo_ms}ms")
+
     def _count_exercise(self, landmarks, counts):
         """운동 카운팅 로직 (간단한 예시)"""
         # 무릎 각도 계산 (스쿼트 예시)
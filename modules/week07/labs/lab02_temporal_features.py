@@ -16,9 +16,13 @@ import cv2
 import numpy as np
 import argparse
 import os
+import sys
 from pathlib import Path
 from typing import Tuple, Optional
 
+sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+from core.video_capture import ThreadedCapture
+
 
 def compute_optical_flow(
     frame1: np.ndarray,
@@ -202,7 +206,8 @@ def process_video(
         output_dir: 시각화 결과를 저장할 디렉토리 (None이면 실시간 표시만)
         visualize_mode: 'hsv', 'arrows', 'heatmap'
     """
-    cap = cv2.VideoCapture(video_path)
+    # 디코딩은 백그라운드 스레드에서 (Optical Flow 계산과 겹침, 파일이므로 프레임 손실 없음)
+    cap = ThreadedCapture(video_path, policy='block')
 
     if not cap.isOpened():
         raise ValueError(f"비디오 파일을 열 수 없습니다: {video_path}")
@@ -220,11 +225,8 @@ def process_video(
 
     print(f"비디오 처리 중... (시각화 모드: {visualize_mode})")
 
-    while True:
-        ret, frame = cap.read()
-
-        if not ret:
-            break
+    for captured in cap:
+        frame = captured.image
 
         # Optical Flow 계산
         flow = compute_optical_flow(prev_frame, frame)
@@ -277,7 +279,8 @@ def process_webcam(visualize_mode: str = 'hsv'):
     Args:
         visualize_mode: 'hsv', 'arrows', 'heatmap'
     """
-    cap = cv2.VideoCapture(0)
+    # 웹캠: 큐가 차면 오래된 프레임을 버려 항상 최신 프레임으로 Flow 계산
+    cap = ThreadedCapture(0, queue_size=2, policy='drop_oldest')
 
     if not cap.isOpened():
         raise ValueError("웹캠을 열 수 없습니다")
@@ -2,23 +2,29 @@
 Lab 04: 실시간 행동 인식 (Real-time Action Recognition)
 
 이 실습에서는 웹캠을 사용한 실시간 행동 인식을 배웁니다:
-- 프레임 버퍼를 사용한 실시간 처리
+- 프레임 버퍼를 사용한 실시간 처리 (전처리된 텐서 링 버퍼)
 - 경량화된 모델 사용
-- FPS 최적화 기법
+- FPS 최적화 기법 (지연시간 기반 적응형 추론 간격)
 - 비동기 처리
 
 사용법:
     python lab04_realtime_recognition.py
     python lab04_realtime_recognition.py --model videomae --buffer-size 32
+    python lab04_realtime_recognition.py --benchmark-preprocess
 """
 
 import argparse
+import sys
 import time
 from collections import deque
-from typing import List, Tuple, Optional, Deque
+from pathlib import Path
+from typing import List, Tuple, Optional, Deque, Sequence
 import numpy as np
 import threading
-import queue
+
+sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+from core.adaptive_scheduler import AdaptiveInferenceScheduler, LatestFrameSlot
+from core.video_capture import ThreadedCapture
 
 try:
     from transformers import AutoImageProcessor, AutoModelForVideoClassification
@@ -34,6 +40,86 @@ except ImportError:
     HAS_OPENCV = False
 
 
+class FrameRingBuffer:
+    """
+    전처리된 프레임 링 버퍼 (T, C, H, W)
+
+    - 프레임은 도착할 때 한 번만 리사이즈/정규화되어 미리 할당된 텐서 슬롯에 기록
+    - 저장소를 2T 길이로 잡고 각 프레임을 i, i+T 두 슬롯에 기록하므로
+      최근 T 프레임은 항상 storage[head:head+T] 연속 구간 → 복사 없는 뷰로 추론
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        size: Tuple[int, int],
+        mean: Sequence[float],
+        std: Sequence[float],
+        rescale: float = 1 / 255,
+        device: str = "cpu"
+    ):
+        """
+        Args:
+            capacity: 버퍼 크기 T
+            size: 프레임 크기 (width, height)
+            mean, std, rescale: 정규화 파라미터 ((x * rescale - mean) / std)
+            device: 버퍼를 둘 디바이스 (cuda면 uint8로 업로드 후 GPU에서 정규화)
+        """
+        width, height = size
+        self.capacity = capacity
+        self.size = size
+        self.storage = torch.empty((2 * capacity, 3, height, width), dtype=torch.float32, device=device)
+
+        mean = torch.tensor(mean, dtype=torch.float32, device=device).view(3, 1, 1)
+        std = torch.tensor(std, dtype=torch.float32, device=device).view(3, 1, 1)
+        # (x * rescale - mean) / std = x * scale + bias
+        self._scale = rescale / std
+        self._bias = -mean / std
+
+        self.count = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_processor(cls, processor, capacity: int, size: Tuple[int, int], device: str = "cpu"):
+        """이미지 프로세서의 정규화 설정을 그대로 사용하는 버퍼 생성"""
+        rescale = processor.rescale_factor if getattr(processor, "do_rescale", True) else 1.0
+        if getattr(processor, "do_normalize", True):
+            mean, std = processor.image_mean, processor.image_std
+        else:
+            mean, std = (0.0, 0.0, 0.0), (1.0, 1.0, 1.0)
+        return cls(capacity, size, mean, std, rescale=rescale, device=device)
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def push(self, frame: np.ndarray):
+        """BGR 프레임을 리사이즈/정규화해 다음 슬롯에 기록"""
+        # 리사이즈 후 색 변환 (픽셀 단위 연산이라 순서를 바꿔도 결과 동일, 연산량은 감소)
+        resized = cv2.resize(frame, self.size)
+        rgb = torch.from_numpy(cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)).permute(2, 0, 1)
+
+        with self.lock:
+            slot = self.count % self.capacity
+            target = self.storage[slot]
+            target.copy_(rgb)
+            target.mul_(self._scale).add_(self._bias)
+            self.storage[slot + self.capacity].copy_(target)
+            self.count += 1
+
+    def view(self) -> Optional["torch.Tensor"]:
+        """최근 T 프레임 (오래된 순), 복사 없는 연속 뷰. 버퍼가 덜 찼으면 None"""
+        if self.count < self.capacity:
+            return None
+        head = self.count % self.capacity
+        return self.storage[head:head + self.capacity]
+
+    def snapshot(self) -> Optional["torch.Tensor"]:
+        """다른 스레드에서 추론할 때 사용할 복사본 (이후 push에 덮어쓰이지 않도록)"""
+        with self.lock:
+            view = self.view()
+            return view.clone() if view is not None else None
+
+
 class RealtimeActionRecognizer:
     """
     실시간 행동 인식 클래스
@@ -50,7 +136,7 @@ class RealtimeActionRecognizer:
         Args:
             model_name: 모델 ID
             buffer_size: 프레임 버퍼 크기
-            skip_frames: N 프레임마다 1개씩 추론 (성능 최적화)
+            skip_frames: 초기 추론 간격 (이후 추론 지연시간에 맞춰 스케줄러가 조정)
             target_size: 프레임 크기 (width, height)
         """
         if not HAS_TRANSFORMERS:
@@ -64,9 +150,6 @@ class RealtimeActionRecognizer:
         self.skip_frames = skip_frames
         self.target_size = target_size
 
-        # 프레임 버퍼 (deque for efficiency)
-        self.frame_buffer: Deque[np.ndarray] = deque(maxlen=buffer_size)
-
         # 디바이스 설정
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"디바이스: {self.device}")
@@ -77,6 +160,12 @@ class RealtimeActionRecognizer:
         self.model = AutoModelForVideoClassification.from_pretrained(model_name)
         self.model.to(self.device)
         self.model.eval()
+        self.num_frames = getattr(self.model.config, 'num_frames', buffer_size)
+
+        # 전처리된 프레임 링 버퍼 (프레임당 1회 정규화, 추론은 복사 없는 뷰 사용)
+        self.frame_buffer = FrameRingBuffer.from_processor(
+            self.processor, buffer_size, target_size, device=self.device
+        )
 
         # 최적화: JIT 컴파일 (PyTorch 2.0+)
         if hasattr(torch, 'compile'):
@@ -95,12 +184,15 @@ class RealtimeActionRecognizer:
         # 성능 측정
         self.fps_history: Deque[float] = deque(maxlen=30)
         self.inference_time_history: Deque[float] = deque(maxlen=30)
+        self.preprocess_time_history: Deque[float] = deque(maxlen=30)
+        self._pending_preprocess = 0.0
 
-        # 비동기 추론 큐
-        self.inference_queue = queue.Queue(maxsize=1)
-        self.result_queue = queue.Queue(maxsize=1)
+        # 비동기 추론: 최신 입력/결과만 유지 (오래된 클립은 쌓지 않고 덮어씀)
+        self.inference_queue = LatestFrameSlot()
+        self.result_queue = LatestFrameSlot()
         self.inference_thread = None
         self.running = False
+        self.scheduler: Optional[AdaptiveInferenceScheduler] = None
 
     def preprocess_frame(self, frame: np.ndarray) -> np.ndarray:
         """
@@ -116,31 +208,38 @@ class RealtimeActionRecognizer:
 
     def add_frame(self, frame: np.ndarray):
         """
-        프레임을 버퍼에 추가합니다.
+        프레임을 전처리해 링 버퍼에 추가합니다.
         """
-        preprocessed = self.preprocess_frame(frame)
-        self.frame_buffer.append(preprocessed)
+        start_time = time.perf_counter()
+        self.frame_buffer.push(frame)
+        self._pending_preprocess += time.perf_counter() - start_time
 
-    def predict(self, top_k: int = 3) -> List[Tuple[str, float]]:
+    def predict(self, top_k: int = 3, clip: Optional["torch.Tensor"] = None) -> List[Tuple[str, float]]:
         """
         현재 버퍼의 프레임으로 행동을 예측합니다.
 
         Args:
             top_k: 상위 K개 예측
+            clip: 전처리된 (T, C, H, W) 텐서 (비동기 모드의 스냅샷, 없으면 버퍼 뷰 사용)
 
         Returns:
             (label, score) 리스트
         """
-        if len(self.frame_buffer) < self.buffer_size:
+        start_time = time.perf_counter()
+        if clip is None:
+            clip = self.frame_buffer.view()
+        if clip is None:
             return []
 
-        # 버퍼에서 균등하게 샘플링
-        indices = np.linspace(0, len(self.frame_buffer) - 1, self.buffer_size, dtype=int)
-        frames = [self.frame_buffer[i] for i in indices]
+        # 모델 입력 프레임 수가 버퍼와 다르면 균등 샘플링 (같으면 복사 없이 그대로 사용)
+        if self.num_frames != len(clip):
+            indices = torch.linspace(0, len(clip) - 1, self.num_frames).long().to(clip.device)
+            clip = clip.index_select(0, indices)
+        inputs = {"pixel_values": clip.unsqueeze(0)}
 
-        # 전처리
-        inputs = self.processor(frames, return_tensors="pt")
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        # 추론 1회당 전처리 시간 = 직전 추론 이후 추가된 프레임들의 전처리 + 입력 준비
+        self.preprocess_time_history.append(self._pending_preprocess + time.perf_counter() - start_time)
+        self._pending_preprocess = 0.0
 
         # 추론
         start_time = time.time()
@@ -177,24 +276,20 @@ class RealtimeActionRecognizer:
         비동기 추론 워커 스레드
         """
         while self.running:
-            try:
-                # 큐에서 프레임 가져오기
-                frames = self.inference_queue.get(timeout=0.1)
-
-                if frames is None:  # 종료 신호
-                    break
-
-                # 추론
-                results = self.predict(top_k=3)
-
-                # 결과 큐에 넣기
-                if not self.result_queue.full():
-                    self.result_queue.put(results)
-
-            except queue.Empty:
+            # 최신 클립 가져오기
+            clip = self.inference_queue.get(timeout=0.1)
+            if clip is None:
                 continue
+
+            start_time = time.perf_counter()
+            try:
+                results = self.predict(top_k=3, clip=clip)
+                self.result_queue.put(results)
             except Exception as e:
                 print(f"추론 오류: {e}")
+            finally:
+                if self.scheduler is not None:
+                    self.scheduler.record_inference(time.perf_counter() - start_time)
 
     def start_async_inference(self):
         """
@@ -210,46 +305,54 @@ class RealtimeActionRecognizer:
         비동기 추론 종료
         """
         self.running = False
-        self.inference_queue.put(None)  # 종료 신호
         if self.inference_thread:
             self.inference_thread.join()
         print("✅ 비동기 추론 종료됨")
 
-    def run(self, async_mode: bool = True):
+    def run(self, async_mode: bool = True, target_fps: float = 30.0, latency_slo_ms: float = 200.0):
         """
         실시간 행동 인식 실행
 
         Args:
             async_mode: 비동기 추론 사용 여부
+            target_fps: 목표 표시 FPS
+            latency_slo_ms: 추론 1회 지연시간 목표 (입력 해상도가 고정이라 간격만 조정)
         """
-        cap = cv2.VideoCapture(0)
+        self.scheduler = AdaptiveInferenceScheduler(
+            target_fps=target_fps,
+            latency_slo_ms=latency_slo_ms,
+            initial_stride=self.skip_frames,
+            max_stride=self.buffer_size,
+            asynchronous=async_mode
+        )
+
+        # 해상도 설정 (낮추면 성능 향상), 디코딩은 백그라운드 스레드
+        cap = ThreadedCapture(0, queue_size=2, policy='drop_oldest', properties={
+            cv2.CAP_PROP_FRAME_WIDTH: 640,
+            cv2.CAP_PROP_FRAME_HEIGHT: 480,
+        })
 
         if not cap.isOpened():
             raise ValueError("웹캠을 열 수 없습니다")
 
-        # 해상도 설정 (낮추면 성능 향상)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-
         print("\n실시간 행동 인식 시작!")
         print("종료: 'q' 키")
         print("일시정지: 'p' 키")
         print(f"버퍼 크기: {self.buffer_size} 프레임")
-        print(f"Skip frames: {self.skip_frames}")
+        print(f"목표 FPS: {target_fps} (초기 추론 간격: {self.skip_frames})")
         print(f"비동기 모드: {async_mode}\n")
 
         if async_mode:
             self.start_async_inference()
 
         frame_count = 0
-        last_inference_frame = 0
         paused = False
 
         while True:
-            ret, frame = cap.read()
-
-            if not ret:
+            captured = cap.next_frame(timeout=5.0)
+            if captured is None:
                 break
+            frame, capture_time = captured.image, captured.timestamp
 
             # FPS 측정
             if len(self.fps_history) > 0:
@@ -263,25 +366,20 @@ class RealtimeActionRecognizer:
             if not paused:
                 self.add_frame(frame)
 
-            # 추론 (skip_frames 간격으로)
-            if not paused and frame_count - last_inference_frame >= self.skip_frames:
-                if len(self.frame_buffer) >= self.buffer_size:
-                    if async_mode:
-                        # 비동기 추론
-                        if self.inference_queue.empty():
-                            self.inference_queue.put(list(self.frame_buffer))
-
-                        # 결과 가져오기
-                        try:
-                            results = self.result_queue.get_nowait()
-                            self.current_prediction = results[0] if results else None
-                        except queue.Empty:
-                            pass
-                    else:
-                        # 동기 추론
-                        results = self.predict(top_k=3)
-
-                last_inference_frame = frame_count
+            # 추론 (간격은 스케줄러가 지연시간에 맞춰 결정, 추론 중이거나 오래된 프레임은 버림)
+            if (not paused and len(self.frame_buffer) >= self.buffer_size
+                    and self.scheduler.should_infer(capture_time)):
+                if async_mode:
+                    self.inference_queue.put(self.frame_buffer.snapshot())
+                else:
+                    with self.scheduler.measure():
+                        self.predict(top_k=3)
+
+            # 비동기 결과 가져오기
+            if async_mode:
+                results = self.result_queue.get_nowait()
+                if results:
+                    self.current_prediction = results[0]
 
             # 시각화
             display_frame = frame.copy()
@@ -302,10 +400,13 @@ class RealtimeActionRecognizer:
 
             # 성능 정보 표시
             avg_inference = np.mean(self.inference_time_history) if self.inference_time_history else 0
+            avg_preprocess = np.mean(self.preprocess_time_history) if self.preprocess_time_history else 0
             info = [
                 f"FPS: {fps:.1f}",
                 f"Buffer: {len(self.frame_buffer)}/{self.buffer_size}",
-                f"Inference: {avg_inference*1000:.0f}ms"
+                f"Inference: {avg_inference*1000:.0f}ms",
+                f"Preprocess: {avg_preprocess*1000:.1f}ms",
+                f"Stride: {self.scheduler.stride} (dropped {self.scheduler.metrics.summary()['dropped']})"
             ]
 
             for i, text in enumerate(info):
@@ -341,6 +442,7 @@ class RealtimeActionRecognizer:
                 paused = not paused
 
             frame_count += 1
+            self.scheduler.frame_done()
 
         # 정리
         if async_mode:
@@ -352,6 +454,70 @@ class RealtimeActionRecognizer:
         print(f"\n✅ 총 {frame_count} 프레임 처리됨")
         if self.inference_time_history:
             print(f"평균 추론 시간: {np.mean(self.inference_time_history)*1000:.1f}ms")
+        if self.preprocess_time_history:
+            print(f"평균 전처리 시간 (추론 1회당): {np.mean(self.preprocess_time_history)*1000:.1f}ms")
+        summary = self.scheduler.metrics.summary()
+        print(f"추론 {summary['inferences']}회 / 건너뜀 {summary['skipped']} / 버림 {summary['dropped']} "
+              f"(지연시간 p90 {summary['latency_p90_ms']:.0f}ms, 최종 간격 {summary['stride']})")
+
+
+def benchmark_preprocessing(
+    processor,
+    buffer_size: int = 16,
+    skip_frames: int = 2,
+    iterations: int = 30,
+    target_size: Tuple[int, int] = (224, 224),
+    frame_size: Tuple[int, int] = (640, 480)
+) -> dict:
+    """
+    추론 1회당 전처리 시간 비교 (웹캠 없이 합성 프레임 사용)
+
+    - 기존: 프레임마다 RGB 변환/리사이즈 → 추론마다 버퍼 전체를 processor로 다시 정규화
+    - 링 버퍼: 프레임마다 한 번 정규화 → 추론은 뷰만 사용
+
+    Returns:
+        {'before_ms', 'after_ms', 'speedup', 'max_abs_diff'}
+    """
+    rng = np.random.default_rng(0)
+    width, height = frame_size
+    frames = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+              for _ in range(buffer_size + skip_frames * iterations)]
+
+    def legacy_preprocess(frame):
+        return cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), target_size)
+
+    # 기존 방식
+    legacy_buffer: Deque[np.ndarray] = deque(maxlen=buffer_size)
+    for frame in frames[:buffer_size]:
+        legacy_buffer.append(legacy_preprocess(frame))
+    before = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        for frame in frames[buffer_size + i * skip_frames: buffer_size + (i + 1) * skip_frames]:
+            legacy_buffer.append(legacy_preprocess(frame))
+        legacy_inputs = processor(list(legacy_buffer), return_tensors="pt")["pixel_values"]
+        before.append(time.perf_counter() - start)
+
+    # 링 버퍼
+    ring = FrameRingBuffer.from_processor(processor, buffer_size, target_size)
+    for frame in frames[:buffer_size]:
+        ring.push(frame)
+    after = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        for frame in frames[buffer_size + i * skip_frames: buffer_size + (i + 1) * skip_frames]:
+            ring.push(frame)
+        ring_inputs = ring.view().unsqueeze(0)
+        after.append(time.perf_counter() - start)
+
+    before_ms = float(np.median(before) * 1000)
+    after_ms = float(np.median(after) * 1000)
+    return {
+        'before_ms': before_ms,
+        'after_ms': after_ms,
+        'speedup': before_ms / after_ms if after_ms else float('inf'),
+        'max_abs_diff': float((legacy_inputs - ring_inputs).abs().max()),
+    }
 
 
 def main():
@@ -362,12 +528,27 @@ def main():
     parser.add_argument("--buffer-size", type=int, default=16,
                        help="프레임 버퍼 크기")
     parser.add_argument("--skip-frames", type=int, default=2,
-                       help="N 프레임마다 추론")
+                       help="초기 추론 간격 (이후 지연시간에 맞춰 자동 조정)")
+    parser.add_argument("--target-fps", type=float, default=30.0,
+                       help="목표 표시 FPS")
+    parser.add_argument("--latency-slo", type=float, default=200.0,
+                       help="추론 지연시간 목표 (ms)")
     parser.add_argument("--sync", action="store_true",
                        help="동기 모드 사용 (기본: 비동기)")
+    parser.add_argument("--benchmark-preprocess", action="store_true",
+                       help="웹캠 없이 추론 1회당 전처리 시간 비교 (기존 processor vs 링 버퍼)")
 
     args = parser.parse_args()
 
+    if args.benchmark_preprocess:
+        processor = AutoImageProcessor.from_pretrained(args.model)
+        result = benchmark_preprocessing(processor, args.buffer_size, args.skip_frames)
+        print(f"추론 1회당 전처리 (buffer={args.buffer_size}, skip={args.skip_frames})")
+        print(f"  기존 (processor 전체 재정규화): {result['before_ms']:.2f}ms")
+        print(f"  링 버퍼 (프레임당 1회 정규화):   {result['after_ms']:.2f}ms ({result['speedup']:.1f}x)")
+        print(f"  입력 텐서 최대 차이: {result['max_abs_diff']:.2e}")
+        return
+
     try:
         recognizer = RealtimeActionRecognizer(
             model_name=args.model,
@@ -375,7 +556,8 @@ def main():
             skip_frames=args.skip_frames
         )
 
-        recognizer.run(async_mode=not args.sync)
+        recognizer.run(async_mode=not args.sync, target_fps=args.target_fps,
+                       latency_slo_ms=args.latency_slo)
 
     except Exception as e:
         print(f"❌ 오류: {e}")
@@ -0,0 +1,358 @@
+"""
+ControlNet 서비스
+ControlNet 파이프라인을 상주시키고 조건 이미지(Canny, Depth, Pose) 전처리 결과를 캐시합니다.
+
+- 전처리 캐시: (이미지 해시, 전처리기, 파라미터) → 조건 맵 (LRU)
+- 배치 전처리: 캐시에 없는 이미지만 스레드 풀에서 병렬 처리 (cv2/mediapipe는 GIL 해제),
+  Depth는 depth-estimation 파이프라인 한 번에 배치 추론
+- 파이프라인: 기본 SD 파이프라인(DiffusionPipelinePool)의 UNet/VAE/텍스트 인코더를 from_pipe로 공유하고
+  ControlNet 가중치만 추가 로드. 여러 ControlNet을 쌓아도 UNet은 하나 (MultiControlNetModel)
+
+사용 예:
+    service = get_controlnet_service()
+    edges = service.preprocess([image], 'canny', low_threshold=100, high_threshold=200)[0]
+    images, timings = service.generate('a colorful bird', [image], controlnets=('canny',), seed=42)
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image
+
+from .diffusion_helpers import CPUProfile, DiffusionPipelinePool, default_device, default_dtype, get_pipeline_pool
+
+BASE_MODEL_ID = 'runwayml/stable-diffusion-v1-5'
+CONTROLNET_MODELS = {
+    'canny': 'lllyasviel/sd-controlnet-canny',
+    'depth': 'lllyasviel/sd-controlnet-depth',
+    'pose': 'lllyasviel/sd-controlnet-openpose',
+}
+DEPTH_MODEL_ID = 'Intel/dpt-hybrid-midas'
+CONDITION_CACHE_SIZE = 128
+# (기본 파이프라인, ControlNet 조합)별 from_pipe 파이프라인 수
+PIPELINE_CACHE_SIZE = 4
+
+# OpenPose 18 관절 순서에 대응하는 MediaPipe Pose 랜드마크 (neck은 양 어깨 중점)
+_OPENPOSE_FROM_MEDIAPIPE = [0, None, 12, 14, 16, 11, 13, 15, 24, 26, 28, 23, 25, 27, 5, 2, 8, 7]
+_OPENPOSE_LIMBS = [
+    (1, 2), (1, 5), (2, 3), (3, 4), (5, 6), (6, 7), (1, 8), (8, 9), (9, 10),
+    (1, 11), (11, 12), (12, 13), (1, 0), (0, 14), (14, 16), (0, 15), (15, 17),
+]
+_OPENPOSE_COLORS = [
+    (255, 0, 0), (255, 85, 0), (255, 170, 0), (255, 255, 0), (170, 255, 0), (85, 255, 0),
+    (0, 255, 0), (0, 255, 85), (0, 255, 170), (0, 255, 255), (0, 170, 255), (0, 85, 255),
+    (0, 0, 255), (85, 0, 255), (170, 0, 255), (255, 0, 255), (255, 0, 170), (255, 0, 85),
+]
+
+ImageInput = Union[Image.Image, np.ndarray]
+
+
+def _to_rgb_array(image: ImageInput) -> np.ndarray:
+    if isinstance(image, Image.Image):
+        return np.asarray(image.convert('RGB'))
+    return np.ascontiguousarray(image)
+
+
+def image_hash(image: np.ndarray) -> str:
+    digest = hashlib.blake2b(str(image.shape).encode(), digest_size=16)
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def canny_map(image: np.ndarray, low_threshold: int = 100, high_threshold: int = 200) -> np.ndarray:
+    """Canny 윤곽선 (H, W, 3) uint8"""
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    edges = cv2.Canny(gray, low_threshold, high_threshold)
+    return cv2.cvtColor(edges, cv2.COLOR_GRAY2RGB)
+
+
+_pose_local = threading.local()
+
+
+def pose_map(image: np.ndarray, min_detection_confidence: float = 0.5, line_width: int = 4) -> np.ndarray:
+    """
+    MediaPipe Pose → OpenPose 스타일 골격 이미지 (검은 배경, sd-controlnet-openpose 입력 형식)
+    MediaPipe Pose 객체는 스레드 간 공유가 안전하지 않으므로 스레드별로 생성
+    """
+    import mediapipe as mp
+
+    detector = getattr(_pose_local, 'detector', None)
+    if detector is None or _pose_local.confidence != min_detection_confidence:
+        detector = mp.solutions.pose.Pose(static_image_mode=True,
+                                          min_detection_confidence=min_detection_confidence)
+        _pose_local.detector, _pose_local.confidence = detector, min_detection_confidence
+
+    height, width = image.shape[:2]
+    canvas = np.zeros_like(image)
+    result = detector.process(image)
+    if result.pose_landmarks is None:
+        return canvas
+
+    landmarks = result.pose_landmarks.landmark
+    points = []
+    for index in _OPENPOSE_FROM_MEDIAPIPE:
+        if index is None:
+            left, right = landmarks[11], landmarks[12]
+            points.append(((left.x + right.x) / 2 * width, (left.y + right.y) / 2 * height,
+                           min(left.visibility, right.visibility)))
+        else:
+            lm = landmarks[index]
+            points.append((lm.x * width, lm.y * height, lm.visibility))
+
+    for (a, b), color in zip(_OPENPOSE_LIMBS, _OPENPOSE_COLORS):
+        if points[a][2] > 0.3 and points[b][2] > 0.3:
+            cv2.line(canvas, (int(points[a][0]), int(points[a][1])),
+                     (int(points[b][0]), int(points[b][1])), color, line_width)
+    for (x, y, visibility), color in zip(points, _OPENPOSE_COLORS):
+        if visibility > 0.3:
+            cv2.circle(canvas, (int(x), int(y)), line_width, color, -1)
+    return canvas
+
+
+class ControlNetService:
+    """
+    ControlNet 파이프라인 + 조건 맵 캐시
+
+    Args:
+        pool: 기본 SD 파이프라인을 빌려올 파이프라인 풀 (기본: 프로세스 전역 풀)
+        max_workers: 전처리 스레드 수
+    """
+
+    def __init__(self, pool: Optional[DiffusionPipelinePool] = None, max_workers: int = 4):
+        self.pool = pool or get_pipeline_pool()
+        self.registry = self.pool.registry
+        self.max_workers = max_workers
+        self._conditions: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._conditions_lock = threading.Lock()
+        self._pipelines: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._pipelines_lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    # ------------------------------------------------------------------
+    # 전처리
+    # ------------------------------------------------------------------
+    def _depth_maps(self, images: List[np.ndarray]) -> List[np.ndarray]:
+        """depth-estimation 파이프라인으로 배치 추론 → (H, W, 3) uint8"""
+        from transformers import pipeline
+
+        device = 0 if torch.cuda.is_available() else -1
+        estimator = self.registry.get_or_load(
+            f"depth-estimation:{DEPTH_MODEL_ID}:{device}",
+            lambda: pipeline('depth-estimation', model=DEPTH_MODEL_ID, device=device)
+        )
+        outputs = estimator([Image.fromarray(image) for image in images], batch_size=len(images))
+        maps = []
+        for image, output in zip(images, outputs):
+            depth = np.asarray(output['depth'].resize(image.shape[1::-1]), dtype=np.uint8)
+            maps.append(np.repeat(depth[..., None], 3, axis=2))
+        return maps
+
+    def preprocess(self, images: Sequence[ImageInput], preprocessor: str, **params) -> List[np.ndarray]:
+        """
+        조건 맵 배치 계산 (캐시 우선)
+
+        Args:
+            preprocessor: 'canny' | 'depth' | 'pose'
+            params: 전처리 파라미터 (canny: low_threshold/high_threshold, pose: min_detection_confidence)
+
+        Returns:
+            이미지별 (H, W, 3) uint8 조건 맵
+        """
+        if preprocessor not in CONTROLNET_MODELS:
+            raise ValueError(f"지원하지 않는 전처리기: {preprocessor} (사용 가능: {list(CONTROLNET_MODELS)})")
+
+        arrays = [_to_rgb_array(image) for image in images]
+        param_key = tuple(sorted(params.items()))
+        keys = [(image_hash(array), preprocessor, param_key) for array in arrays]
+
+        results: List[Optional[np.ndarray]] = [None] * len(arrays)
+        missing = []
+        with self._conditions_lock:
+            for i, key in enumerate(keys):
+                if key in self._conditions:
+                    self._conditions.move_to_end(key)
+                    results[i] = self._conditions[key]
+                    self.stats['hits'] += 1
+                else:
+                    missing.append(i)
+                    self.stats['misses'] += 1
+
+        if missing:
+            todo = [arrays[i] for i in missing]
+            if preprocessor == 'depth':
+                computed = self._depth_maps(todo)
+            else:
+                fn = canny_map if preprocessor == 'canny' else pose_map
+                if len(todo) == 1:
+                    computed = [fn(todo[0], **params)]
+                else:
+                    with ThreadPoolExecutor(max_workers=min(self.max_workers, len(todo))) as executor:
+                        computed = list(executor.map(lambda image: fn(image, **params), todo))
+
+            with self._conditions_lock:
+                for i, condition in zip(missing, computed):
+                    condition.flags.writeable = False
+                    self._conditions[keys[i]] = condition
+                    results[i] = condition
+                while len(self._conditions) > CONDITION_CACHE_SIZE:
+                    self._conditions.popitem(last=False)
+
+        return results
+
+    def clear_cache(self):
+        with self._conditions_lock:
+            self._conditions.clear()
+
+    # ------------------------------------------------------------------
+    # 파이프라인
+    # ------------------------------------------------------------------
+    @staticmethod
+    def controlnet_key(model_id: str, dtype: torch.dtype, device: str) -> str:
+        return f"controlnet:{model_id}:{str(dtype).replace('torch.', '')}:{device}"
+
+    def _controlnet(self, model_id: str, dtype: torch.dtype, device: str):
+        def loader():
+            from diffusers import ControlNetModel
+            return ControlNetModel.from_pretrained(model_id, torch_dtype=dtype).to(device)
+
+        return self.registry.get_or_load(self.controlnet_key(model_id, dtype, device), loader)
+
+    def get_pipeline(self, controlnets: Sequence[str] = ('canny',), base_model_id: str = BASE_MODEL_ID,
+                     dtype: Optional[torch.dtype] = None, device: Optional[str] = None,
+                     profile: Optional[CPUProfile] = None,
+                     controlnet_ids: Optional[Dict[str, str]] = None) -> Tuple[Any, str, float]:
+        """
+        ControlNet 파이프라인 반환 (기본 파이프라인의 UNet/VAE/텍스트 인코더 공유)
+
+        Returns:
+            (pipeline, 기본 파이프라인 pool_key, load_seconds)
+        """
+        from diffusers import StableDiffusionControlNetPipeline
+
+        device = device or default_device()
+        dtype = dtype or default_dtype(device)
+        controlnet_ids = {**CONTROLNET_MODELS, **(controlnet_ids or {})}
+
+        start = time.perf_counter()
+        # ControlNet을 먼저 로드하고 기본 파이프라인을 마지막에 가져와,
+        # ControlNet 로드가 방금 가져온 기본 파이프라인을 예산 초과로 밀어내지 않도록 함
+        controlnet_keys = [self.controlnet_key(controlnet_ids[name], dtype, device) for name in controlnets]
+        models = [self._controlnet(controlnet_ids[name], dtype, device) for name in controlnets]
+        with self.registry.hold(*controlnet_keys):
+            base, key, _ = self.pool.get(base_model_id, dtype, device, profile=profile)
+
+        cache_key = (key, tuple(controlnet_ids[name] for name in controlnets))
+        with self._pipelines_lock:
+            # 레지스트리에서 제거된 모델을 참조하는 파이프라인은 버림 (메모리를 붙잡지 않도록)
+            for stale in [k for k, p in self._pipelines.items() if k[0] not in self.registry]:
+                del self._pipelines[stale]
+            pipe = self._pipelines.get(cache_key)
+            # 기본 파이프라인이 제거 후 다시 로드되었거나 ControlNet이 교체되었으면 재구성
+            if (pipe is None or pipe.unet is not base.unet
+                    or list(getattr(pipe.controlnet, 'nets', [pipe.controlnet])) != models):
+                # 리스트로 넘기면 파이프라인이 MultiControlNetModel로 묶음
+                controlnet = models[0] if len(models) == 1 else models
+                pipe = StableDiffusionControlNetPipeline.from_pipe(base, controlnet=controlnet)
+                pipe.set_progress_bar_config(disable=True)
+                self._pipelines[cache_key] = pipe
+            self._pipelines.move_to_end(cache_key)
+            while len(self._pipelines) > PIPELINE_CACHE_SIZE:
+                self._pipelines.popitem(last=False)
+        return pipe, key, time.perf_counter() - start
+
+    def generate(self, prompt: str, condition_images: Sequence[ImageInput],
+                 controlnets: Sequence[str] = ('canny',), negative_prompt: Optional[str] = None,
+                 conditioning_scale: Union[float, Sequence[float]] = 1.0,
+                 preprocess_params: Optional[Dict[str, Dict[str, Any]]] = None,
+                 steps: int = 30, guidance_scale: float = 7.5, seed: Optional[int] = None,
+                 scheduler: Optional[str] = None, base_model_id: str = BASE_MODEL_ID,
+                 dtype: Optional[torch.dtype] = None, device: Optional[str] = None,
+                 profile: Optional[CPUProfile] = None) -> Tuple[List[Image.Image], Dict[str, Any]]:
+        """
+        조건 이미지로 생성
+
+        Args:
+            condition_images: ControlNet별 원본 이미지 (controlnets와 같은 길이, 전처리는 서비스가 수행)
+            conditioning_scale: ControlNet별 조건 강도 (하나면 모두 동일)
+            preprocess_params: {'canny': {'low_threshold': 100, ...}, ...}
+
+        Returns:
+            (images, timings) - timings: load_s / preprocess_s / encode_s / generate_s / total_s / conditions
+        """
+        if len(condition_images) != len(controlnets):
+            raise ValueError("condition_images와 controlnets의 길이가 같아야 합니다.")
+        preprocess_params = preprocess_params or {}
+
+        device = device or default_device()
+        dtype = dtype or default_dtype(device)
+        # 전처리(Depth 추정 모델 로드 포함)를 먼저 끝내고 파이프라인을 가져와,
+        # 전처리 모델 로드가 방금 가져온 파이프라인을 예산 초과로 밀어내지 않도록 함
+        start = t0 = time.perf_counter()
+        conditions = [
+            self.preprocess([image], name, **preprocess_params.get(name, {}))[0]
+            for image, name in zip(condition_images, controlnets)
+        ]
+        t1 = time.perf_counter()
+        pipe, key, load_s = self.get_pipeline(controlnets, base_model_id, dtype, device, profile)
+        # 생성하는 동안 기본 파이프라인/ControlNet이 다른 세션의 로드로 제거되지 않도록 잡아 둠
+        held = [key] + [self.controlnet_key(CONTROLNET_MODELS[name], dtype, device) for name in controlnets]
+        loaded = time.perf_counter()
+
+        if isinstance(conditioning_scale, (int, float)):
+            conditioning_scale = [float(conditioning_scale)] * len(controlnets)
+        condition_input = [Image.fromarray(c) for c in conditions]
+
+        with self.registry.hold(*held), self.pool.lock(key), \
+                (profile.runtime() if profile else nullcontext()):
+            if scheduler:
+                self.pool.set_scheduler(pipe, key, scheduler)
+            prompt_embeds, negative_embeds, _ = self.pool.encode_prompt(
+                pipe, key, prompt, negative_prompt, guidance_scale
+            )
+            t2 = time.perf_counter()
+            generator = None
+            if seed is not None:
+                generator = torch.Generator(device=pipe.device.type).manual_seed(int(seed))
+            height, width = conditions[0].shape[:2]
+            images = pipe(
+                prompt_embeds=prompt_embeds,
+                negative_prompt_embeds=negative_embeds,
+                image=condition_input[0] if len(controlnets) == 1 else condition_input,
+                controlnet_conditioning_scale=(conditioning_scale[0] if len(controlnets) == 1
+                                               else conditioning_scale),
+                num_inference_steps=int(steps),
+                guidance_scale=float(guidance_scale),
+                generator=generator,
+                height=height - height % 8,
+                width=width - width % 8,
+            ).images
+            t3 = time.perf_counter()
+
+        timings = {
+            'load_s': load_s,
+            'preprocess_s': t1 - t0,
+            'encode_s': t2 - loaded,
+            'generate_s': t3 - t2,
+            'total_s': t3 - start,
+            'conditions': [Image.fromarray(c) for c in conditions],
+        }
+        return images, timings
+
+
+_service: Optional[ControlNetService] = None
+
+
+def get_controlnet_service() -> ControlNetService:
+    """프로세스 전역 ControlNet 서비스 반환"""
+    global _service
+    if _service is None:
+        _service = ControlNetService()
+    return _service
@@ -0,0 +1,506 @@
+"""
+Stable Diffusion 파이프라인 풀
+한 번 로드한 파이프라인을 프로세스 전역에 상주시켜 시드/스케줄러만 바꿀 때 가중치를 다시 읽지 않습니다.
+
+- 키: (model_id, dtype, device) → 디퓨전 전용 레지스트리(메모리 예산 LRU)에 등록
+  (HF 분류기 등이 쓰는 공용 레지스트리와 예산을 나눠, 다른 모델 로드로 파이프라인이 밀려나지 않음)
+- 스케줄러 교체: 상주 파이프라인의 scheduler만 from_config로 교체 (UNet/VAE/텍스트 인코더는 그대로)
+- 로드 시간과 생성 시간을 따로 기록 (텍스트 인코딩 / 스텝당 / 디노이징 / VAE 디코딩)
+- 프롬프트 임베딩 캐시 + 여러 시드를 한 배치로 생성 (generate_seeds)
+- CPU 프로필: SDPA/attention slicing, channels-last, bf16 autocast, tiny/tiled VAE, 스레드 수
+- 빠른 미리보기: sd-turbo 1~4 스텝
+
+사용 예:
+    pool = get_pipeline_pool()
+    images, timings = pool.generate('runwayml/stable-diffusion-v1-5', 'a cat', scheduler='DDIM', seed=42)
+    print(timings)  # {'load_s': ..., 'scheduler_s': ..., 'generate_s': ..., 'step_s': ...}
+
+    images, timings = pool.preview('a cat', steps=2, profile=CPUProfile())
+    images, timings = pool.generate_seeds(model_id, 'a cat', seeds=range(8), negative_prompt='blurry')
+"""
+
+import gc
+import os
+import statistics
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import torch
+from PIL import Image
+
+from core.model_registry import ModelRegistry
+
+# UI 이름 → diffusers 스케줄러 클래스 이름
+SCHEDULERS = {
+    'DPMSolverMultistep': 'DPMSolverMultistepScheduler',
+    'DDIM': 'DDIMScheduler',
+    'Euler': 'EulerDiscreteScheduler',
+    'EulerAncestral': 'EulerAncestralDiscreteScheduler',
+}
+
+
+PREVIEW_MODEL_ID = 'stabilityai/sd-turbo'
+TINY_VAE_ID = 'madebyollin/taesd'
+RESOLUTIONS = (512, 640, 768)
+# (pool_key, prompt, negative, CFG 여부) 단위 텍스트 임베딩 캐시 크기
+PROMPT_EMBED_CACHE_SIZE = 64
+# 디퓨전 레지스트리 기본 예산: 물리 메모리 대비 비율 (DIFFUSION_CACHE_BUDGET_MB로 직접 지정 가능)
+DIFFUSION_BUDGET_RAM_FRACTION = 0.6
+
+
+def default_device() -> str:
+    return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+
+def default_dtype(device: str) -> torch.dtype:
+    return torch.float16 if device.startswith('cuda') else torch.float32
+
+
+def scheduler_class(name: str):
+    """UI 스케줄러 이름 또는 diffusers 클래스 이름 → 스케줄러 클래스"""
+    import diffusers
+    return getattr(diffusers, SCHEDULERS.get(name, name))
+
+
+def cpu_supports_bf16() -> bool:
+    """CPU가 bf16 연산(AVX512-BF16/AMX)을 지원하는지"""
+    try:
+        return torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    except Exception:
+        return False
+
+
+def physical_cores() -> int:
+    """물리 코어 수 (하이퍼스레딩 제외, psutil이 없으면 논리 코어 수)"""
+    try:
+        import psutil
+        return psutil.cpu_count(logical=False) or os.cpu_count() or 1
+    except ImportError:
+        return os.cpu_count() or 1
+
+
+# torch.set_num_threads는 프로세스 전역이므로 동시에 실행 중인 runtime()들이 공유
+# (처음 들어온 구간이 스레드 수를 정하고, 마지막 구간이 끝날 때 원래 값으로 복원)
+_threads_lock = threading.Lock()
+_threads_users = 0
+_threads_saved = 0
+
+
+def _acquire_threads(threads: int):
+    global _threads_users, _threads_saved
+    with _threads_lock:
+        if _threads_users == 0:
+            _threads_saved = torch.get_num_threads()
+            torch.set_num_threads(threads)
+        _threads_users += 1
+
+
+def _release_threads():
+    global _threads_users
+    with _threads_lock:
+        _threads_users -= 1
+        if _threads_users == 0:
+            torch.set_num_threads(_threads_saved)
+
+
+@dataclass(frozen=True)
+class CPUProfile:
+    """
+    CPU 전용 노드용 실행 설정
+
+    Args:
+        attention: 'sdpa'(torch scaled_dot_product_attention) 또는 'slicing'(메모리 절약, 대체로 더 느림)
+        channels_last: UNet/VAE를 channels-last 메모리 형식으로 변환 (oneDNN 컨볼루션에 유리)
+        bf16: bf16 autocast 사용 여부 (None이면 CPU 지원 시 자동 사용)
+        tiny_vae: 디코더를 경량 VAE(TAESD 등)로 교체할 모델 ID (None이면 원본 VAE)
+        vae_tiling: VAE를 타일 단위로 디코딩 (고해상도에서 최대 메모리 감소)
+        threads: torch.set_num_threads 값 (None이면 물리 코어 수)
+    """
+    attention: str = 'sdpa'
+    channels_last: bool = True
+    bf16: Optional[bool] = None
+    tiny_vae: Optional[str] = None
+    vae_tiling: bool = False
+    threads: Optional[int] = None
+
+    @property
+    def use_bf16(self) -> bool:
+        return cpu_supports_bf16() if self.bf16 is None else self.bf16
+
+    @property
+    def name(self) -> str:
+        """풀 키에 쓰는 프로필 식별자 (파이프라인 구조를 바꾸는 설정만 포함)"""
+        parts = ['cpu', self.attention]
+        if self.channels_last:
+            parts.append('cl')
+        if self.tiny_vae:
+            parts.append(self.tiny_vae.split('/')[-1])
+        if self.vae_tiling:
+            parts.append('tiled')
+        return '-'.join(parts)
+
+    def apply(self, pipe):
+        """로드된 파이프라인에 적용 (풀에서 최초 로드 시 1회)"""
+        if self.attention == 'slicing':
+            pipe.enable_attention_slicing()
+        else:
+            from diffusers.models.attention_processor import AttnProcessor2_0
+            pipe.unet.set_attn_processor(AttnProcessor2_0())
+
+        if self.tiny_vae:
+            from diffusers import AutoencoderTiny
+            pipe.vae = AutoencoderTiny.from_pretrained(self.tiny_vae, torch_dtype=pipe.unet.dtype).to(pipe.device)
+        if self.vae_tiling:
+            pipe.vae.enable_tiling()
+
+        if self.channels_last:
+            pipe.unet.to(memory_format=torch.channels_last)
+            pipe.vae.to(memory_format=torch.channels_last)
+        return pipe
+
+    @contextmanager
+    def runtime(self):
+        """
+        생성 구간에만 적용되는 설정 (스레드 수, bf16 autocast)
+        여러 스레드에서 겹쳐 실행되면 스레드 수는 전역 잠금 아래에서 한 번만 바꾸고 마지막에 복원
+        """
+        _acquire_threads(self.threads or physical_cores())
+        try:
+            with torch.autocast('cpu', dtype=torch.bfloat16, enabled=self.use_bf16):
+                yield
+        finally:
+            _release_threads()
+
+
+def default_chunk_size(device_type: str) -> int:
+    """한 번에 디노이징할 시드 수 기본값 (메모리 부족 시 generate_seeds가 자동으로 절반씩 줄임)"""
+    return 8 if device_type == 'cuda' else 4
+
+
+def _is_out_of_memory(error: RuntimeError) -> bool:
+    message = str(error).lower()
+    return 'out of memory' in message or "can't allocate memory" in message
+
+
+class _StepTimer:
+    """callback_on_step_end로 스텝 종료 시각 기록"""
+
+    def __init__(self):
+        self.ends: List[float] = []
+
+    def __call__(self, pipe, step, timestep, callback_kwargs):
+        self.ends.append(time.perf_counter())
+        return callback_kwargs
+
+    def summary(self, start: float) -> Dict[str, float]:
+        if not self.ends:
+            return {}
+        steps = [b - a for a, b in zip(self.ends, self.ends[1:])]
+        step_s = statistics.median(steps) if steps else self.ends[0] - start
+        return {
+            'steps': len(self.ends),
+            'step_s': step_s,
+            'denoise_s': self.ends[-1] - start,
+        }
+
+
+def total_memory_bytes() -> int:
+    """물리 메모리 크기 (psutil이 없으면 sysconf, 둘 다 없으면 16GB로 가정)"""
+    try:
+        import psutil
+        return int(psutil.virtual_memory().total)
+    except ImportError:
+        try:
+            return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+        except (AttributeError, ValueError, OSError):
+            return 16 * 2**30
+
+
+_diffusion_registry: Optional[ModelRegistry] = None
+
+
+def get_diffusion_registry() -> ModelRegistry:
+    """
+    디퓨전 파이프라인/ControlNet 전용 레지스트리
+
+    fp32 SD-1.5(세이프티 체커 포함 약 5GB)만으로도 공용 레지스트리 기본 예산(4GB)을 넘으므로
+    예산을 따로 둡니다. DIFFUSION_CACHE_BUDGET_MB가 없으면 물리 메모리의 60%.
+    """
+    global _diffusion_registry
+    if _diffusion_registry is None:
+        budget_mb = os.environ.get('DIFFUSION_CACHE_BUDGET_MB')
+        budget = (int(float(budget_mb) * 2**20) if budget_mb
+                  else int(total_memory_bytes() * DIFFUSION_BUDGET_RAM_FRACTION))
+        _diffusion_registry = ModelRegistry(budget)
+    return _diffusion_registry
+
+
+class DiffusionPipelinePool:
+    """
+    상주 Stable Diffusion 파이프라인 풀
+
+    Args:
+        registry: 파이프라인을 등록할 모델 레지스트리 (기본: get_diffusion_registry())
+    """
+
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        self.registry = registry or get_diffusion_registry()
+        self._scheduler_configs: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._prompt_embeds: "OrderedDict[Tuple, Tuple[torch.Tensor, Optional[torch.Tensor]]]" = OrderedDict()
+        self._embeds_lock = threading.Lock()
+
+    @staticmethod
+    def pool_key(model_id: str, dtype: torch.dtype, device: str,
+                 profile: Optional[CPUProfile] = None) -> str:
+        key = f"diffusion:{model_id}:{str(dtype).replace('torch.', '')}:{device}"
+        return f"{key}:{profile.name}" if profile else key
+
+    def lock(self, key: str) -> threading.Lock:
+        # 상주 파이프라인의 스케줄러는 공유 상태이므로 키별로 생성 구간을 직렬화
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, model_id: str, dtype: Optional[torch.dtype] = None, device: Optional[str] = None,
+            pipeline_cls=None, profile: Optional[CPUProfile] = None, **load_kwargs) -> Tuple[Any, str, float]:
+        """
+        파이프라인 반환 (없으면 로드)
+
+        profile을 지정하면 로드 직후 적용하며, 프로필별로 별도 파이프라인이 상주
+
+        Returns:
+            (pipeline, pool_key, load_seconds) - 이미 상주 중이면 load_seconds ≈ 0
+        """
+        device = device or default_device()
+        dtype = dtype or default_dtype(device)
+        key = self.pool_key(model_id, dtype, device, profile)
+
+        def loader():
+            cls = pipeline_cls
+            if cls is None:
+                from diffusers import StableDiffusionPipeline
+                cls = StableDiffusionPipeline
+            pipe = cls.from_pretrained(model_id, torch_dtype=dtype, **load_kwargs).to(device)
+            pipe.set_progress_bar_config(disable=True)
+            if profile is not None:
+                profile.apply(pipe)
+            # 스케줄러를 여러 번 교체해도 항상 원본 설정에서 생성
+            self._scheduler_configs[key] = pipe.scheduler.config
+            return pipe
+
+        start = time.perf_counter()
+        pipe = self.registry.get_or_load(key, loader)
+        return pipe, key, time.perf_counter() - start
+
+    def set_scheduler(self, pipe, key: str, name: str):
+        """상주 파이프라인의 스케줄러만 교체 (같은 종류면 그대로 사용)"""
+        cls = scheduler_class(name)
+        if type(pipe.scheduler) is not cls:
+            pipe.scheduler = cls.from_config(self._scheduler_configs.get(key, pipe.scheduler.config))
+
+    def encode_prompt(self, pipe, key: str, prompt: str, negative_prompt: Optional[str],
+                      guidance_scale: float) -> Tuple[torch.Tensor, Optional[torch.Tensor], bool]:
+        """
+        (prompt, negative) CLIP 임베딩 (캐시 사용)
+
+        Returns:
+            (prompt_embeds, negative_prompt_embeds, cache_hit) - 각 (1, 77, D)
+        """
+        do_cfg = guidance_scale > 1.0
+        cache_key = (key, prompt, negative_prompt or '', do_cfg)
+        with self._embeds_lock:
+            if cache_key in self._prompt_embeds:
+                self._prompt_embeds.move_to_end(cache_key)
+                return (*self._prompt_embeds[cache_key], True)
+
+        with torch.no_grad():
+            prompt_embeds, negative_embeds = pipe.encode_prompt(
+                prompt, pipe._execution_device, 1, do_cfg, negative_prompt or None
+            )
+
+        with self._embeds_lock:
+            self._prompt_embeds[cache_key] = (prompt_embeds, negative_embeds)
+            while len(self._prompt_embeds) > PROMPT_EMBED_CACHE_SIZE:
+                self._prompt_embeds.popitem(last=False)
+        return prompt_embeds, negative_embeds, False
+
+    @staticmethod
+    def decode_latents(pipe, latents: torch.Tensor) -> List[Image.Image]:
+        """VAE 디코딩 + 안전 필터 + PIL 변환 (파이프라인 후처리와 동일)"""
+        with torch.no_grad():
+            image = pipe.vae.decode(latents / pipe.vae.config.scaling_factor, return_dict=False)[0]
+            image, has_nsfw = pipe.run_safety_checker(image, pipe._execution_device, latents.dtype)
+        do_denormalize = [True] * image.shape[0] if has_nsfw is None else [not flag for flag in has_nsfw]
+        return pipe.image_processor.postprocess(image, output_type='pil', do_denormalize=do_denormalize)
+
+    def generate_seeds(self, model_id: str, prompt: str, seeds: Sequence[Optional[int]],
+                       negative_prompt: Optional[str] = None, scheduler: Optional[str] = None,
+                       steps: int = 25, guidance_scale: float = 7.0, width: int = 512, height: int = 512,
+                       chunk_size: Optional[int] = None, dtype: Optional[torch.dtype] = None,
+                       device: Optional[str] = None, profile: Optional[CPUProfile] = None,
+                       **pipe_kwargs) -> Tuple[List[Image.Image], Dict[str, Any]]:
+        """
+        같은 프롬프트로 여러 시드를 배치 생성
+
+        프롬프트는 한 번만 인코딩(캐시)하고, 시드별 Generator로 만든 초기 잠재 변수를
+        chunk_size개씩 묶어 한 번에 디노이징. 메모리가 부족하면 chunk를 절반으로 줄여 재시도.
+        이미지 i는 seeds[i]로 단독 생성한 결과와 같음.
+
+        Returns:
+            (images, timings) - timings: load_s / scheduler_s / encode_s / denoise_s / decode_s /
+                                 generate_s / total_s / per_image_s / step_s / chunk_sizes / encode_cached
+        """
+        start = time.perf_counter()
+        pipe, key, load_s = self.get(model_id, dtype, device, profile=profile)
+        chunk = max(1, chunk_size or default_chunk_size(pipe.device.type))
+        images: List[Image.Image] = []
+        stage = {'denoise_s': 0.0, 'decode_s': 0.0}
+        step_times: List[float] = []
+        chunk_sizes: List[int] = []
+
+        # 생성하는 동안 다른 세션의 로드가 이 파이프라인을 제거해 두 번째 사본을 로드하지 않도록 잡아 둠
+        with self.registry.hold(key), self.lock(key), (profile.runtime() if profile else nullcontext()):
+            t0 = time.perf_counter()
+            if scheduler:
+                self.set_scheduler(pipe, key, scheduler)
+            t1 = time.perf_counter()
+            prompt_embeds, negative_embeds, cached = self.encode_prompt(
+                pipe, key, prompt, negative_prompt, guidance_scale
+            )
+            t2 = time.perf_counter()
+
+            index = 0
+            while index < len(seeds):
+                batch = list(seeds[index:index + chunk])
+                generators = None
+                if all(seed is not None for seed in batch):
+                    generators = [torch.Generator(device=pipe.device.type).manual_seed(int(seed)) for seed in batch]
+                step_timer = _StepTimer()
+                try:
+                    c0 = time.perf_counter()
+                    latents = pipe(
+                        prompt_embeds=prompt_embeds.expand(len(batch), -1, -1),
+                        negative_prompt_embeds=(negative_embeds.expand(len(batch), -1, -1)
+                                                if negative_embeds is not None else None),
+                        num_inference_steps=int(steps),
+                        guidance_scale=float(guidance_scale),
+                        generator=generators,
+                        height=int(height),
+                        width=int(width),
+                        output_type='latent',
+                        callback_on_step_end=step_timer,
+                        **pipe_kwargs
+                    ).images
+                    c1 = time.perf_counter()
+                    images.extend(self.decode_latents(pipe, latents))
+                    c2 = time.perf_counter()
+                except RuntimeError as e:
+                    if chunk == 1 or not _is_out_of_memory(e):
+                        raise
+                    chunk //= 2
+                    gc.collect()
+                    if torch.cuda.is_available():
+                        torch.cuda.empty_cache()
+                    continue
+
+                stage['denoise_s'] += c1 - c0
+                stage['decode_s'] += c2 - c1
+                step_times.append(step_timer.summary(c0).get('step_s', 0.0))
+                chunk_sizes.append(len(batch))
+                index += len(batch)
+            t3 = time.perf_counter()
+
+        timings = {
+            'load_s': load_s,
+            'scheduler_s': t1 - t0,
+            'encode_s': t2 - t1,
+            'encode_cached': cached,
+            **stage,
+            'generate_s': t3 - t1,
+            'total_s': t3 - start,
+            'per_image_s': (t3 - t1) / max(len(images), 1),
+            'steps': int(steps),
+            # 배치 한 스텝 시간 (chunk별 중앙값의 평균)
+            'step_s': statistics.mean(step_times) if step_times else 0.0,
+            'chunk_sizes': chunk_sizes,
+        }
+        return images, timings
+
+    def generate(self, model_id: str, prompt: str, negative_prompt: Optional[str] = None,
+                 scheduler: Optional[str] = None, steps: int = 25, guidance_scale: float = 7.0,
+                 seed: Optional[int] = None, width: int = 512, height: int = 512,
+                 dtype: Optional[torch.dtype] = None, device: Optional[str] = None,
+                 profile: Optional[CPUProfile] = None,
+                 **pipe_kwargs) -> Tuple[List[Image.Image], Dict[str, float]]:
+        """
+        이미지 1장 생성 (generate_seeds와 같은 경로, 프롬프트 임베딩 캐시 사용)
+
+        Returns:
+            (images, timings) - timings: load_s / scheduler_s / encode_s / denoise_s / decode_s /
+                                 generate_s / total_s / steps / step_s
+        """
+        return self.generate_seeds(
+            model_id, prompt, [seed], negative_prompt=negative_prompt, scheduler=scheduler,
+            steps=steps, guidance_scale=guidance_scale, width=width, height=height, chunk_size=1,
+            dtype=dtype, device=device, profile=profile, **pipe_kwargs
+        )
+
+    def preview(self, prompt: str, steps: int = 2, size: int = 512, seed: Optional[int] = None,
+                profile: Optional[CPUProfile] = None, **kwargs) -> Tuple[List[Image.Image], Dict[str, float]]:
+        """sd-turbo 빠른 미리보기 (1~4 스텝, CFG 없음)"""
+        return self.generate(PREVIEW_MODEL_ID, prompt, steps=min(max(int(steps), 1), 4),
+                             guidance_scale=0.0, seed=seed, width=size, height=size,
+                             profile=profile, **kwargs)
+
+    def benchmark_profiles(self, model_id: str, profiles: Dict[str, Optional[CPUProfile]],
+                           resolutions: Sequence[int] = RESOLUTIONS, steps: int = 10,
+                           prompt: str = 'a photo of a cat', guidance_scale: float = 7.0,
+                           warmup_steps: int = 2) -> List[Dict[str, Any]]:
+        """
+        프로필 × 해상도별 스텝당 / 이미지당 시간 측정
+
+        Args:
+            profiles: {'baseline': None, 'cpu': CPUProfile(), ...}
+
+        Returns:
+            [{'profile', 'resolution', 'steps', 'step_s', 'encode_s', 'decode_s', 'image_s', 'load_s'}, ...]
+        """
+        results = []
+        for profile_name, profile in profiles.items():
+            for resolution in resolutions:
+                kwargs = dict(guidance_scale=guidance_scale, seed=0, width=resolution,
+                              height=resolution, profile=profile)
+                # 첫 호출의 로드/초기화 비용을 측정에서 제외
+                _, warm = self.generate(model_id, prompt, steps=warmup_steps, **kwargs)
+                _, timings = self.generate(model_id, prompt, steps=steps, **kwargs)
+                results.append({
+                    'profile': profile_name,
+                    'resolution': resolution,
+                    'steps': timings.get('steps', steps),
+                    'step_s': timings.get('step_s'),
+                    'encode_s': timings.get('encode_s'),
+                    'decode_s': timings.get('decode_s'),
+                    'image_s': timings['generate_s'],
+                    'load_s': warm['load_s'],
+                })
+        return results
+
+    def resident(self) -> List[str]:
+        """현재 상주 중인 파이프라인 키"""
+        return [key for key in self.registry.keys() if key.startswith('diffusion:')]
+
+
+_pool: Optional[DiffusionPipelinePool] = None
+
+
+def get_pipeline_pool() -> DiffusionPipelinePool:
+    """프로세스 전역 파이프라인 풀 반환"""
+    global _pool
+    if _pool is None:
+        _pool = DiffusionPipelinePool()
+    return _pool
@@ -524,46 +524,105 @@ class GenerationModule(BaseImageProcessor):
             width = st.selectbox('Width', [512, 640, 768], index=0)
             height = st.selectbox('Height', [512, 640, 768], index=0)
 
+        profile = self._render_cpu_profile_options()
+
         prompt = st.text_area('텍스트 프롬프트', 'A high quality portrait photo of a friendly teacher, studio lighting')
         negative = st.text_input('네거티브 프롬프트 (선택)', 'low quality, blurry, artifacts')
 
-        if st.button('🚀 이미지 생성', type='primary', use_container_width=True):
+        btn_cols = st.columns([3, 2])
+        with btn_cols[0]:
+            generate_clicked = st.button('🚀 이미지 생성', type='primary', use_container_width=True)
+        with btn_cols[1]:
+            preview_steps = st.slider('미리보기 스텝 (sd-turbo)', 1, 4, 2)
+            preview_clicked = st.button('⚡ 빠른 미리보기', use_container_width=True,
+                                        help='stabilityai/sd-turbo로 1~4 스텝만 실행 (CFG 없음, 512px)')
+
+        if generate_clicked or preview_clicked:
             with st.spinner('Stable Diffusion으로 이미지를 생성 중...'):
                 try:
-                    import torch
-                    from diffusers import StableDiffusionPipeline, DPMSolverMultistepScheduler, DDIMScheduler, EulerDiscreteScheduler, EulerAncestralDiscreteScheduler
-
-                    pipe = StableDiffusionPipeline.from_pretrained(model_id, torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32)
-
-                    if scheduler_name == 'DPMSolverMultistep':
-                        pipe.scheduler = DPMSolverMultistepScheduler.from_config(pipe.scheduler.config)
-                    elif scheduler_name == 'DDIM':
-                        pipe.scheduler = DDIMScheduler.from_config(pipe.scheduler.config)
-                    elif scheduler_name == 'Euler':
-                        pipe.scheduler = EulerDiscreteScheduler.from_config(pipe.scheduler.config)
-                    elif scheduler_name == 'EulerAncestral':
-                        pipe.scheduler = EulerAncestralDiscreteScheduler.from_config(pipe.scheduler.config)
-                    if torch.cuda.is_available():
-                        pipe = pipe.to('cuda')
-
-                    generator = torch.Generator(device='cuda' if torch.cuda.is_available() else 'cpu').manual_seed(int(seed))
-                    image = pipe(
-                        prompt,
-                        negative_prompt=negative or None,
-                        num_inference_steps=int(steps),
-                        guidance_scale=float(guidance),
-                        generator=generator,
-                        height=int(height),
-                        width=int(width),
-                    ).images[0]
+                    from .diffusion_helpers import get_pipeline_pool
+
+                    # 파이프라인은 프로세스에 상주 → 시드/스케줄러만 바꾸면 가중치를 다시 읽지 않음
+                    pool = get_pipeline_pool()
+                    if preview_clicked:
+                        images, timings = pool.preview(prompt, steps=preview_steps, seed=int(seed), profile=profile)
+                    else:
+                        images, timings = pool.generate(
+                            model_id,
+                            prompt,
+                            negative_prompt=negative,
+                            scheduler=scheduler_name,
+                            steps=int(steps),
+                            guidance_scale=float(guidance),
+                            seed=int(seed),
+                            width=int(width),
+                            height=int(height),
+                            profile=profile,
+                        )
+                    image = images[0]
 
                     st.image(image, caption='Generated Image', use_container_width=True)
+                    st.caption(f"⏱️ 모델 로드 {timings['load_s']:.1f}s · 스케줄러 교체 {timings['scheduler_s'] * 1000:.0f}ms · "
+                               f"생성 {timings['generate_s']:.1f}s (스텝당 {timings.get('step_s', 0):.2f}s, "
+                               f"VAE 디코딩 {timings.get('decode_s', 0):.2f}s)")
                     buf = io.BytesIO()
                     image.save(buf, format='PNG')
                     st.download_button('📥 이미지 다운로드 (PNG)', buf.getvalue(), file_name='generated.png', mime='image/png', use_container_width=True)
                 except Exception as e:
                     st.error(f'이미지 생성 실패: {e}')
 
+        with st.expander('📊 CPU 프로필 벤치마크 (스텝당 / 이미지당)'):
+            st.caption('기본 설정과 CPU 프로필을 UI의 각 해상도(512/640/768)에서 비교합니다. CPU에서는 수 분이 걸릴 수 있습니다.')
+            bench_steps = st.number_input('측정 스텝 수', min_value=2, max_value=50, value=10, key='cpu_bench_steps')
+            if st.button('벤치마크 실행', key='cpu_bench_run'):
+                from .diffusion_helpers import RESOLUTIONS, CPUProfile, get_pipeline_pool
+                import pandas as pd
+
+                with st.spinner('측정 중...'):
+                    results = get_pipeline_pool().benchmark_profiles(
+                        model_id,
+                        {'baseline': None, 'cpu': profile or CPUProfile()},
+                        resolutions=RESOLUTIONS,
+                        steps=int(bench_steps),
+                    )
+                st.dataframe(pd.DataFrame(results), use_container_width=True, hide_index=True)
+
+    def _render_cpu_profile_options(self):
+        """CPU 실행 프로필 옵션 (GPU가 없으면 기본 활성화)"""
+        import torch
+        from .diffusion_helpers import TINY_VAE_ID, CPUProfile, cpu_supports_bf16, physical_cores
+
+        use_profile = st.checkbox('🖥️ CPU 최적화 프로필', value=not torch.cuda.is_available(),
+                                  help='SDPA 어텐션, channels-last UNet, bf16 autocast, 스레드 수 조정')
+        if not use_profile:
+            return None
+
+        with st.expander('CPU 프로필 설정'):
+            cols = st.columns(3)
+            with cols[0]:
+                attention = st.radio('어텐션', ['sdpa', 'slicing'], horizontal=True,
+                                     help='slicing은 최대 메모리를 줄이지만 대체로 더 느립니다.')
+                channels_last = st.checkbox('channels-last', value=True)
+            with cols[1]:
+                bf16 = st.checkbox('bf16 autocast', value=cpu_supports_bf16(),
+                                   disabled=not cpu_supports_bf16(),
+                                   help='AVX512-BF16/AMX를 지원하는 CPU에서만 사용')
+                threads = st.number_input('스레드 수', min_value=1, max_value=os.cpu_count() or 1,
+                                          value=min(physical_cores(), os.cpu_count() or 1))
+            with cols[2]:
+                tiny_vae = st.checkbox('경량 VAE 디코더 (TAESD)', value=False,
+                                       help=f'{TINY_VAE_ID} - 디코딩이 훨씬 빠르지만 세부 묘사가 약간 줄어듭니다.')
+                vae_tiling = st.checkbox('VAE 타일 디코딩', value=False, help='768px 등 고해상도에서 메모리 절약')
+
+        return CPUProfile(
+            attention=attention,
+            channels_last=channels_last,
+            bf16=bf16,
+            tiny_vae=TINY_VAE_ID if tiny_vae else None,
+            vae_tiling=vae_tiling,
+            threads=int(threads),
+        )
+
     def render_prompt_lab(self):
         st.header('✍️ 프롬프트 엔지니어링 실습')
 
@@ -744,6 +803,11 @@ digital art
 
         st.markdown('---')
 
+        # 멀티 시드 배치 생성
+        self._render_seed_sweep()
+
+        st.markdown('---')
+
         # Google Colab 코드
         st.subheader('💻 Google Colab 실습 코드')
 
@@ -892,6 +956,59 @@ print("\\n✅ 비교 완료!")
         **제출물**: 생성 이미지 + 프롬프트 + 분석 보고서
         """)
 
+    def _render_seed_sweep(self):
+        """같은 프롬프트를 여러 시드로 한 번에 생성 (프롬프트 인코딩 1회 + 배치 디노이징)"""
+        st.subheader('🎲 멀티 시드 배치 생성')
+        st.caption('프롬프트/네거티브는 한 번만 인코딩해 캐시하고, 시드별 초기 노이즈를 묶어 배치로 생성합니다. '
+                   '같은 시드를 단독 생성한 결과와 동일합니다.')
+
+        if not self._ensure_diffusers():
+            return
+
+        cols = st.columns(3)
+        with cols[0]:
+            model_id = st.selectbox('모델', ['runwayml/stable-diffusion-v1-5', 'stabilityai/sd-turbo'], key='sweep_model')
+            num_seeds = st.slider('시드 개수', 2, 16, 8, key='sweep_num_seeds')
+        with cols[1]:
+            base_seed = st.number_input('시작 시드', min_value=0, max_value=2**31 - 16, value=42, key='sweep_seed')
+            steps = st.slider('Inference Steps', 1, 50, 4 if 'turbo' in model_id else 25, key='sweep_steps')
+        with cols[2]:
+            chunk_size = st.slider('배치 크기 (chunk)', 1, 16, 4, key='sweep_chunk',
+                                   help='한 번에 디노이징할 시드 수. 메모리가 부족하면 자동으로 절반씩 줄입니다.')
+            guidance = st.slider('CFG Scale', 0.0, 12.0, 0.0 if 'turbo' in model_id else 7.0, key='sweep_cfg')
+
+        prompt = st.text_area('프롬프트', 'Portrait of a wise old wizard, fantasy art style, cinematic lighting, ultra-detailed',
+                              key='sweep_prompt')
+        negative = st.text_input('네거티브 프롬프트', 'low quality, blurry, artifacts, deformed hands', key='sweep_negative')
+
+        if st.button('🎲 시드 스윕 생성', key='sweep_run', use_container_width=True):
+            from .diffusion_helpers import get_pipeline_pool
+
+            seeds = list(range(int(base_seed), int(base_seed) + num_seeds))
+            with st.spinner(f'{num_seeds}개 시드 생성 중...'):
+                try:
+                    images, timings = get_pipeline_pool().generate_seeds(
+                        model_id, prompt, seeds, negative_prompt=negative, steps=int(steps),
+                        guidance_scale=float(guidance), chunk_size=int(chunk_size),
+                    )
+                except Exception as e:
+                    st.error(f'이미지 생성 실패: {e}')
+                    return
+
+            grid_cols = st.columns(4)
+            for idx, (seed, image) in enumerate(zip(seeds, images)):
+                with grid_cols[idx % 4]:
+                    st.image(image, caption=f'seed {seed}', use_container_width=True)
+
+            metric_cols = st.columns(5)
+            metric_cols[0].metric('모델 로드', f"{timings['load_s']:.1f}s")
+            metric_cols[1].metric('텍스트 인코딩', f"{timings['encode_s'] * 1000:.0f}ms",
+                                  '캐시' if timings['encode_cached'] else None)
+            metric_cols[2].metric('디노이징', f"{timings['denoise_s']:.1f}s")
+            metric_cols[3].metric('VAE 디코딩', f"{timings['decode_s']:.1f}s")
+            metric_cols[4].metric('이미지당', f"{timings['per_image_s']:.2f}s")
+            st.caption(f"배치 구성: {timings['chunk_sizes']}")
+
     def render_scheduler_lab(self):
         st.header('⏱️ 스케줄러 비교 실습')
 
@@ -1011,6 +1128,11 @@ print("\\n✅ 비교 완료!")
 
         st.markdown('---')
 
+        # 공유 입력 기반 실측 비교
+        self._render_scheduler_benchmark()
+
+        st.markdown('---')
+
         # Google Colab 코드
         st.subheader('💻 Google Colab 실습 코드')
 
@@ -1195,6 +1317,61 @@ print("\\n✅ 스텝 비교 완료!")
         **제출물**: 비교 이미지 + 시간 측정 + 추천 가이드
         """)
 
+    def _render_scheduler_benchmark(self):
+        """같은 텍스트 임베딩·초기 노이즈로 스케줄러를 공정하게 비교"""
+        st.subheader('⚡ 스케줄러 실측 비교 (공유 입력)')
+        st.caption('텍스트는 한 번만 인코딩하고 시드별 초기 노이즈를 모든 스케줄러가 공유합니다. '
+                   '결과 차이는 스케줄러 자체의 차이입니다.')
+
+        if not self._ensure_diffusers():
+            return
+
+        from .diffusion_helpers import SCHEDULERS
+
+        cols = st.columns(3)
+        with cols[0]:
+            model_id = st.selectbox('모델', ['runwayml/stable-diffusion-v1-5'], key='sched_model')
+            schedulers = st.multiselect('스케줄러', list(SCHEDULERS), default=list(SCHEDULERS), key='sched_names')
+        with cols[1]:
+            steps = st.slider('Inference Steps', 5, 50, 25, key='sched_steps')
+            num_seeds = st.slider('시드 개수', 1, 4, 1, key='sched_seeds')
+        with cols[2]:
+            reference_steps = st.number_input('기준 이미지 스텝 (0이면 첫 스케줄러 결과가 기준)',
+                                              min_value=0, max_value=100, value=50, key='sched_ref_steps')
+            workers = st.number_input('병렬 워커 (CPU, 0=순차)', min_value=0, max_value=max(os.cpu_count() or 1, 1),
+                                      value=0, key='sched_workers',
+                                      help='워커마다 파이프라인을 따로 로드하므로 메모리가 워커 수만큼 필요합니다.')
+        prompt = st.text_input('프롬프트', 'A serene landscape with mountains and a lake, golden hour', key='sched_prompt')
+
+        if st.button('⏱️ 비교 실행', key='sched_run', use_container_width=True) and schedulers:
+            import pandas as pd
+            from .scheduler_comparison import compare_schedulers, summarize
+
+            with st.spinner('스케줄러 비교 중...'):
+                try:
+                    result = compare_schedulers(
+                        model_id, prompt, 'low quality, blurry', schedulers=schedulers,
+                        seeds=list(range(42, 42 + num_seeds)), steps=int(steps),
+                        reference_steps=int(reference_steps) or None, workers=int(workers),
+                    )
+                except Exception as e:
+                    st.error(f'비교 실패: {e}')
+                    return
+
+            image_cols = st.columns(len(schedulers))
+            for col, name in zip(image_cols, schedulers):
+                with col:
+                    st.image(result['images'][name][0], caption=name, use_container_width=True)
+
+            st.markdown(f"**기준 이미지**: `{result['reference']}` · 텍스트 인코딩 {result['encode_s'] * 1000:.0f}ms (1회) · "
+                        f"전체 {result['wall_s']:.1f}s (워커 {result['workers']})")
+            st.dataframe(pd.DataFrame(summarize(result)), use_container_width=True, hide_index=True)
+
+            # 스텝별 지연시간 곡선 (첫 시드)
+            curves = {row['scheduler']: row['step_ms'] for row in result['rows'] if row['seed'] == 42}
+            st.line_chart(pd.DataFrame(curves))
+            st.caption('스텝별 지연시간 (ms). 첫 스텝은 잠재 변수 준비 시간을 포함합니다.')
+
     def render_controlnet_lab(self):
         st.header('🧩 ControlNet 실습')
 
@@ -1246,6 +1423,11 @@ print("\\n✅ 스텝 비교 완료!")
 
         st.markdown('---')
 
+        # 상주 파이프라인 + 조건 맵 캐시 기반 실습
+        self._render_controlnet_live()
+
+        st.markdown('---')
+
         # Google Colab 코드
         st.subheader('💻 Google Colab 실습 코드')
 
@@ -1343,6 +1525,79 @@ print("✅ ControlNet 생성 완료!")
         **제출물**: 입력 이미지 + Canny edge + 생성 결과 3가지
         """)
 
+    def _render_controlnet_live(self):
+        """조건 맵 캐시 + 상주 ControlNet 파이프라인으로 생성"""
+        st.subheader('⚡ ControlNet 실시간 실습')
+        st.caption('조건 맵은 (이미지, 전처리기, 파라미터)별로 캐시되고, ControlNet 파이프라인은 '
+                   '기본 SD 파이프라인의 UNet/VAE를 공유하므로 ControlNet 가중치만 추가로 로드됩니다.')
+
+        if not self._ensure_diffusers():
+            return
+
+        uploaded = st.file_uploader('조건 이미지 업로드', type=['png', 'jpg', 'jpeg'], key='cn_live_upload')
+        if uploaded is None:
+            st.info('이미지를 업로드하면 조건 맵 미리보기와 생성을 실행할 수 있습니다.')
+            return
+        image = Image.open(uploaded).convert('RGB')
+        image.thumbnail((768, 768))
+        image = image.crop((0, 0, image.width - image.width % 8, image.height - image.height % 8))
+
+        from .controlnet_service import CONTROLNET_MODELS, get_controlnet_service
+
+        service = get_controlnet_service()
+        cols = st.columns(3)
+        with cols[0]:
+            controlnets = st.multiselect('ControlNet (여러 개 선택 시 스택)', list(CONTROLNET_MODELS),
+                                         default=['canny'], key='cn_live_types')
+        with cols[1]:
+            low, high = st.slider('Canny 임계값', 0, 255, (100, 200), key='cn_live_canny')
+            steps = st.slider('Inference Steps', 5, 50, 25, key='cn_live_steps')
+        with cols[2]:
+            scale = st.slider('조건 강도 (conditioning scale)', 0.0, 2.0, 1.0, 0.1, key='cn_live_scale')
+            seed = st.number_input('시드', min_value=0, max_value=2**31 - 1, value=42, key='cn_live_seed')
+
+        params = {'canny': {'low_threshold': low, 'high_threshold': high}}
+        if not controlnets:
+            return
+
+        # 조건 맵 미리보기 (Depth는 추정 모델이 필요하므로 생성 시에만 계산)
+        preview = [name for name in controlnets if name != 'depth']
+        if preview:
+            preview_cols = st.columns(len(preview) + 1)
+            preview_cols[0].image(image, caption='입력', use_container_width=True)
+            for col, name in zip(preview_cols[1:], preview):
+                try:
+                    condition = service.preprocess([image], name, **params.get(name, {}))[0]
+                except Exception as e:
+                    col.error(f'{name} 전처리 실패: {e}')
+                    continue
+                col.image(condition, caption=name, use_container_width=True)
+
+        prompt = st.text_input('프롬프트', 'A beautiful landscape painting, vibrant colors', key='cn_live_prompt')
+        if st.button('🎨 ControlNet 생성', key='cn_live_run', use_container_width=True):
+            with st.spinner('ControlNet 생성 중...'):
+                try:
+                    images, timings = service.generate(
+                        prompt, [image] * len(controlnets), controlnets=tuple(controlnets),
+                        negative_prompt='low quality, blurry', conditioning_scale=float(scale),
+                        preprocess_params=params, steps=int(steps), seed=int(seed),
+                    )
+                except Exception as e:
+                    st.error(f'ControlNet 생성 실패: {e}')
+                    return
+
+            result_cols = st.columns(len(controlnets) + 1)
+            for col, name, condition in zip(result_cols, controlnets, timings['conditions']):
+                col.image(condition, caption=name, use_container_width=True)
+            result_cols[-1].image(images[0], caption='생성 결과', use_container_width=True)
+
+            metric_cols = st.columns(4)
+            metric_cols[0].metric('파이프라인 준비', f"{timings['load_s']:.1f}s")
+            metric_cols[1].metric('전처리', f"{timings['preprocess_s'] * 1000:.0f}ms")
+            metric_cols[2].metric('생성', f"{timings['generate_s']:.1f}s")
+            metric_cols[3].metric('전체', f"{timings['total_s']:.1f}s")
+            st.caption(f"조건 맵 캐시: 히트 {service.stats['hits']} / 미스 {service.stats['misses']}")
+
     def render_comfyui_guide(self):
         st.header('🗺️ ComfyUI 워크플로우 가이드')
 
@@ -59,13 +59,21 @@ from diffusers import (
     EulerAncestralDiscreteScheduler
 )
 
-# 파이프라인 로드
+# 파이프라인 로드 (1회)
 pipe = StableDiffusionPipeline.from_pretrained(
     "runwayml/stable-diffusion-v1-5",
     torch_dtype=torch.float16
 ).to("cuda")
+base_config = pipe.scheduler.config
+
+# 공정한 비교: 텍스트 임베딩과 초기 노이즈를 한 번만 만들고 모든 스케줄러가 공유
+prompt_embeds, negative_embeds = pipe.encode_prompt(
+    "A serene landscape", pipe.device, 1, True, "low quality, blurry"
+)
+latents = torch.randn(
+    (1, 4, 64, 64), generator=torch.Generator("cpu").manual_seed(42)
+).to("cuda", torch.float16)
 
-# 스케줄러 변경
 schedulers = {
     "DDIM": DDIMScheduler,
     "DPMSolver": DPMSolverMultistepScheduler,
@@ -74,16 +82,22 @@ schedulers = {
 }
 
 for name, scheduler_class in schedulers.items():
-    pipe.scheduler = scheduler_class.from_config(
-        pipe.scheduler.config
-    )
+    pipe.scheduler = scheduler_class.from_config(base_config)
 
     image = pipe(
-        prompt="A serene landscape",
+        prompt_embeds=prompt_embeds,
+        negative_prompt_embeds=negative_embeds,
+        latents=latents.clone(),  # init_noise_sigma는 스케줄러별로 파이프라인이 적용
         num_inference_steps=25,
         guidance_scale=7.5,
-        generator=torch.Generator("cuda").manual_seed(42)
+        generator=torch.Generator("cuda").manual_seed(42)  # Euler A의 스텝 노이즈 고정
     ).images[0]
 
     image.save(f"output_{name}.png")
+
+# 앱 내장 엔진: 스텝별 지연시간 + 기준 이미지 대비 PSNR/SSIM
+# from modules.week09.scheduler_comparison import compare_schedulers, summarize
+# result = compare_schedulers("runwayml/stable-diffusion-v1-5", "A serene landscape",
+#                             seeds=[42, 43], steps=25, reference_steps=50)
+# print(summarize(result))
         """, language="python")
@@ -53,36 +53,54 @@ def render():
 
     with st.expander("📝 예제 코드"):
         st.code("""
-from diffusers import StableDiffusionControlNetPipeline, ControlNetModel
+import torch
+from diffusers import StableDiffusionPipeline, StableDiffusionControlNetPipeline, ControlNetModel
 from PIL import Image
 import cv2
 import numpy as np
 
-# ControlNet 모델 로드
-controlnet = ControlNetModel.from_pretrained(
-    "lllyasviel/sd-controlnet-canny",
+# 기본 SD 파이프라인은 한 번만 로드하고 ControlNet 파이프라인은 from_pipe로 구성
+# (UNet/VAE/텍스트 인코더를 공유하므로 ControlNet 가중치만 추가로 메모리에 올라감)
+base = StableDiffusionPipeline.from_pretrained(
+    "runwayml/stable-diffusion-v1-5",
     torch_dtype=torch.float16
-)
+).to("cuda")
 
-pipe = StableDiffusionControlNetPipeline.from_pretrained(
-    "runwayml/stable-diffusion-v1-5",
-    controlnet=controlnet,
+controlnet = ControlNetModel.from_pretrained(
+    "lllyasviel/sd-controlnet-canny",
     torch_dtype=torch.float16
 ).to("cuda")
+pipe = StableDiffusionControlNetPipeline.from_pipe(base, controlnet=controlnet)
+
+# Canny edge 추출 (같은 이미지/임계값이면 다시 계산하지 않도록 캐시)
+edge_cache = {}
+
+def get_canny_edge(image, low=100, high=200):
+    key = (image.tobytes(), low, high)
+    if key not in edge_cache:
+        gray = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
+        edges = cv2.Canny(gray, low, high)
+        edge_cache[key] = Image.fromarray(edges).convert("RGB")
+    return edge_cache[key]
+
+image = Image.open("input.jpg").convert("RGB")
+edges = get_canny_edge(image)
+
+# 조건 강도만 바꿔 가며 생성 (전처리·파이프라인 로드는 재사용)
+for scale in (0.5, 1.0, 1.5):
+    output = pipe(
+        prompt="A beautiful landscape painting",
+        image=edges,
+        num_inference_steps=30,
+        guidance_scale=7.5,
+        controlnet_conditioning_scale=scale,
+        generator=torch.Generator("cuda").manual_seed(42)
+    ).images[0]
+    output.save(f"controlnet_output_{scale}.png")
 
-# Canny edge 추출
-image = Image.open("input.jpg")
-image_np = np.array(image)
-edges = cv2.Canny(image_np, 100, 200)
-edges = Image.fromarray(edges)
-
-# ControlNet 생성
-output = pipe(
-    prompt="A beautiful landscape painting",
-    image=edges,
-    num_inference_steps=30,
-    guidance_scale=7.5
-).images[0]
-
-output.save("controlnet_output.png")
+# 앱 내장 서비스: 조건 맵 캐시 + 여러 ControlNet 스택 (Canny + Depth)
+# from modules.week09.controlnet_service import get_controlnet_service
+# service = get_controlnet_service()
+# images, timings = service.generate("A beautiful landscape painting", [image, image],
+#                                    controlnets=("canny", "depth"), conditioning_scale=[1.0, 0.5])
         """, language="python")
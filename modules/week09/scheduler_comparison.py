@@ -0,0 +1,218 @@
+"""
+스케줄러 비교 엔진
+모든 스케줄러가 같은 텍스트 임베딩과 같은 초기 잠재 변수에서 출발하도록 해
+스케줄러 자체의 차이만 비교합니다.
+
+- 텍스트 인코딩 1회 (DiffusionPipelinePool의 임베딩 캐시)
+- 시드별 초기 노이즈 1회 생성 → 스케줄러마다 init_noise_sigma만 다르게 적용 (diffusers prepare_latents)
+- 스케줄러별 스텝 지연시간 곡선, 전체 시간
+- 기준 이미지 대비 PSNR / SSIM (기준: 첫 번째 스케줄러 또는 reference_steps로 별도 생성)
+- 선택: 멀티코어 CPU에서 스케줄러별 워커 프로세스로 병렬 실행 (워커마다 파이프라인을 따로 로드)
+
+사용 예:
+    result = compare_schedulers('runwayml/stable-diffusion-v1-5', 'a lighthouse at dusk',
+                                seeds=[0, 1], steps=25, reference_steps=50)
+    for row in summarize(result):
+        print(row)
+"""
+
+import dataclasses
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+from PIL import Image
+
+from .diffusion_helpers import (
+    SCHEDULERS, CPUProfile, DiffusionPipelinePool, _StepTimer, get_pipeline_pool, physical_cores
+)
+
+DEFAULT_SCHEDULERS = ('DDIM', 'DPMSolverMultistep', 'Euler', 'EulerAncestral')
+
+
+def initial_latents(pipe, seeds: Sequence[int], height: int, width: int) -> List[torch.Tensor]:
+    """시드별 초기 노이즈 (diffusers가 같은 시드로 CPU에서 뽑는 값과 동일, 스케일 전)"""
+    shape = (1, pipe.unet.config.in_channels, height // pipe.vae_scale_factor, width // pipe.vae_scale_factor)
+    return [
+        torch.randn(shape, generator=torch.Generator('cpu').manual_seed(int(seed)), dtype=pipe.unet.dtype)
+        for seed in seeds
+    ]
+
+
+def run_scheduler(pool: DiffusionPipelinePool, model_id: str, scheduler: str, seeds: Sequence[int],
+                  latents: Sequence[torch.Tensor], prompt_embeds: torch.Tensor,
+                  negative_embeds: Optional[torch.Tensor], steps: int, guidance_scale: float,
+                  height: int, width: int, dtype: Optional[torch.dtype] = None,
+                  device: Optional[str] = None, profile: Optional[CPUProfile] = None) -> Dict[str, Any]:
+    """
+    스케줄러 하나를 공유 입력(임베딩, 초기 노이즈)으로 실행
+
+    Returns:
+        {'scheduler', 'images': [시드별 (H, W, 3) uint8], 'runs': [{'seed', 'total_s', 'decode_s', 'step_ms'}]}
+    """
+    pipe, key, _ = pool.get(model_id, dtype, device, profile=profile)
+    images, runs = [], []
+
+    with pool.registry.hold(key), pool.lock(key), (profile.runtime() if profile else nullcontext()):
+        pool.set_scheduler(pipe, key, scheduler)
+        for seed, init in zip(seeds, latents):
+            timer = _StepTimer()
+            start = time.perf_counter()
+            out = pipe(
+                prompt_embeds=prompt_embeds.to(pipe.device),
+                negative_prompt_embeds=negative_embeds.to(pipe.device) if negative_embeds is not None else None,
+                latents=init.clone(),
+                # Euler Ancestral 등 확률적 스케줄러의 스텝 노이즈도 시드로 고정
+                generator=torch.Generator(device=pipe.device.type).manual_seed(int(seed)),
+                num_inference_steps=int(steps),
+                guidance_scale=float(guidance_scale),
+                height=int(height),
+                width=int(width),
+                output_type='latent',
+                callback_on_step_end=timer,
+            ).images
+            denoised = time.perf_counter()
+            image = pool.decode_latents(pipe, out)[0]
+            end = time.perf_counter()
+
+            # 첫 스텝은 잠재 변수 준비 시간을 포함
+            step_ms = np.diff([start] + timer.ends) * 1000
+            images.append(np.asarray(image))
+            runs.append({
+                'seed': int(seed),
+                'total_s': end - start,
+                'decode_s': end - denoised,
+                'step_ms': step_ms.tolist(),
+            })
+
+    return {'scheduler': scheduler, 'images': images, 'runs': runs}
+
+
+def _init_worker(threads: int):
+    torch.set_num_threads(threads)
+
+
+def _worker_run(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    # 워커 프로세스마다 자체 풀 → 파이프라인은 워커당 1회 로드
+    return run_scheduler(get_pipeline_pool(), **kwargs)
+
+
+def image_similarity(image: np.ndarray, reference: np.ndarray) -> Dict[str, float]:
+    """기준 이미지 대비 PSNR(dB) / SSIM"""
+    from skimage.metrics import peak_signal_noise_ratio, structural_similarity
+
+    if np.array_equal(image, reference):
+        return {'psnr': float('inf'), 'ssim': 1.0}
+    return {
+        'psnr': float(peak_signal_noise_ratio(reference, image, data_range=255)),
+        'ssim': float(structural_similarity(reference, image, channel_axis=2, data_range=255)),
+    }
+
+
+def compare_schedulers(model_id: str, prompt: str, negative_prompt: Optional[str] = None,
+                       schedulers: Sequence[str] = DEFAULT_SCHEDULERS, seeds: Sequence[int] = (42,),
+                       steps: int = 25, guidance_scale: float = 7.5, width: int = 512, height: int = 512,
+                       reference_steps: Optional[int] = None, workers: int = 0,
+                       dtype: Optional[torch.dtype] = None, device: Optional[str] = None,
+                       profile: Optional[CPUProfile] = None,
+                       pool: Optional[DiffusionPipelinePool] = None) -> Dict[str, Any]:
+    """
+    공유 입력 기반 스케줄러 비교
+
+    Args:
+        schedulers: SCHEDULERS의 이름 목록
+        reference_steps: 지정하면 첫 번째 스케줄러를 이 스텝 수로 실행한 결과를 기준 이미지로 사용
+                         (없으면 같은 스텝 수의 첫 번째 스케줄러 결과가 기준)
+        workers: 2 이상이면 스케줄러별 워커 프로세스에서 병렬 실행 (CPU 전용,
+                 워커마다 파이프라인을 로드하므로 메모리가 workers배 필요)
+
+    Returns:
+        {'rows': [스케줄러×시드별 결과], 'images': {scheduler: [PIL]}, 'reference': 기준 이름,
+         'encode_s', 'latents_s', 'wall_s', 'workers'}
+    """
+    unknown = [name for name in schedulers if name not in SCHEDULERS]
+    if unknown:
+        raise ValueError(f"지원하지 않는 스케줄러: {unknown} (사용 가능: {list(SCHEDULERS)})")
+
+    pool = pool or get_pipeline_pool()
+    pipe, key, _ = pool.get(model_id, dtype, device, profile=profile)
+
+    t0 = time.perf_counter()
+    prompt_embeds, negative_embeds, _ = pool.encode_prompt(pipe, key, prompt, negative_prompt, guidance_scale)
+    t1 = time.perf_counter()
+    latents = initial_latents(pipe, seeds, height, width)
+    t2 = time.perf_counter()
+
+    common = dict(
+        model_id=model_id, seeds=list(seeds), latents=latents,
+        prompt_embeds=prompt_embeds.cpu(),
+        negative_embeds=negative_embeds.cpu() if negative_embeds is not None else None,
+        guidance_scale=guidance_scale, height=height, width=width,
+        dtype=dtype, device=device, profile=profile,
+    )
+    tasks = [dict(common, scheduler=name, steps=steps) for name in schedulers]
+    if reference_steps:
+        tasks.append(dict(common, scheduler=schedulers[0], steps=reference_steps))
+
+    parallel = workers > 1 and pipe.device.type == 'cpu'
+    if parallel:
+        threads = max(1, physical_cores() // workers)
+        if profile is not None:
+            # profile.runtime()이 워커 안에서 스레드 수를 물리 코어 전체로 되돌리지 않도록 워커 몫으로 고정
+            worker_profile = dataclasses.replace(profile, threads=threads)
+            tasks = [dict(task, profile=worker_profile) for task in tasks]
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(threads,)) as executor:
+            outputs = list(executor.map(_worker_run, tasks))
+    else:
+        outputs = [run_scheduler(pool, **task) for task in tasks]
+    wall = time.perf_counter() - t2
+
+    reference_output = outputs.pop() if reference_steps else outputs[0]
+    reference_name = f"{schedulers[0]}@{reference_steps}" if reference_steps else schedulers[0]
+
+    rows = []
+    for output in outputs:
+        for run, image, reference in zip(output['runs'], output['images'], reference_output['images']):
+            step_ms = run['step_ms']
+            rows.append({
+                'scheduler': output['scheduler'],
+                'seed': run['seed'],
+                'steps': len(step_ms),
+                'total_s': run['total_s'],
+                'decode_s': run['decode_s'],
+                'step_mean_ms': float(np.mean(step_ms[1:])) if len(step_ms) > 1 else float(step_ms[0]),
+                'step_ms': step_ms,
+                **image_similarity(image, reference),
+            })
+
+    return {
+        'rows': rows,
+        'images': {o['scheduler']: [Image.fromarray(img) for img in o['images']] for o in outputs},
+        'reference': reference_name,
+        'encode_s': t1 - t0,
+        'latents_s': t2 - t1,
+        'wall_s': wall,
+        'workers': workers if parallel else 1,
+    }
+
+
+def summarize(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """스케줄러별 평균 (시드 평균)"""
+    summary = []
+    for name in dict.fromkeys(row['scheduler'] for row in result['rows']):
+        rows = [row for row in result['rows'] if row['scheduler'] == name]
+        finite_psnr = [row['psnr'] for row in rows if np.isfinite(row['psnr'])]
+        summary.append({
+            'scheduler': name,
+            'total_s': float(np.mean([row['total_s'] for row in rows])),
+            'step_mean_ms': float(np.mean([row['step_mean_ms'] for row in rows])),
+            'psnr': float(np.mean(finite_psnr)) if finite_psnr else float('inf'),
+            'ssim': float(np.mean([row['ssim'] for row in rows])),
+        })
+    return summary
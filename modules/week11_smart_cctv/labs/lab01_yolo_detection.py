@@ -15,7 +15,13 @@ Date: 2025-01-20
 import cv2
 import numpy as np
 from ultralytics import YOLO
+import sys
 import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from core.annotation_renderer import AnnotationRenderer
+from core.video_capture import ThreadedCapture
 
 # COCO 클래스 이름
 COCO_CLASSES = [
@@ -116,7 +122,7 @@ def lab01_visualization():
     choice = input("선택: ").strip().lower()
 
     if choice == 'w':
-        cap = cv2.VideoCapture(0)
+        cap = ThreadedCapture(0)  # 디코딩은 백그라운드 스레드, 오래된 프레임은 버림
         print("✅ 웹캠 연결\n")
     else:
         # 샘플 영상이 있다면 사용, 없으면 생성한 이미지
@@ -130,6 +136,9 @@ def lab01_visualization():
 
     frame_count = 0
     fps_list = []
+    # 배경 없는 색 라벨 (기준선은 박스 위 10px), 라벨 이미지는 캐시해 재사용
+    renderer = AnnotationRenderer(font_scale=0.5, font_thickness=2, box_thickness=2,
+                                  label_background=False, label_padding=20)
 
     while True:
         if cap is not None:
@@ -146,28 +155,18 @@ def lab01_visualization():
         # 추론
         results = model(frame, conf=0.5, classes=[0, 2], verbose=False)
 
-        # 시각화
+        # 시각화 (프레임의 모든 박스를 한 번에 그림)
         for result in results:
-            for box in result.boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                confidence = float(box.conf[0])
-                class_id = int(box.cls[0])
-                class_name = COCO_CLASSES[class_id]
-
-                # 색상 설정
-                if class_id == 0:  # 사람
-                    color = (0, 255, 0)  # 초록
-                else:  # 차량
-                    color = (255, 0, 0)  # 파란
-
-                # 바운딩 박스
-                x1, y1, x2, y2 = map(int, [x1, y1, x2, y2])
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-
-                # 레이블
-                label = f"{class_name} {confidence:.2f}"
-                cv2.putText(frame, label, (x1, y1 - 10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+            boxes = result.boxes.xyxy.cpu().numpy()
+            confidences = result.boxes.conf.cpu().numpy()
+            class_ids = result.boxes.cls.cpu().numpy().astype(int)
+
+            # 색상 설정: 사람은 초록, 차량은 파랑
+            colors = np.where((class_ids == 0)[:, None], (0, 255, 0), (255, 0, 0))
+
+            # 레이블
+            labels = [f"{COCO_CLASSES[c]} {p:.2f}" for c, p in zip(class_ids, confidences)]
+            renderer.render(frame, boxes, labels, colors, inplace=True)
 
         # FPS 계산
         fps = 1.0 / (time.time() - start_time)
@@ -16,7 +16,13 @@ import cv2
 import numpy as np
 from ultralytics import YOLO
 from collections import deque, defaultdict
+import sys
 import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from core.annotation_renderer import AnnotationRenderer
+from core.video_capture import ThreadedCapture
 
 
 class SimpleTrack:
@@ -187,7 +193,8 @@ def lab02_basic_tracking():
     print("웹캠 또는 샘플 영상 선택 (w/Enter): ", end="")
     choice = input().strip().lower()
 
-    cap = cv2.VideoCapture(0 if choice == 'w' else 'sample.mp4')
+    # 웹캠은 오래된 프레임을 버리고, 파일은 모든 프레임을 순서대로 (디코딩은 백그라운드 스레드)
+    cap = ThreadedCapture(0 if choice == 'w' else 'sample.mp4')
     if not cap.isOpened():
         print("❌ 비디오 열기 실패")
         return
@@ -195,6 +202,9 @@ def lab02_basic_tracking():
     print("\n✅ 추적 시작 (ESC 종료)\n")
 
     frame_count = 0
+    # 배경 없는 ID 라벨 (기준선은 박스 위 10px), 라벨 이미지는 캐시해 재사용
+    renderer = AnnotationRenderer(font_scale=0.6, font_thickness=2, box_thickness=2,
+                                  label_background=False, label_padding=20)
     while True:
         ret, frame = cap.read()
         if not ret:
@@ -216,18 +226,12 @@ def lab02_basic_tracking():
         # ByteTrack 추적
         tracks = tracker.update(detections)
 
-        # 시각화
-        for track in tracks.values():
-            x1, y1, x2, y2 = map(int, track.bbox)
-
-            # 바운딩 박스
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-
-            # Track ID
-            label = f"ID:{track.id}"
-            cv2.putText(frame, label, (x1, y1-10),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        # 시각화: 바운딩 박스 + Track ID
+        track_list = list(tracks.values())
+        renderer.render(frame, [track.bbox for track in track_list],
+                        [f"ID:{track.id}" for track in track_list], (0, 255, 0), inplace=True)
 
+        for track in track_list:
             # 궤적
             if len(track.history) > 1:
                 points = np.array(list(track.history), dtype=np.int32)
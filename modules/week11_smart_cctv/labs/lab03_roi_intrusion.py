@@ -1,8 +1,14 @@
 """Lab 03: ROI 침입 감지 실습"""
 import cv2
 import numpy as np
+import sys
+from pathlib import Path
 from ultralytics import YOLO
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from core.annotation_renderer import AnnotationRenderer, PolygonOverlay
+from core.video_capture import ThreadedCapture
+
 roi_points = []
 
 def mouse_callback(event, x, y, flags, param):
@@ -17,7 +23,7 @@ def lab03_roi_intrusion():
     print("마우스로 ROI 영역 클릭 (4개 점, ESC: 완료)\n")
 
     model = YOLO('yolov8n.pt')
-    cap = cv2.VideoCapture(0)
+    cap = ThreadedCapture(0)
 
     # ROI 설정
     ret, frame = cap.read()
@@ -44,6 +50,11 @@ def lab03_roi_intrusion():
     roi_polygon = np.array(roi_points, dtype=np.int32)
     print(f"✅ ROI 설정 완료: {roi_points}\n")
 
+    # ROI 반투명 채우기는 다각형 영역에만 합성 (마스크 1회 계산, 프레임 복사 없음)
+    roi_overlay = PolygonOverlay(roi_polygon, (0, 0, 255), alpha=0.3)
+    renderer = AnnotationRenderer(font_scale=0.7, font_thickness=2, box_thickness=3,
+                                  label_background=False, label_padding=20)
+
     # 침입 감지
     intrusion_tracks = {}
     threshold_seconds = 3
@@ -60,12 +71,11 @@ def lab03_roi_intrusion():
         results = model(frame, conf=0.5, classes=[0], verbose=False)
 
         # ROI 그리기
-        overlay = frame.copy()
-        cv2.fillPoly(overlay, [roi_polygon], (0, 0, 255))
-        frame = cv2.addWeighted(frame, 0.7, overlay, 0.3, 0)
+        roi_overlay.apply(frame)
         cv2.polylines(frame, [roi_polygon], True, (0, 0, 255), 3)
 
         # 침입 검사
+        boxes, labels, colors = [], [], []
         for result in results:
             for box in result.boxes:
                 x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
@@ -82,15 +92,13 @@ def lab03_roi_intrusion():
 
                     duration = (frame_idx / fps) - intrusion_tracks[track_id]
 
-                    # 바운딩 박스
-                    color = (0, 0, 255) if duration >= threshold_seconds else (0, 165, 255)
-                    x1, y1, x2, y2 = map(int, [x1, y1, x2, y2])
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
+                    # 바운딩 박스 + 경고
+                    alert = duration >= threshold_seconds
+                    boxes.append((x1, y1, x2, y2))
+                    colors.append((0, 0, 255) if alert else (0, 165, 255))
+                    labels.append("INTRUSION!" if alert else None)
 
-                    # 경고
-                    if duration >= threshold_seconds:
-                        cv2.putText(frame, "INTRUSION!", (x1, y1-10),
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        renderer.render(frame, boxes, labels, colors or (0, 0, 255), inplace=True)
 
         cv2.imshow('Lab 03: Intrusion Detection', frame)
 
@@ -1,8 +1,13 @@
 """Lab 04: 배회 감지 실습 - 간소화 버전"""
-import cv2, numpy as np
+import cv2, numpy as np, sys
+from pathlib import Path
 from ultralytics import YOLO
 from collections import deque
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from core.annotation_renderer import AnnotationRenderer
+from core.video_capture import ThreadedCapture
+
 tracks_history = {}
 
 def calculate_movement(history):
@@ -15,8 +20,10 @@ def calculate_movement(history):
 def lab04_loitering():
     print("=== Lab 04: 배회 감지 ===\n")
     model, tracker = YOLO('yolov8n.pt'), {}
-    cap, fps, frame_idx = cv2.VideoCapture(0), 30, 0
+    cap, fps, frame_idx = ThreadedCapture(0), 30, 0
     loitering_threshold_sec, movement_threshold_px = 10, 100
+    renderer = AnnotationRenderer(font_scale=0.6, font_thickness=2, box_thickness=3,
+                                  label_background=False, label_padding=20)
 
     while True:
         ret, frame = cap.read()
@@ -24,6 +31,7 @@ def lab04_loitering():
 
         results = model(frame, conf=0.5, classes=[0], verbose=False)
 
+        boxes, labels, colors = [], [], []
         for result in results:
             for box in result.boxes:
                 x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
@@ -40,17 +48,15 @@ def lab04_loitering():
                     is_loitering = movement < movement_threshold_px
 
                     color = (0, 165, 255) if is_loitering else (0, 255, 0)
-                    x1, y1, x2, y2 = map(int, [x1, y1, x2, y2])
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
-
-                    if is_loitering:
-                        cv2.putText(frame, f"LOITERING! ({movement:.0f}px)", (x1, y1-10),
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+                    boxes.append((x1, y1, x2, y2))
+                    colors.append(color)
+                    labels.append(f"LOITERING! ({movement:.0f}px)" if is_loitering else None)
 
                     # 궤적
                     pts = np.array(list(tracks_history[tid]), dtype=np.int32)
                     cv2.polylines(frame, [pts], False, color, 2)
 
+        renderer.render(frame, boxes, labels, colors or (0, 255, 0), inplace=True)
         cv2.imshow('Lab 04: Loitering Detection', frame)
         if cv2.waitKey(1) & 0xFF == 27: break
         frame_idx += 1
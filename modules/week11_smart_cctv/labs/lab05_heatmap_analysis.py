@@ -1,16 +1,27 @@
 """Lab 05: 히트맵 분석 실습 - 간소화 버전"""
-import cv2, numpy as np
+import cv2, numpy as np, sys
+from pathlib import Path
 from ultralytics import YOLO
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from core.overlay import OverlayRenderer
+from core.video_capture import ThreadedCapture
+
 def lab05_heatmap():
     print("=== Lab 05: 히트맵 분석 ===\n")
     model = YOLO('yolov8n.pt')
-    cap = cv2.VideoCapture(0)
+    cap = ThreadedCapture(0)
     ret, frame = cap.read()
+    if not ret:
+        print("카메라에서 프레임을 읽을 수 없습니다.")
+        cap.release()
+        return
     h, w = frame.shape[:2]
 
     heatmap = np.zeros((h, w), dtype=np.float32)
     decay_factor = 0.995
+    renderer = OverlayRenderer(cmap=cv2.COLORMAP_JET, alpha=0.4, color_order='bgr')
+    overlay = np.empty_like(frame)  # 매 프레임 재사용하는 출력 버퍼
 
     while True:
         ret, frame = cap.read()
@@ -37,9 +48,7 @@ def lab05_heatmap():
                             heatmap[i, j] += value
 
         # 시각화
-        heatmap_normalized = cv2.normalize(heatmap, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
-        heatmap_colored = cv2.applyColorMap(heatmap_normalized, cv2.COLORMAP_JET)
-        overlay = cv2.addWeighted(frame, 0.6, heatmap_colored, 0.4, 0)
+        renderer.render(frame, heatmap, out=overlay)
 
         # 핫스팟 추출
         threshold = np.percentile(heatmap, 95)